@@ -1,28 +1,155 @@
 import dash
 from dash import dcc, html
 from dash.dependencies import Input, Output
-import plotly.express as px
 import plotly.graph_objects as go
-import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
+import json
 import os
 from automation_framework.utilities.db_helpers import DbHelper
+from automation_framework.utilities.cache_helpers import CacheHelper, DEFAULT_CACHE_PATH
+from automation_framework.utilities.metrics_helpers import get_metrics
+from automation_framework.utilities.profile_helpers import profiled
+from automation_framework.dashboard.figure_helpers import (
+    choose_bucket_seconds, downsample, scatter_render_mode, fit_to_budget
+)
 
 # Initialize the Dash app
 app = dash.Dash(__name__)
 
-# Initialize database helper
-db_helper = DbHelper()
+@app.server.route('/metrics')
+def metrics_endpoint():
+    """Prometheus metrics for this dashboard process (one series per gunicorn worker)"""
+    return get_metrics().to_prometheus(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+# The database helper and figure cache are created on first use, so that
+# production workers open their own connections after forking
+_db_helper = None
+_figure_cache = None
+
+# Seconds a cached figure stays valid even when no new rows arrive
+CACHE_TTL = 300
+
+# Limits that keep figure payloads small over long histories
+MAX_SCATTER_POINTS = 5000
+WEBGL_THRESHOLD = 1000
+MAX_BAR_CITIES = 50
+MAX_FIGURE_BYTES = 1_000_000
+
+WEATHER_COLUMNS = [
+    'city', 'bucket', 'temperature_web', 'temperature_api',
+    'feels_like_web', 'feels_like_api', 'discrepancy', 'samples'
+]
+
+def get_db_helper():
+    """Return the process-wide database helper, creating it on first use"""
+    global _db_helper
+    if _db_helper is None:
+        _db_helper = DbHelper(os.environ.get('DASHBOARD_DB_PATH', 'data.db'))
+    return _db_helper
+
+def get_figure_cache():
+    """Return the cache shared by all dashboard worker processes, scoped to the dashboard's database"""
+    global _figure_cache
+    if _figure_cache is None:
+        # Dashboards on other databases may share the cache file, and their data versions can collide
+        db_path = get_db_helper().db_path
+        namespace = db_path if db_path.startswith('file:') else os.path.abspath(db_path)
+        _figure_cache = CacheHelper(os.environ.get('DASHBOARD_CACHE_PATH', DEFAULT_CACHE_PATH), ttl=CACHE_TTL,
+                                    namespace=namespace)
+    return _figure_cache
+
+def cached(key, compute, filters=None):
+    """Return a precomputed figure or stats value, recomputing it only when the data changes"""
+    filters = filters or {}
+    cache_key = f"{key}:{json.dumps(filters, sort_keys=True)}"
+    with get_metrics().timer('dashboard_view_seconds', view=key):
+        return get_figure_cache().get_or_compute(
+            cache_key,
+            lambda: compute(filters),
+            version=get_db_helper().get_data_version()
+        )
+
+def build_filters(start_date, end_date, cities, threshold):
+    """Translate the filter controls into DbHelper query filters"""
+    filters = {}
+    if start_date:
+        filters['start'] = start_date[:10]
+    if end_date:
+        # The picker's end date is inclusive, the query's end is exclusive
+        end = datetime.strptime(end_date[:10], '%Y-%m-%d') + timedelta(days=1)
+        filters['end'] = end.strftime('%Y-%m-%d')
+    if cities:
+        filters['cities'] = sorted(cities)
+    if threshold:
+        filters['min_discrepancy'] = float(threshold)
+    return filters
+
+def format_temperature(value):
+    """Format a temperature for the stat cards"""
+    return f"{value:.1f}°C" if value is not None else "N/A"
 
-def get_weather_data():
-    """Fetch weather data from database and convert to DataFrame"""
-    discrepancy_data = db_helper.get_discrepancy_report(threshold=0.0)
-    return pd.DataFrame(discrepancy_data)
+def get_weather_data(filters):
+    """Fetch filtered weather data aggregated per city and time bucket and convert to DataFrame"""
+    db_helper = get_db_helper()
+    extent = db_helper.get_data_extent(**filters)
+    bucket_seconds = choose_bucket_seconds(
+        extent['row_count'], extent['span_seconds'], extent['city_count'], MAX_SCATTER_POINTS
+    )
+    batch = db_helper.get_aggregated_observations(bucket_seconds, **filters)
+    # The numeric columns are views on the batch's arrays, not per-row copies
+    df = batch.to_dataframe().rename(columns={'timestamp': 'bucket'})[WEATHER_COLUMNS]
+    return downsample(df, MAX_SCATTER_POINTS)
+
+def build_comparison_scatter(df, x, y, title, labels):
+    """Build a web vs API scatter plot, switching to WebGL for large series"""
+    # pandas and plotly.express are loaded by the first figure, not at import, so workers start quickly
+    import plotly.express as px
+    render_mode = scatter_render_mode(len(df), WEBGL_THRESHOLD)
+    fig = px.scatter(
+        df,
+        x=x,
+        y=y,
+        hover_name='city',
+        hover_data=['bucket', 'samples'],
+        title=title,
+        labels=labels,
+        render_mode=render_mode
+    )
+    
+    # Add perfect correlation line
+    line_trace = go.Scattergl if render_mode == 'webgl' else go.Scatter
+    fig.add_trace(
+        line_trace(
+            x=[df[x].min(), df[x].max()],
+            y=[df[x].min(), df[x].max()],
+            mode='lines',
+            name='Perfect Correlation',
+            line=dict(dash='dash', color='red')
+        )
+    )
+    
+    return fig
 
 # Layout
 app.layout = html.Div([
     html.H1('Weather Data Analysis Dashboard', style={'textAlign': 'center'}),
     
+    # Filters
+    html.Div([
+        html.Div([
+            html.Label('Date Range'),
+            dcc.DatePickerRange(id='date-range', clearable=True)
+        ], className='filter'),
+        html.Div([
+            html.Label('Cities'),
+            dcc.Dropdown(id='city-filter', multi=True, placeholder='All cities')
+        ], className='filter city-filter'),
+        html.Div([
+            html.Label('Min Difference (°C)'),
+            dcc.Input(id='threshold-filter', type='number', min=0, step=0.5, value=0)
+        ], className='filter')
+    ], className='filters-container'),
+    
     # Summary Statistics Cards
     html.Div([
         html.Div([
@@ -65,69 +192,97 @@ app.layout = html.Div([
     )
 ])
 
+# Every view refreshes on the interval and whenever a filter changes
+FILTER_INPUTS = [
+    Input('interval-component', 'n_intervals'),
+    Input('date-range', 'start_date'),
+    Input('date-range', 'end_date'),
+    Input('city-filter', 'value'),
+    Input('threshold-filter', 'value')
+]
+
 # Callbacks
+@app.callback(
+    Output('city-filter', 'options'),
+    [Input('interval-component', 'n_intervals')]
+)
+@profiled('update_city_options')
+def update_city_options(n):
+    return cached('city-options', build_city_options)
+
+def build_city_options(filters):
+    return [{'label': city, 'value': city} for city in get_db_helper().get_cities()]
+
 @app.callback(
     [Output('mean-diff', 'children'),
      Output('max-diff', 'children'),
      Output('min-diff', 'children')],
-    [Input('interval-component', 'n_intervals')]
+    FILTER_INPUTS
 )
-def update_stats(n):
-    stats = db_helper.get_summary_stats()
+@profiled('update_stats')
+def update_stats(n, start_date, end_date, cities, threshold):
+    return cached('summary-stats', build_stats, build_filters(start_date, end_date, cities, threshold))
+
+def build_stats(filters):
+    stats = get_db_helper().get_summary_stats(**filters)
     return (
-        f"{stats['mean_discrepancy']:.1f}°C",
-        f"{stats['max_discrepancy']:.1f}°C",
-        f"{stats['min_discrepancy']:.1f}°C"
+        format_temperature(stats['mean_discrepancy']),
+        format_temperature(stats['max_discrepancy']),
+        format_temperature(stats['min_discrepancy'])
     )
 
 @app.callback(
     Output('temp-scatter', 'figure'),
-    [Input('interval-component', 'n_intervals')]
+    FILTER_INPUTS
 )
-def update_scatter(n):
-    df = get_weather_data()
-    fig = px.scatter(
+@profiled('update_scatter')
+def update_scatter(n, start_date, end_date, cities, threshold):
+    return cached('temp-scatter', build_scatter_figure, build_filters(start_date, end_date, cities, threshold))
+
+def build_scatter_figure(filters):
+    df = get_weather_data(filters)
+    return fit_to_budget(
+        lambda data: build_comparison_scatter(
+            data,
+            x='temperature_web',
+            y='temperature_api',
+            title='Web vs API Temperature Comparison',
+            labels={
+                'temperature_web': 'Web Temperature (°C)',
+                'temperature_api': 'API Temperature (°C)'
+            }
+        ),
         df,
-        x='temperature_web',
-        y='temperature_api',
-        hover_name='city',
-        title='Web vs API Temperature Comparison',
-        labels={
-            'temperature_web': 'Web Temperature (°C)',
-            'temperature_api': 'API Temperature (°C)'
-        }
+        MAX_FIGURE_BYTES
     )
-    
-    # Add perfect correlation line
-    fig.add_trace(
-        go.Scatter(
-            x=[df['temperature_web'].min(), df['temperature_web'].max()],
-            y=[df['temperature_web'].min(), df['temperature_web'].max()],
-            mode='lines',
-            name='Perfect Correlation',
-            line=dict(dash='dash', color='red')
-        )
-    )
-    
-    return fig
 
 @app.callback(
     Output('discrepancy-bar', 'figure'),
-    [Input('interval-component', 'n_intervals')]
+    FILTER_INPUTS
 )
-def update_discrepancy_bar(n):
-    df = get_weather_data()
-    df['abs_discrepancy'] = df['discrepancy'].abs()
-    df = df.sort_values('abs_discrepancy', ascending=False)
+@profiled('update_discrepancy_bar')
+def update_discrepancy_bar(n, start_date, end_date, cities, threshold):
+    return cached('discrepancy-bar', build_discrepancy_bar_figure, build_filters(start_date, end_date, cities, threshold))
+
+def build_discrepancy_bar_figure(filters):
+    import pandas as pd
+    import plotly.express as px
+    # One bar per city, aggregated in the database and already sorted worst first
+    df = pd.DataFrame(
+        get_db_helper().get_city_discrepancy_summary(**filters),
+        columns=['city', 'mean_discrepancy', 'max_discrepancy', 'samples']
+    ).head(MAX_BAR_CITIES)
     
     fig = px.bar(
         df,
         x='city',
-        y='abs_discrepancy',
+        y='mean_discrepancy',
+        hover_data=['max_discrepancy', 'samples'],
         title='Temperature Discrepancies by City',
         labels={
             'city': 'City',
-            'abs_discrepancy': 'Temperature Difference (°C)'
+            'mean_discrepancy': 'Mean Temperature Difference (°C)',
+            'max_discrepancy': 'Max Temperature Difference (°C)'
         }
     )
     
@@ -135,32 +290,28 @@ def update_discrepancy_bar(n):
 
 @app.callback(
     Output('feels-like-comparison', 'figure'),
-    [Input('interval-component', 'n_intervals')]
+    FILTER_INPUTS
 )
-def update_feels_like(n):
-    df = get_weather_data()
-    if 'feels_like_web' in df.columns and 'feels_like_api' in df.columns:
-        fig = px.scatter(
+@profiled('update_feels_like')
+def update_feels_like(n, start_date, end_date, cities, threshold):
+    return cached('feels-like-comparison', build_feels_like_figure, build_filters(start_date, end_date, cities, threshold))
+
+def build_feels_like_figure(filters):
+    df = get_weather_data(filters).dropna(subset=['feels_like_web', 'feels_like_api'])
+    if not df.empty:
+        fig = fit_to_budget(
+            lambda data: build_comparison_scatter(
+                data,
+                x='feels_like_web',
+                y='feels_like_api',
+                title='Feels Like Temperature Comparison',
+                labels={
+                    'feels_like_web': 'Web Feels Like (°C)',
+                    'feels_like_api': 'API Feels Like (°C)'
+                }
+            ),
             df,
-            x='feels_like_web',
-            y='feels_like_api',
-            hover_name='city',
-            title='Feels Like Temperature Comparison',
-            labels={
-                'feels_like_web': 'Web Feels Like (°C)',
-                'feels_like_api': 'API Feels Like (°C)'
-            }
-        )
-        
-        # Add perfect correlation line
-        fig.add_trace(
-            go.Scatter(
-                x=[df['feels_like_web'].min(), df['feels_like_web'].max()],
-                y=[df['feels_like_web'].min(), df['feels_like_web'].max()],
-                mode='lines',
-                name='Perfect Correlation',
-                line=dict(dash='dash', color='red')
-            )
+            MAX_FIGURE_BYTES
         )
     else:
         fig = go.Figure()
@@ -175,6 +326,17 @@ def update_feels_like(n):
     
     return fig
 
+def warm_cache():
+    """Precompute every cached view so the first viewers don't pay for it"""
+    for key, compute in [
+        ('city-options', build_city_options),
+        ('summary-stats', build_stats),
+        ('temp-scatter', build_scatter_figure),
+        ('discrepancy-bar', build_discrepancy_bar_figure),
+        ('feels-like-comparison', build_feels_like_figure)
+    ]:
+        cached(key, compute)
+
 # Add CSS
 app.index_string = '''
 <!DOCTYPE html>
@@ -185,6 +347,19 @@ app.index_string = '''
         {%favicon%}
         {%css%}
         <style>
+            .filters-container {
+                display: flex;
+                gap: 20px;
+                align-items: flex-end;
+                margin: 20px 0;
+            }
+            .filter label {
+                display: block;
+                margin-bottom: 5px;
+            }
+            .city-filter {
+                flex: 1;
+            }
             .stats-container {
                 display: flex;
                 justify-content: space-around;
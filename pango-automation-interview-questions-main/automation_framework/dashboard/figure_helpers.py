@@ -0,0 +1,52 @@
+import math
+import plotly.io as pio
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Bucket sizes (seconds) the dashboard aggregates history into, smallest first
+BUCKET_STEPS = [60, 300, 900, 3600, 3 * 3600, 6 * 3600, 12 * 3600, 86400, 7 * 86400]
+
+def choose_bucket_seconds(row_count: int, span_seconds: int, city_count: int, max_points: int) -> int:
+    """Pick the smallest time bucket that keeps the aggregated point count under max_points."""
+    if row_count <= max_points or span_seconds <= 0:
+        return 1
+    buckets_per_city = max(max_points // max(city_count, 1), 1)
+    needed = math.ceil(span_seconds / buckets_per_city)
+    for step in BUCKET_STEPS:
+        if step >= needed:
+            return step
+    return BUCKET_STEPS[-1] * math.ceil(needed / BUCKET_STEPS[-1])
+
+def downsample(df: 'pd.DataFrame', max_points: int, keep_column: str = 'discrepancy') -> 'pd.DataFrame':
+    """Reduce df to at most max_points rows.
+
+    The rows with the largest keep_column values are always kept so outliers
+    stay visible; the remaining budget is filled with an even stride over the rest.
+    """
+    if len(df) <= max_points:
+        return df
+    max_points = max(max_points, 1)
+    keep_count = max_points // 10 if keep_column in df.columns else 0
+    kept = df.nlargest(keep_count, keep_column) if keep_count else df.iloc[0:0]
+    rest = df.drop(kept.index)
+    stride = math.ceil(len(rest) / (max_points - keep_count))
+    import pandas as pd
+    return pd.concat([kept, rest.iloc[::stride]]).sort_index()
+
+def scatter_render_mode(point_count: int, webgl_threshold: int) -> str:
+    """Return the plotly render mode for a scatter series of point_count points."""
+    return 'webgl' if point_count > webgl_threshold else 'svg'
+
+def figure_size(fig) -> int:
+    """Return the serialized JSON size of a figure in bytes."""
+    return len(pio.to_json(fig, validate=False))
+
+def fit_to_budget(build_figure: Callable, df: 'pd.DataFrame', max_bytes: int, min_points: int = 100):
+    """Build a figure from df, halving the data until its payload fits max_bytes."""
+    fig = build_figure(df)
+    while figure_size(fig) > max_bytes and len(df) > min_points:
+        df = downsample(df, max(len(df) // 2, min_points))
+        fig = build_figure(df)
+    return fig
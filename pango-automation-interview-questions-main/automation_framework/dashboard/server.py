@@ -0,0 +1,46 @@
+import multiprocessing
+
+def default_worker_count() -> int:
+    """Return the gunicorn-recommended worker count for this host."""
+    return multiprocessing.cpu_count() * 2 + 1
+
+def run_production(host: str = "0.0.0.0", port: int = 8050, workers: int = None, threads: int = 4, timeout: int = 120):
+    """Serve the dashboard with gunicorn using several worker processes.
+
+    The app is loaded once in the master process and the figure cache is
+    warmed before forking; workers then share precomputed figures through
+    the on-disk cache and open their own database connections lazily.
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise RuntimeError(
+            "Production mode requires gunicorn. Install it with: pip install -e .[production]"
+        )
+
+    from automation_framework.dashboard.app import app, warm_cache
+
+    class DashboardApplication(BaseApplication):
+        def __init__(self, application, options):
+            self.application = application
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+    warm_cache()
+
+    options = {
+        'bind': f"{host}:{port}",
+        'workers': workers or default_worker_count(),
+        'threads': threads,
+        'worker_class': 'gthread',
+        'timeout': timeout,
+        'preload_app': True
+    }
+    DashboardApplication(app.server, options).run()
@@ -0,0 +1,4 @@
+"""Local stand-ins for timeanddate.com and OpenWeatherMap, for load tests and offline CI."""
+from automation_framework.fake_servers.base import FaultConfig, FakeServer, synthetic_weather
+from automation_framework.fake_servers.timeanddate import FakeTimeAndDateServer
+from automation_framework.fake_servers.openweathermap import FakeOpenWeatherMapServer
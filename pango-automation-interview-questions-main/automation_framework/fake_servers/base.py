@@ -0,0 +1,164 @@
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+class FaultConfig:
+    """Latency, error and throttling behaviour of a fake server.
+
+    Args:
+        latency_ms: Base delay added to every response
+        jitter_ms: Extra random delay of up to this many milliseconds
+        error_rate: Fraction of requests answered with a 500
+        requests_per_second: Requests above this rate are throttled; None disables throttling
+        seed: Seed for the random latency and errors, for repeatable runs
+    """
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0.0,
+                 requests_per_second: Optional[float] = None, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.requests_per_second = requests_per_second
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = requests_per_second or 0
+        self._refilled_at = time.monotonic()
+
+    def delay(self) -> float:
+        """Seconds to wait before answering."""
+        with self._lock:
+            jitter = self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0
+        return (self.latency_ms + jitter) / 1000
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self.error_rate > 0 and self._random.random() < self.error_rate
+
+    def should_throttle(self) -> bool:
+        """Token bucket with one second of burst; True when the request is over the rate."""
+        if not self.requests_per_second:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.requests_per_second,
+                               self._tokens + (now - self._refilled_at) * self.requests_per_second)
+            self._refilled_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return False
+            return True
+
+def synthetic_weather(city: str, source: str = '') -> dict:
+    """Deterministic weather for any city name, drifting slowly over the day.
+
+    Each city gets its own climate from a hash of its name, so the same city
+    always looks alike across runs. source adds a small per-source bias so the
+    two fake upstreams disagree the way the real ones do.
+    """
+    digest = hashlib.sha256(city.lower().encode('utf-8')).digest()
+    base = digest[0] / 255 * 35 - 5          # -5 to 30 °C
+    amplitude = 2 + digest[1] / 255 * 6      # daily swing
+    phase = digest[2] / 255 * 2 * math.pi
+    hours = time.time() / 3600
+    temperature = base + amplitude * math.sin(2 * math.pi * hours / 24 + phase)
+    if source:
+        bias = hashlib.sha256(f"{source}:{city.lower()}".encode('utf-8')).digest()[0]
+        temperature += (bias / 255 - 0.5) * 3
+    feels_like = temperature - digest[3] / 255 * 4
+    return {'temperature': round(temperature, 1), 'feels_like': round(feels_like, 1)}
+
+class FakeRequestHandler(BaseHTTPRequestHandler, ABC):
+    """Applies the server's FaultConfig, then hands over to handle_request()."""
+
+    # Status sent for throttled requests
+    throttle_status = 429
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        faults = self.server.faults
+        self.server.count_request()
+        delay = faults.delay()
+        if delay:
+            time.sleep(delay)
+        if faults.should_throttle():
+            self.send_body(self.throttle_status, 'Too many requests', 'text/plain', {'Retry-After': '1'})
+        elif faults.should_fail():
+            self.send_body(500, 'Internal server error', 'text/plain')
+        else:
+            self.handle_request()
+
+    @abstractmethod
+    def handle_request(self):
+        """Answer a request that no fault intercepted."""
+
+    def send_body(self, status: int, body: str, content_type: str, headers: Optional[dict] = None):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_json(self, status: int, payload: dict):
+        self.send_body(status, json.dumps(payload), 'application/json')
+
+class FakeServer:
+    """A fake upstream running on a background thread.
+
+    Use it as a context manager, or call start() and stop(). Port 0 picks a free port.
+    """
+
+    handler_class = FakeRequestHandler
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, faults: Optional[FaultConfig] = None):
+        self.httpd = ThreadingHTTPServer((host, port), self.handler_class)
+        self.httpd.daemon_threads = True
+        self.httpd.faults = faults or FaultConfig()
+        self.httpd.request_count = 0
+        self.httpd.count_lock = threading.Lock()
+        self.httpd.count_request = self._count_request
+        self._thread = None
+
+    def _count_request(self):
+        with self.httpd.count_lock:
+            self.httpd.request_count += 1
+
+    @property
+    def request_count(self) -> int:
+        return self.httpd.request_count
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'FakeServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        if self._thread:
+            self.httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,103 @@
+import hashlib
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit, parse_qs
+from automation_framework.fake_servers.base import FakeRequestHandler, FakeServer, FaultConfig, synthetic_weather
+
+def convert(celsius: float, units: str) -> float:
+    """Convert to the unit system OpenWeatherMap would answer in."""
+    if units == 'metric':
+        return celsius
+    if units == 'imperial':
+        return round(celsius * 9 / 5 + 32, 2)
+    return round(celsius + 273.15, 2)
+
+class OpenWeatherMapHandler(FakeRequestHandler):
+
+    def handle_request(self):
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if not query.get('appid'):
+            self.send_json(401, {'cod': 401, 'message': 'Invalid API key.'})
+            return
+        units = query.get('units', 'standard')
+
+        if url.path == '/data/2.5/weather':
+            if 'id' in query:
+                city_id = self._parse_id(query['id'])
+                if city_id is None:
+                    self.send_json(400, {'cod': '400', 'message': f"{query['id']} is not a city ID"})
+                    return
+                name = self.server.city_names.get(city_id, f"City {city_id}")
+            elif query.get('q'):
+                # "London,GB" style queries carry a country code we do not need
+                name = query['q'].split(',')[0].strip()
+                city_id = None
+            else:
+                self.send_json(400, {'cod': '400', 'message': 'Nothing to geocode'})
+                return
+            self.send_json(200, self._city_payload(name, city_id, units))
+
+        elif url.path == '/data/2.5/group':
+            ids = [self._parse_id(value) for value in query.get('id', '').split(',') if value]
+            if not ids or None in ids or len(ids) > 20:
+                self.send_json(400, {'cod': '400', 'message': 'id must list 1 to 20 city IDs'})
+                return
+            cities = [self._city_payload(self.server.city_names.get(city_id, f"City {city_id}"), city_id, units)
+                      for city_id in ids]
+            self.send_json(200, {'cnt': len(cities), 'list': cities})
+
+        else:
+            self.send_json(404, {'cod': '404', 'message': 'Internal error'})
+
+    @staticmethod
+    def _parse_id(value: str) -> Optional[int]:
+        try:
+            return int(value)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _synthetic_id(name: str) -> int:
+        return int(hashlib.sha256(name.lower().encode('utf-8')).hexdigest()[:6], 16)
+
+    def _city_payload(self, name: str, city_id: Optional[int], units: str) -> dict:
+        weather = synthetic_weather(name, 'api')
+        temp = convert(weather['temperature'], units)
+        return {
+            'coord': {'lon': 0.0, 'lat': 0.0},
+            'weather': [{'id': 800, 'main': 'Clear', 'description': 'clear sky', 'icon': '01d'}],
+            'main': {
+                'temp': temp,
+                'feels_like': convert(weather['feels_like'], units),
+                'temp_min': temp,
+                'temp_max': temp,
+                'pressure': 1013,
+                'humidity': 60
+            },
+            'dt': int(time.time()),
+            'id': city_id if city_id is not None else self._synthetic_id(name),
+            'name': name,
+            'cod': 200
+        }
+
+class FakeOpenWeatherMapServer(FakeServer):
+    """Serves OpenWeatherMap-style /data/2.5/weather and /data/2.5/group responses for any city.
+
+    Args:
+        city_names: Optional OpenWeatherMap ID -> city name map for id= queries;
+            unknown IDs are answered as "City <id>"
+
+    Point ApiHelper at it with base_url=server.weather_url.
+    """
+
+    handler_class = OpenWeatherMapHandler
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, faults: Optional[FaultConfig] = None,
+                 city_names: Optional[Dict[int, str]] = None):
+        super().__init__(host, port, faults)
+        self.httpd.city_names = city_names or {}
+
+    @property
+    def weather_url(self) -> str:
+        return f"{self.url}/data/2.5/weather"
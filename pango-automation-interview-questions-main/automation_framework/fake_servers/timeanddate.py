@@ -0,0 +1,117 @@
+import html
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit, unquote
+from automation_framework.fake_servers.base import FakeRequestHandler, FakeServer, FaultConfig, synthetic_weather
+from automation_framework.utilities.city_list import DEFAULT_CITIES
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head><title>Weather for {name}, {country}</title></head>
+<body>
+<header><h1>Weather in {name}, {country}</h1></header>
+<main>
+<section id="qlook" class="bk-focus__qlook">
+<div id="wt-temp" class="h2">{temperature} °C</div>
+<p>{conditions}.<br>Feels Like: <span id="wt-feels">{feels_like} °C</span></p>
+</section>
+<table class="table table--left table--inner-borders-rows">
+<tr><th>Location:</th><td>{name}</td></tr>
+<tr><th>Current Time:</th><td>{time}</td></tr>
+</table>
+</main>
+</body>
+</html>
+"""
+
+LISTING_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head><title>{title}</title></head>
+<body>
+<h1>{title}</h1>
+<table class="zebra fw tb-wt zebra va-m">
+<tbody>
+{rows}
+</tbody>
+</table>
+</body>
+</html>
+"""
+
+# Cities per table row on overview pages, as on timeanddate.com
+LISTING_COLUMNS = 3
+
+CONDITIONS = ["Sunny", "Partly sunny", "Passing clouds", "Overcast", "Light rain", "Fog"]
+
+def name_from_slug(slug: str) -> str:
+    """'new-york' -> 'New York'."""
+    return ' '.join(word.capitalize() for word in unquote(slug).split('-'))
+
+class TimeAndDateHandler(FakeRequestHandler):
+    throttle_status = 503
+
+    def handle_request(self):
+        parts = [part for part in urlsplit(self.path).path.split('/') if part]
+        if not parts or parts[0] != 'weather' or len(parts) > 3:
+            self.send_body(404, '<h1>Page not found</h1>', 'text/html')
+            return
+        if len(parts) == 1:
+            self.send_listing("World Temperatures", self.server.listed_cities[:self.server.index_size])
+            return
+        if len(parts) == 2:
+            cities = [(name, country) for name, country in self.server.listed_cities if country == parts[1]]
+            if not cities:
+                self.send_body(404, '<h1>Page not found</h1>', 'text/html')
+                return
+            self.send_listing(f"Weather in {name_from_slug(parts[1])}", cities)
+            return
+        country, name = name_from_slug(parts[1]), name_from_slug(parts[2])
+        weather = synthetic_weather(name, 'web')
+        conditions = CONDITIONS[int(abs(weather['temperature']) * 10) % len(CONDITIONS)]
+        page = PAGE_TEMPLATE.format(
+            name=html.escape(name),
+            country=html.escape(country),
+            temperature=weather['temperature'],
+            feels_like=weather['feels_like'],
+            conditions=conditions,
+            time=self.date_time_string()
+        )
+        self.send_body(200, page, 'text/html')
+
+    def send_listing(self, title: str, cities: List[Tuple[str, str]]):
+        """Overview table with several cities per row: name link, local time, icon, temperature."""
+        cells = []
+        for name, country in cities:
+            slug = name.lower().replace(' ', '-')
+            weather = synthetic_weather(name, 'web')
+            cells.append(
+                f'<td><a href="/weather/{country}/{slug}">{html.escape(name)}</a></td>'
+                f'<td class="r">{self.date_time_string()[:11]}</td>'
+                f'<td class="r"><img src="/img/wt/1.png" alt="" width="25" height="25"></td>'
+                f'<td class="rbi">{weather["temperature"]} °C</td>'
+            )
+        rows = '\n'.join(f"<tr>{''.join(cells[i:i + LISTING_COLUMNS])}</tr>"
+                         for i in range(0, len(cells), LISTING_COLUMNS))
+        self.send_body(200, LISTING_TEMPLATE.format(title=html.escape(title), rows=rows), 'text/html')
+
+class FakeTimeAndDateServer(FakeServer):
+    """Serves timeanddate.com-style weather pages at /weather/<country>/<city> for any city.
+
+    Overview pages list current temperatures for many cities: /weather/ shows
+    the first index_size of listed_cities and /weather/<country> shows every
+    listed city in that country. Cities that are not listed are only reachable
+    through their own page.
+
+    Point WebHelper at it with base_url=server.base_url.
+    """
+
+    handler_class = TimeAndDateHandler
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, faults: Optional[FaultConfig] = None,
+                 listed_cities: Optional[List[Tuple[str, str]]] = None, index_size: Optional[int] = None):
+        super().__init__(host, port, faults)
+        self.httpd.listed_cities = list(listed_cities if listed_cities is not None else DEFAULT_CITIES)
+        self.httpd.index_size = index_size
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.url}/weather/"
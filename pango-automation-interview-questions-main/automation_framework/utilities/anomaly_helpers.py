@@ -0,0 +1,112 @@
+import math
+from typing import Any, Dict, Optional
+
+class RunningStats:
+    """Constant-memory running statistics for one stream of values.
+
+    Keeps Welford's count, mean and sum of squared deviations for the
+    long-run mean and variance, and an exponentially weighted mean and
+    variance (EWMA) that follow recent values. Two RunningStats over
+    disjoint streams can be merged, e.g. stats kept by separate collectors.
+    """
+    __slots__ = ('count', 'mean', 'm2', 'ewma', 'ewm_var', 'alpha')
+
+    def __init__(self, alpha: float = 0.1, count: int = 0, mean: float = 0.0, m2: float = 0.0,
+                 ewma: float = 0.0, ewm_var: float = 0.0):
+        self.alpha = alpha
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.ewma = ewma
+        self.ewm_var = ewm_var
+
+    def update(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.count == 1:
+            self.ewma = value
+            self.ewm_var = 0.0
+        else:
+            diff = value - self.ewma
+            increment = self.alpha * diff
+            self.ewma += increment
+            self.ewm_var = (1 - self.alpha) * (self.ewm_var + diff * increment)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance of every value seen."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.variance)
+
+    @property
+    def ewm_stddev(self) -> float:
+        return math.sqrt(self.ewm_var)
+
+    def merge(self, other: 'RunningStats') -> 'RunningStats':
+        """Return the statistics of both streams together.
+
+        The Welford part is exact (Chan et al.'s parallel update). The EWMA
+        part cannot be combined exactly, so it is weighted by the counts.
+        """
+        count = self.count + other.count
+        if not count:
+            return RunningStats(self.alpha)
+        delta = other.mean - self.mean
+        return RunningStats(
+            self.alpha,
+            count=count,
+            mean=self.mean + delta * other.count / count,
+            m2=self.m2 + other.m2 + delta * delta * self.count * other.count / count,
+            ewma=(self.ewma * self.count + other.ewma * other.count) / count,
+            ewm_var=(self.ewm_var * self.count + other.ewm_var * other.count) / count
+        )
+
+    def to_dict(self) -> Dict[str, float]:
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2, 'ewma': self.ewma, 'ewm_var': self.ewm_var}
+
+class AnomalyDetector:
+    """Flag web/API discrepancies that break from a city's recent behaviour.
+
+    Each city's signed discrepancy (web - api) is compared with its EWMA
+    before the value is added, so a spike cannot hide itself. A city that
+    is always a few degrees off is not flagged; a sudden jump is.
+
+    Args:
+        z_threshold: How many EWMA standard deviations away counts as anomalous
+        min_samples: Readings a city needs before it can be flagged
+        alpha: EWMA weight of the newest reading
+        min_stddev: Floor for the standard deviation (°C), so a city with
+            near-identical readings is not flagged for a tenth of a degree
+    """
+
+    def __init__(self, z_threshold: float = 3.0, min_samples: int = 10, alpha: float = 0.1,
+                 min_stddev: float = 0.5):
+        self.z_threshold = z_threshold
+        self.min_samples = min_samples
+        self.alpha = alpha
+        self.min_stddev = min_stddev
+
+    def new_stats(self) -> RunningStats:
+        return RunningStats(self.alpha)
+
+    def observe(self, stats: RunningStats, discrepancy: float) -> Optional[Dict[str, Any]]:
+        """Score discrepancy against stats, add it to them and return an alert if it is anomalous."""
+        alert = None
+        if stats.count >= self.min_samples:
+            stddev = max(stats.ewm_stddev, self.min_stddev)
+            zscore = (discrepancy - stats.ewma) / stddev
+            if abs(zscore) > self.z_threshold:
+                alert = {
+                    'discrepancy': discrepancy,
+                    'expected': stats.ewma,
+                    'stddev': stddev,
+                    'zscore': zscore,
+                    'samples': stats.count
+                }
+        stats.update(discrepancy)
+        return alert
@@ -1,28 +1,126 @@
-import requests
-from typing import Optional, Dict, Any
+import time
+from typing import TYPE_CHECKING, Optional, Dict, Any
+from automation_framework.utilities.deadline_helpers import Deadline, DeadlineExceeded
+from automation_framework.utilities.resilience_helpers import CircuitBreaker, LatencyTracker, get_circuit_breaker
+from automation_framework.utilities.metrics_helpers import get_metrics
+from automation_framework.utilities.observations import Reading
+
+if TYPE_CHECKING:
+    import requests
 
 class ApiHelper:
-    def __init__(self, api_key: str):
-        self.base_url = "https://api.openweathermap.org/data/2.5/weather"
+    def __init__(self, api_key: str, rate_limiter=None, registry=None,
+                 circuit_breaker: Optional[CircuitBreaker] = None, hedge: bool = False,
+                 base_url: str = "https://api.openweathermap.org/data/2.5/weather"):
+        self.base_url = base_url
         self.api_key = api_key
+        self.timeout = 10  # seconds per request
+        # Optional RateLimiter shared with other helpers to cap total requests per minute
+        self.rate_limiter = rate_limiter
+        # Optional CityRegistry; cities with a known OpenWeatherMap ID are queried by ID
+        self.registry = registry
+        # Fail fast while OpenWeatherMap keeps failing instead of waiting out every timeout
+        self.circuit_breaker = circuit_breaker or get_circuit_breaker('openweathermap')
+        # Hedged requests: send a duplicate once a call runs past the recent p95 latency
+        self.hedge = hedge
+        self.hedge_delay = 1.0  # seconds, used until enough latencies are recorded
+        self.hedge_min_samples = 20
+        self.latencies = LatencyTracker()
+        self._executor = None
     
-    def get_weather_data(self, city: str) -> Optional[Dict[str, Any]]:
-        """Get weather data from OpenWeatherMap API."""
+    def _get(self, params: Dict[str, Any], timeout: float) -> 'requests.Response':
+        """Send one request and record its latency."""
+        # requests is imported on first use, which keeps it out of main.py's startup
+        import requests
+        started = time.monotonic()
+        response = requests.get(self.base_url, params=params, timeout=timeout)
+        elapsed = time.monotonic() - started
+        self.latencies.record(elapsed)
+        get_metrics().observe('weather_api_request_seconds', elapsed)
+        get_metrics().inc('weather_api_requests_total', status=response.status_code)
+        return response
+
+    def _get_hedged(self, params: Dict[str, Any], timeout: float) -> 'requests.Response':
+        """Send a request and, if it is slower than the p95 latency, a duplicate; the first success wins."""
+        from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+        import requests
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='api-hedge')
+        p95 = self.latencies.percentile(95) if len(self.latencies) >= self.hedge_min_samples else None
+        delay = min(p95 if p95 is not None else self.hedge_delay, timeout)
+
+        pending = {self._executor.submit(self._get, params, timeout)}
+        done, _ = wait(pending, timeout=delay)
+        # Only hedge when the rate budget allows it right now
+        if not done and (not self.rate_limiter or self.rate_limiter.try_acquire()):
+            pending.add(self._executor.submit(self._get, params, timeout))
+            get_metrics().inc('weather_api_hedged_requests_total')
+
+        error, fallback = None, None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except requests.RequestException as e:
+                    error = e
+                    continue
+                if response.status_code < 500:
+                    return response
+                fallback = response
+        if fallback is not None:
+            return fallback
+        raise error
+
+    def get_weather_data(self, city: str, deadline: Optional[Deadline] = None) -> Optional[Reading]:
+        """Get weather data from OpenWeatherMap API, giving up when the deadline passes.
+
+        Returns None straight away while the API's circuit breaker is open.
+        """
+        import requests
+        deadline = deadline or Deadline()
+        metrics = get_metrics()
+        if not self.circuit_breaker.allow_request():
+            metrics.inc('weather_api_failures_total', reason='circuit_open')
+            return None
         try:
             params = {
-                'q': city,
                 'appid': self.api_key,
                 'units': 'metric'  # Get temperature in Celsius
             }
-            response = requests.get(self.base_url, params=params)
+            record = self.registry.get(city) if self.registry is not None else None
+            if record and record.owm_id:
+                params['id'] = record.owm_id
+            else:
+                params['q'] = city
+            if self.rate_limiter and not self.rate_limiter.acquire(timeout=deadline.remaining()):
+                raise DeadlineExceeded("Deadline exceeded waiting for the rate limiter")
+            timeout = deadline.timeout(self.timeout)
+            if self.hedge:
+                response = self._get_hedged(params, timeout)
+            else:
+                response = self._get(params, timeout)
+            # Server errors and throttling count against the upstream; a 404 for an unknown city does not
+            if response.status_code >= 500 or response.status_code == 429:
+                self.circuit_breaker.record_failure()
+            else:
+                self.circuit_breaker.record_success()
             response.raise_for_status()
             
             data = response.json()
-            return {
-                'temperature': data['main']['temp'],
-                'feels_like': data['main']['feels_like']
-            }
+            return Reading(city, data['main']['temp'], data['main']['feels_like'], source='api')
+        except requests.HTTPError:
+            metrics.inc('weather_api_failures_total', reason='http_status')
+            return None
+        except requests.RequestException:
+            self.circuit_breaker.record_failure()
+            metrics.inc('weather_api_failures_total', reason='transport')
+            return None
+        except DeadlineExceeded:
+            metrics.inc('weather_api_failures_total', reason='deadline')
+            return None
         except Exception:
+            metrics.inc('weather_api_failures_total', reason='bad_response')
             return None
     
     def get_weather_data_batch(self, cities: list) -> list:
@@ -0,0 +1,118 @@
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Next to the reports rather than in a shared temp directory, where another user could plant the file
+DEFAULT_CACHE_PATH = os.path.join("reports", "dashboard_cache.db")
+
+def _encode(value: Any) -> Dict[str, str]:
+    """JSON fallback for plotly figures, which serialise themselves."""
+    if hasattr(value, 'to_plotly_json'):
+        return {'__plotly_figure__': value.to_json()}
+    raise TypeError(f"{type(value).__name__} values cannot be cached")
+
+def _decode(obj: Dict[str, Any]) -> Any:
+    if '__plotly_figure__' in obj:
+        import plotly.io
+        return plotly.io.from_json(obj['__plotly_figure__'])
+    return obj
+
+class CacheHelper:
+    """Disk-backed key/value cache shared by every process on the host.
+
+    Entries are stored in a small SQLite file in WAL mode, so dashboard worker
+    processes can read each other's results concurrently. Each entry carries a
+    version (e.g. the newest row id in weather_data) and is recomputed when the
+    caller's current version differs or when it is older than ttl seconds.
+
+    Versions are only comparable within one data source, so callers caching
+    results from different databases in one file give each its own
+    namespace (e.g. the database path); namespaces never see each other's
+    entries.
+
+    Values are stored as JSON, never pickled, so whoever can write the cache
+    file cannot make readers run code. Plotly figures are supported; tuples
+    come back as lists.
+    """
+
+    def __init__(self, cache_path: str = DEFAULT_CACHE_PATH, ttl: float = 300, namespace: str = ''):
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.namespace = namespace
+        cache_dir = os.path.dirname(cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self._create_tables()
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}|{key}" if self.namespace else key
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.cache_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _create_tables(self):
+        """Create the cache table if it doesn't exist."""
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    version TEXT,
+                    created_at REAL NOT NULL,
+                    value BLOB NOT NULL
+                )
+            """)
+
+    def get(self, key: str, version: Optional[str] = None) -> Optional[Any]:
+        """Return the cached value for key, or None if missing, stale or from another version."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT version, created_at, value FROM cache_entries WHERE key = ?",
+                (self._key(key),)
+            ).fetchone()
+        if row is None:
+            return None
+        cached_version, created_at, value = row
+        if version is not None and cached_version != str(version):
+            return None
+        if self.ttl is not None and time.time() - created_at > self.ttl:
+            return None
+        try:
+            return json.loads(value, object_hook=_decode)
+        except ValueError:
+            # Not JSON, e.g. pickled by an older version: recompute it
+            return None
+
+    def set(self, key: str, value: Any, version: Optional[str] = None):
+        """Store value under key."""
+        with self._connect() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO cache_entries (key, version, created_at, value)
+                VALUES (?, ?, ?, ?)
+            """, (
+                self._key(key),
+                None if version is None else str(version),
+                time.time(),
+                json.dumps(value, default=_encode)
+            ))
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], version: Optional[str] = None) -> Any:
+        """Return the cached value for key, computing and storing it on a miss."""
+        value = self.get(key, version)
+        if value is None:
+            value = compute()
+            self.set(key, value, version)
+        return value
+
+    def clear(self):
+        """Remove every cached entry in this namespace."""
+        with self._connect() as conn:
+            if self.namespace:
+                prefix = self._key('')
+                conn.execute("DELETE FROM cache_entries WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+            else:
+                conn.execute("DELETE FROM cache_entries")
@@ -1,23 +1,27 @@
+# Seed data for the city registry: each city with its timeanddate.com country slug.
+# Larger city lists are loaded with CityRegistry.import_csv instead of being added here.
+DEFAULT_CITIES = [
+    ("London", "uk"),
+    ("Paris", "france"),
+    ("New York", "usa"),
+    ("Tokyo", "japan"),
+    ("Sydney", "australia"),
+    ("Berlin", "germany"),
+    ("Rome", "italy"),
+    ("Madrid", "spain"),
+    ("Moscow", "russia"),
+    ("Dubai", "uae"),
+    ("Singapore", "singapore"),
+    ("Hong Kong", "hong-kong"),
+    ("Toronto", "canada"),
+    ("Seoul", "south-korea"),
+    ("Istanbul", "turkey"),
+    ("Bangkok", "thailand"),
+    ("Amsterdam", "netherlands"),
+    ("Vienna", "austria"),
+    ("Stockholm", "sweden"),
+    ("Cairo", "egypt")
+]
+
 # List of 20 cities for weather data collection
-CITIES = [
-    "London",
-    "Paris",
-    "New York",
-    "Tokyo",
-    "Sydney",
-    "Berlin",
-    "Rome",
-    "Madrid",
-    "Moscow",
-    "Dubai",
-    "Singapore",
-    "Hong Kong",
-    "Toronto",
-    "Seoul",
-    "Istanbul",
-    "Bangkok",
-    "Amsterdam",
-    "Vienna",
-    "Stockholm",
-    "Cairo"
-] 
\ No newline at end of file
+CITIES = [name for name, _ in DEFAULT_CITIES]
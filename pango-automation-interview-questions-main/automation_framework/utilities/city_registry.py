@@ -0,0 +1,134 @@
+import csv
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+from automation_framework.utilities.city_list import DEFAULT_CITIES
+
+class CityRecord:
+    """Everything the collectors need to know about one city."""
+    __slots__ = ('name', 'country_slug', 'url_path', 'owm_id')
+
+    def __init__(self, name: str, country_slug: str, url_path: str, owm_id: Optional[int] = None):
+        self.name = name
+        self.country_slug = country_slug
+        self.url_path = url_path
+        self.owm_id = owm_id
+
+    def __repr__(self):
+        return f"CityRecord({self.name!r}, {self.country_slug!r}, {self.url_path!r}, {self.owm_id!r})"
+
+def default_url_path(name: str, country_slug: str) -> str:
+    """Build the timeanddate.com weather path for a city, e.g. 'uk/london'."""
+    return f"{country_slug}/{name.lower().replace(' ', '-')}"
+
+class CityRegistry:
+    """Single source of truth for the monitored cities, stored in SQLite.
+
+    Each city carries its timeanddate.com country slug and page path and,
+    when known, its OpenWeatherMap city ID. The table is loaded into a dict
+    on first use, so lookups are O(1) however many cities are registered.
+    An empty registry is seeded with city_list.DEFAULT_CITIES.
+    """
+
+    def __init__(self, db_path: str = "data.db"):
+        self.db_path = db_path
+        self._records: Optional[Dict[str, CityRecord]] = None
+        self._create_tables()
+
+    @contextmanager
+    def _connect(self):
+        # Accepts the same 'file:' URIs as DbHelper, so both can share an in-memory database
+        conn = sqlite3.connect(self.db_path, uri=self.db_path.startswith('file:'))
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _create_tables(self):
+        """Create the cities table and seed it if it is empty."""
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cities (
+                    name TEXT PRIMARY KEY COLLATE NOCASE,
+                    country_slug TEXT NOT NULL,
+                    url_path TEXT NOT NULL,
+                    owm_id INTEGER
+                )
+            """)
+            if conn.execute("SELECT COUNT(*) FROM cities").fetchone()[0] == 0:
+                self._upsert(conn, DEFAULT_CITIES)
+
+    def _upsert(self, conn: sqlite3.Connection, rows: Iterable[Tuple]) -> int:
+        records = []
+        for row in rows:
+            name, country_slug = row[0].strip(), row[1].strip()
+            url_path = (row[2] if len(row) > 2 and row[2] else None) or default_url_path(name, country_slug)
+            owm_id = int(row[3]) if len(row) > 3 and row[3] not in (None, '') else None
+            records.append((name, country_slug, url_path, owm_id))
+        conn.executemany("""
+            INSERT INTO cities (name, country_slug, url_path, owm_id) VALUES (?, ?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET
+                country_slug = excluded.country_slug,
+                url_path = excluded.url_path,
+                owm_id = COALESCE(excluded.owm_id, cities.owm_id)
+        """, records)
+        return len(records)
+
+    def _load(self) -> Dict[str, CityRecord]:
+        if self._records is None:
+            with self._connect() as conn:
+                rows = conn.execute("SELECT name, country_slug, url_path, owm_id FROM cities ORDER BY rowid").fetchall()
+            self._records = {row[0].lower(): CityRecord(*row) for row in rows}
+        return self._records
+
+    def reload(self):
+        """Drop the in-memory copy so the next lookup re-reads the table."""
+        self._records = None
+
+    def add_cities(self, rows: Iterable[Tuple]) -> int:
+        """Insert or update cities in one transaction.
+
+        Args:
+            rows: (name, country_slug[, url_path[, owm_id]]) tuples; a missing
+                url_path is derived from the name and country slug
+        """
+        with self._connect() as conn:
+            count = self._upsert(conn, rows)
+        self.reload()
+        return count
+
+    def import_csv(self, path: str) -> int:
+        """Bulk import cities from a CSV file with columns name, country_slug[, url_path][, owm_id].
+
+        Raises:
+            ValueError: naming the line of the first row without a name or
+                country slug, or with an owm_id that is not a number; nothing
+                is imported then
+        """
+        rows = []
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                name, country_slug = (row.get('name') or '').strip(), (row.get('country_slug') or '').strip()
+                owm_id = (row.get('owm_id') or '').strip()
+                if not name or not country_slug:
+                    raise ValueError(f"{path} line {reader.line_num}: name and country_slug are required")
+                if owm_id and not owm_id.isdigit():
+                    raise ValueError(f"{path} line {reader.line_num}: owm_id must be a number, got {owm_id!r}")
+                rows.append((name, country_slug, row.get('url_path'), owm_id))
+        return self.add_cities(rows)
+
+    def get(self, name: str) -> Optional[CityRecord]:
+        """Look up a city by name (case-insensitive)."""
+        return self._load().get(name.lower())
+
+    def get_names(self) -> List[str]:
+        """Get every registered city name, in registration order."""
+        return [record.name for record in self._load().values()]
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self._load()
+
+    def __len__(self) -> int:
+        return len(self._load())
@@ -1,27 +1,130 @@
 import configparser
 import os
+import threading
+
+DEFAULT_CONFIG_FILE = "automation_framework/config/config.ini"
+
+# Environment variables named WEATHER_<SECTION>_<OPTION> override config.ini,
+# e.g. WEATHER_API_API_KEY or WEATHER_REPORT_TEMPERATURE_THRESHOLD
+ENV_PREFIX = "WEATHER_"
+
+_REQUIRED = object()
 
 class ConfigHelper:
-    def __init__(self, config_file="automation_framework/config/config.ini"):
+    """Settings from config.ini, each overridable by an environment variable (see ENV_PREFIX).
+
+    Use get_config() rather than creating one per caller: it shares one
+    instance per file and re-reads the file when it changes.
+    """
+
+    def __init__(self, config_file=DEFAULT_CONFIG_FILE):
+        self.config_file = config_file
+        self.load()
+    
+    def load(self):
+        """(Re-)read the config file."""
+        self._mtime = self._file_mtime()
         self.config = configparser.ConfigParser()
-        self.config.read(config_file)
+        self.config.read(self.config_file)
         
         # Create reports directory if it doesn't exist
         self.report_dir = self.get_report_dir()
         os.makedirs(self.report_dir, exist_ok=True)
     
+    def _file_mtime(self):
+        try:
+            return os.stat(self.config_file).st_mtime_ns
+        except OSError:
+            return None
+    
+    def reload_if_changed(self) -> bool:
+        """Re-read the config file if it was modified since it was last read; return True if it was."""
+        if self._file_mtime() == self._mtime:
+            return False
+        self.load()
+        return True
+    
+    def get(self, section, option, fallback=_REQUIRED):
+        """Get a setting as a string: the environment override, else config.ini, else fallback.
+
+        Without a fallback, a missing setting raises KeyError.
+        """
+        override = os.environ.get(f"{ENV_PREFIX}{section}_{option}".upper())
+        if override is not None:
+            return override
+        if fallback is _REQUIRED:
+            return self.config[section][option]
+        return self.config.get(section, option, fallback=fallback)
+    
     def get_api_key(self):
         """Get the OpenWeatherMap API key."""
-        return self.config['API']['API_KEY']
+        return self.get('API', 'API_KEY')
     
     def get_db_name(self):
         """Get the database name."""
-        return self.config['DB']['DB_NAME']
+        return self.get('DB', 'DB_NAME')
     
     def get_temperature_threshold(self):
         """Get the temperature difference threshold in Celsius."""
-        return float(self.config['REPORT']['TEMPERATURE_THRESHOLD'])
+        return float(self.get('REPORT', 'TEMPERATURE_THRESHOLD'))
     
     def get_report_dir(self):
         """Get the directory for storing reports."""
-        return self.config['REPORT']['REPORT_DIR'] 
\ No newline at end of file
+        return self.get('REPORT', 'REPORT_DIR')
+    
+    def get_freshness_minutes(self):
+        """Get how long (in minutes) a city's last observation counts as fresh in incremental runs."""
+        return float(self.get('COLLECTION', 'FRESHNESS_MINUTES', fallback=60.0))
+    
+    def get_requests_per_minute(self):
+        """Get the request budget per minute shared by the web scraper and the API client."""
+        return float(self.get('COLLECTION', 'REQUESTS_PER_MINUTE', fallback=30.0))
+    
+    def get_anomaly_settings(self):
+        """Get the ingest-time anomaly detector's settings as AnomalyDetector keyword arguments."""
+        return {
+            'z_threshold': float(self.get('ANOMALY', 'Z_THRESHOLD', fallback=3.0)),
+            'min_samples': int(self.get('ANOMALY', 'MIN_SAMPLES', fallback=10)),
+            'alpha': float(self.get('ANOMALY', 'EWMA_ALPHA', fallback=0.1)),
+            'min_stddev': float(self.get('ANOMALY', 'MIN_STDDEV', fallback=0.5))
+        }
+    
+    def get_writer_settings(self):
+        """Get the write-behind DbWriter's queue and batching settings as keyword arguments."""
+        return {
+            'max_queue': int(self.get('WRITER', 'MAX_QUEUE', fallback=1000)),
+            'batch_size': int(self.get('WRITER', 'BATCH_SIZE', fallback=100)),
+            'flush_seconds': float(self.get('WRITER', 'FLUSH_SECONDS', fallback=1.0))
+        }
+    
+    def get_provider_settings(self, name):
+        """Get a provider's own limits from [PROVIDER_<NAME>]; None (or 0) means the provider's default / no limit."""
+        section = f"PROVIDER_{name.upper()}"
+        max_concurrency = self.get(section, 'MAX_CONCURRENCY', fallback=None)
+        requests_per_minute = float(self.get(section, 'REQUESTS_PER_MINUTE', fallback=None) or 0)
+        return {
+            'max_concurrency': int(max_concurrency) if max_concurrency else None,
+            'requests_per_minute': requests_per_minute if requests_per_minute > 0 else None
+        }
+    
+    def get_api_base_url(self):
+        """Get the OpenWeatherMap current-weather endpoint (point it at a fake server for load tests)."""
+        return self.get('API', 'BASE_URL', fallback="https://api.openweathermap.org/data/2.5/weather")
+    
+    def get_web_base_url(self):
+        """Get the timeanddate.com weather base URL (point it at a fake server for load tests)."""
+        return self.get('WEB', 'BASE_URL', fallback="https://www.timeanddate.com/weather/")
+
+# One ConfigHelper per config file, shared by the whole process
+_configs = {}
+_configs_lock = threading.Lock()
+
+def get_config(config_file=DEFAULT_CONFIG_FILE) -> ConfigHelper:
+    """Return the process-wide ConfigHelper for config_file, re-reading the file first if it changed."""
+    with _configs_lock:
+        config = _configs.get(config_file)
+        if config is None:
+            config = _configs[config_file] = ConfigHelper(config_file)
+        else:
+            config.reload_if_changed()
+        return config
\ No newline at end of file
@@ -1,14 +1,158 @@
+import json
+import math
+import os
+import shutil
 import sqlite3
-from typing import List, Dict, Any
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+from automation_framework.utilities.anomaly_helpers import AnomalyDetector, RunningStats
+from automation_framework.utilities.metrics_helpers import get_metrics
+from automation_framework.utilities.observations import Observation, ObservationBatch
+
+# Page-load phases captured by WebHelper, in the order they happen
+PAGE_TIMING_PHASES = ['dns_ms', 'connect_ms', 'tls_ms', 'ttfb_ms', 'download_ms', 'dom_ms', 'selector_wait_ms']
+
+# weather_data indexes a large shard merge drops and _create_tables() rebuilds afterwards.
+# The dedup index stays, since merges rely on it.
+WEATHER_DATA_SECONDARY_INDEXES = ['idx_weather_data_timestamp', 'idx_weather_data_city_timestamp', 'idx_weather_data_run']
+
+# Columns copied from a shard's weather_data; older shards may lack the last two
+SHARD_COLUMNS = ['city', 'temperature_web', 'feels_like_web', 'temperature_api', 'feels_like_api', 'timestamp',
+                 'run_id', 'source']
+
+# One lock per named in-memory database, shared by every helper in the process that opens it
+_memory_locks: Dict[str, threading.RLock] = {}
+_memory_locks_guard = threading.Lock()
+
+def is_memory_database(db_path: str) -> bool:
+    """Return True if db_path names an in-memory SQLite database (':memory:' or a memory URI)."""
+    if db_path == ':memory:':
+        return True
+    if not db_path.startswith('file:'):
+        return False
+    parts = urlsplit(db_path)
+    return parts.path == ':memory:' or 'memory' in parse_qs(parts.query).get('mode', [])
 
 class DbHelper:
-    def __init__(self, db_path: str = "data.db"):
+    """SQLite storage for weather data, runs and page timings.
+
+    db_path selects where the database lives:
+        'data.db' (any file path)   a database file, shared with other processes
+        ':memory:'                  a private in-memory database, gone after close()
+        'file:<name>?mode=memory&cache=shared'
+                                    a named in-memory database that other helpers
+                                    in this process can open with the same URI
+        ''                          a database file in a fresh temporary directory,
+                                    deleted by close()
+
+    Any other 'file:' URI is opened with uri=True. In-memory databases are
+    held open by one connection for as long as the helper lives, since
+    SQLite drops them when their last connection closes, and every method
+    uses that connection one transaction at a time. Shared-cache
+    connections take table locks that fail at once instead of waiting,
+    so they cannot run side by side the way file connections can.
+
+    With an anomaly_detector, every saved pair is scored against its city's
+    running statistics in the same transaction, and anomalies go to the
+    alerts table.
+    """
+
+    def __init__(self, db_path: str = "data.db", anomaly_detector: Optional[AnomalyDetector] = None):
+        self.anomaly_detector = anomaly_detector
+        self._keeper = None
+        self._lock = None
+        self._temp_dir = None
+        if db_path == ':memory:':
+            # A named shared-cache database, so snapshots and tests can open it by URI too
+            db_path = f"file:weather-{uuid.uuid4().hex}?mode=memory&cache=shared"
+            self._lock = threading.RLock()
+        elif db_path == '':
+            self._temp_dir = tempfile.mkdtemp(prefix='weather-db-')
+            db_path = os.path.join(self._temp_dir, 'data.db')
         self.db_path = db_path
+        self.uri = db_path.startswith('file:')
+        if is_memory_database(db_path):
+            self._keeper = sqlite3.connect(db_path, uri=self.uri, check_same_thread=False)
+            if self._lock is None:
+                with _memory_locks_guard:
+                    self._lock = _memory_locks.setdefault(db_path, threading.RLock())
         self._create_tables()
     
+    @classmethod
+    def from_snapshot(cls, snapshot_path: str) -> 'DbHelper':
+        """Return a private in-memory DbHelper loaded with a copy of snapshot_path."""
+        db_helper = cls(':memory:')
+        db_helper.restore(snapshot_path)
+        return db_helper
+    
+    @contextmanager
+    def _connect(self):
+        """Open a connection for one transaction: committed on success, rolled back on error, then closed.
+
+        In-memory databases lend out their one connection under a lock instead.
+        """
+        if self._keeper is not None:
+            with self._lock:
+                try:
+                    with self._keeper:
+                        yield self._keeper
+                finally:
+                    # Callers set their own row factory; don't hand it to the next one
+                    self._keeper.row_factory = None
+            return
+        conn = sqlite3.connect(self.db_path, uri=self.uri)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    def snapshot(self, target_path: str) -> str:
+        """Copy the whole database to target_path (a file or URI) with SQLite's online backup API."""
+        with self._connect() as source:
+            target = sqlite3.connect(target_path, uri=target_path.startswith('file:'))
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+        return target_path
+    
+    def restore(self, snapshot_path: str):
+        """Replace this database's contents with a copy of snapshot_path."""
+        source = sqlite3.connect(snapshot_path, uri=snapshot_path.startswith('file:'))
+        try:
+            with self._connect() as target:
+                source.backup(target)
+        finally:
+            source.close()
+        # The snapshot may predate newer tables and columns
+        self._create_tables()
+    
+    def close(self):
+        """Release an in-memory database and remove a temporary one. File databases are left as they are."""
+        if self._keeper is not None:
+            with self._lock:
+                self._keeper.close()
+                self._keeper = None
+        if self._temp_dir is not None:
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+            self._temp_dir = None
+    
+    def __enter__(self) -> 'DbHelper':
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
     def _create_tables(self):
         """Create the required tables if they don't exist."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS weather_data (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -21,26 +165,671 @@ class DbHelper:
                     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
                 )
             """)
-    
-    def save_weather_data(self, web_data: Dict[str, Any], api_data: Dict[str, Any]):
-        """Save weather data from both sources."""
-        with sqlite3.connect(self.db_path) as conn:
+            # Older databases predate run checkpoints
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(weather_data)")]
+            if 'run_id' not in columns:
+                conn.execute("ALTER TABLE weather_data ADD COLUMN run_id TEXT")
+            # The collector a row came from, set by merge_shards(); NULL for rows collected into this database
+            if 'source' not in columns:
+                conn.execute("ALTER TABLE weather_data ADD COLUMN source TEXT")
+            conn.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_weather_data_dedup
+                ON weather_data (city, timestamp, source)
+            """)
+            # How far each merged shard has been read
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS shard_merges (
+                    source TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    last_id INTEGER NOT NULL,
+                    rows_read INTEGER NOT NULL DEFAULT 0,
+                    rows_merged INTEGER NOT NULL DEFAULT 0,
+                    merged_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    cities TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'running',
+                    started_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    finished_at DATETIME
+                )
+            """)
+            run_columns = [row[1] for row in conn.execute("PRAGMA table_info(runs)")]
+            if 'metrics' not in run_columns:
+                conn.execute("ALTER TABLE runs ADD COLUMN metrics TEXT")
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS page_timings (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT,
+                    city TEXT NOT NULL,
+                    {', '.join(f'{phase} REAL' for phase in PAGE_TIMING_PHASES)},
+                    total_ms REAL,
+                    transfer_bytes INTEGER,
+                    resource_count INTEGER,
+                    resource_bytes INTEGER,
+                    attempt INTEGER,
+                    outcome TEXT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            timing_columns = [row[1] for row in conn.execute("PRAGMA table_info(page_timings)")]
+            for column, column_type in [('attempt', 'INTEGER'), ('outcome', 'TEXT')]:
+                if column not in timing_columns:
+                    conn.execute(f"ALTER TABLE page_timings ADD COLUMN {column} {column_type}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_page_timings_run ON page_timings (run_id)")
+            # One row per source per city, so a new provider needs no new columns
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS readings (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT,
+                    city TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    temperature REAL,
+                    feels_like REAL,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
             conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_readings_source_city_timestamp
+                ON readings (source, city, timestamp)
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_readings_run ON readings (run_id, city)")
+            # Per-city running statistics of web - api, updated as rows are saved
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS anomaly_stats (
+                    city TEXT PRIMARY KEY,
+                    count INTEGER NOT NULL,
+                    mean REAL NOT NULL,
+                    m2 REAL NOT NULL,
+                    ewma REAL NOT NULL,
+                    ewm_var REAL NOT NULL,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS alerts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    weather_data_id INTEGER,
+                    run_id TEXT,
+                    city TEXT NOT NULL,
+                    discrepancy REAL NOT NULL,
+                    expected REAL NOT NULL,
+                    stddev REAL NOT NULL,
+                    zscore REAL NOT NULL,
+                    samples INTEGER NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_run ON alerts (run_id)")
+            # Indexes backing the dashboard's time-range and city filters
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_weather_data_timestamp
+                ON weather_data (timestamp)
+            """)
+            # Both temperatures are included so the history queries never visit the table itself.
+            # Databases from before that have the two-column version, which is rebuilt once.
+            city_timestamp_index = """
+                CREATE INDEX IF NOT EXISTS idx_weather_data_city_timestamp
+                ON weather_data (city, timestamp, temperature_web, temperature_api)
+            """
+            if self._index_columns(conn, 'idx_weather_data_city_timestamp') == 2:
+                # Other processes may be starting too: only the one holding the write lock
+                # rebuilds, after checking again that no one else already has
+                conn.commit()
+                conn.execute("BEGIN IMMEDIATE")
+                if self._index_columns(conn, 'idx_weather_data_city_timestamp') == 2:
+                    conn.execute("DROP INDEX idx_weather_data_city_timestamp")
+                    conn.execute(city_timestamp_index)
+                conn.commit()
+            conn.execute(city_timestamp_index)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_weather_data_run
+                ON weather_data (run_id, city)
+            """)
+    
+    @staticmethod
+    def _index_columns(conn: sqlite3.Connection, index: str) -> int:
+        return len(conn.execute(f"PRAGMA index_info({index})").fetchall())
+    
+    def _filter_clause(self, start: Optional[str] = None, end: Optional[str] = None,
+                       cities: Optional[List[str]] = None,
+                       min_discrepancy: Optional[float] = None) -> Tuple[str, List[Any]]:
+        """Build a parameterised WHERE clause from optional filters.
+        
+        Args:
+            start: Earliest timestamp to include ('YYYY-MM-DD[ HH:MM:SS]')
+            end: Timestamp to stop before (exclusive)
+            cities: Only include these cities
+            min_discrepancy: Only include rows whose web/API difference is at least this value
+        """
+        conditions = []
+        params = []
+        if cities:
+            conditions.append(f"city IN ({', '.join('?' for _ in cities)})")
+            params.extend(cities)
+        if start:
+            conditions.append("timestamp >= ?")
+            params.append(start)
+        if end:
+            conditions.append("timestamp < ?")
+            params.append(end)
+        if min_discrepancy:
+            conditions.append("ABS(temperature_web - temperature_api) >= ?")
+            params.append(min_discrepancy)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, params
+    
+    def save_weather_data(self, web_data: Dict[str, Any], api_data: Dict[str, Any], run_id: Optional[str] = None):
+        """Save weather data from both sources, optionally tagged with the run that collected it."""
+        metrics = get_metrics()
+        with metrics.timer('weather_db_write_seconds', operation='save'), self._connect() as conn:
+            cursor = conn.execute("""
                 INSERT INTO weather_data (
                     city, temperature_web, feels_like_web,
-                    temperature_api, feels_like_api
-                ) VALUES (?, ?, ?, ?, ?)
+                    temperature_api, feels_like_api, run_id
+                ) VALUES (?, ?, ?, ?, ?, ?)
             """, (
                 web_data['city'],
                 web_data['temperature'],
                 web_data['feels_like'],
                 api_data['temperature'],
-                api_data['feels_like']
+                api_data['feels_like'],
+                run_id
             ))
+            if self.anomaly_detector is not None:
+                self._detect_anomalies(conn, [
+                    (cursor.lastrowid, web_data['city'], web_data['temperature'] - api_data['temperature'])
+                ], run_id)
+        metrics.inc('weather_db_rows_written_total')
+    
+    def save_weather_data_batch(self, pairs: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+                                run_id: Optional[str] = None) -> int:
+        """Save many (web_data, api_data) pairs in a single transaction and return how many were saved."""
+        return self.save_observations(
+            ObservationBatch(Observation.from_readings(web_data, api_data) for web_data, api_data in pairs),
+            run_id=run_id
+        )
+    
+    def save_observations(self, batch: ObservationBatch, run_id: Optional[str] = None) -> int:
+        """Save a batch of observations in a single transaction and return how many were saved."""
+        metrics = get_metrics()
+        with metrics.timer('weather_db_write_seconds', operation='save_batch'), self._connect() as conn:
+            self._insert_observations(conn, batch, run_id)
+        metrics.inc('weather_db_rows_written_total', len(batch))
+        return len(batch)
+    
+    def _insert_observations(self, conn: sqlite3.Connection, batch: ObservationBatch, run_id: Optional[str]):
+        conn.executemany("""
+            INSERT INTO weather_data (
+                city, temperature_web, feels_like_web,
+                temperature_api, feels_like_api, run_id
+            ) VALUES (?, ?, ?, ?, ?, ?)
+        """, (row + (run_id,) for row in batch.rows()))
+        if self.anomaly_detector is not None and len(batch):
+            # One transaction holds the write lock, so the batch got consecutive IDs
+            first_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0] - len(batch) + 1
+            self._detect_anomalies(conn, [
+                (first_id + index, batch.city[index], batch.temperature_web[index] - batch.temperature_api[index])
+                for index in range(len(batch))
+                if not math.isnan(batch.temperature_web[index] - batch.temperature_api[index])
+            ], run_id)
+    
+    def save_readings(self, city: str, readings: Dict[str, Any], run_id: Optional[str] = None) -> int:
+        """Save one city's readings, keyed by source, to the readings table; missing (None) ones are skipped."""
+        rows = self._reading_rows(city, readings, run_id)
+        with get_metrics().timer('weather_db_write_seconds', operation='save_readings'), self._connect() as conn:
+            self._insert_readings(conn, rows)
+        return len(rows)
+    
+    @staticmethod
+    def _reading_rows(city: str, readings: Dict[str, Any], run_id: Optional[str]) -> List[tuple]:
+        return [
+            (run_id, city, source, reading['temperature'], reading.get('feels_like'))
+            for source, reading in readings.items() if reading
+        ]
+    
+    @staticmethod
+    def _insert_readings(conn: sqlite3.Connection, rows: List[tuple]):
+        conn.executemany("""
+            INSERT INTO readings (run_id, city, source, temperature, feels_like)
+            VALUES (?, ?, ?, ?, ?)
+        """, rows)
+    
+    def save_records(self, records: List[Tuple[str, tuple]]) -> int:
+        """Save queued writes of any kind in a single transaction and return how many were saved.
+
+        Each record is (kind, args), where kind names the save method the
+        args are for: 'weather_data' (web_data, api_data, run_id),
+        'readings' (city, readings, run_id) or 'page_timing' (city, timing,
+        run_id). DbWriter uses this to turn many small writes into one commit.
+        """
+        observations: Dict[Optional[str], ObservationBatch] = {}
+        reading_rows = []
+        timings = []
+        for kind, args in records:
+            if kind == 'weather_data':
+                web_data, api_data, run_id = args
+                observations.setdefault(run_id, ObservationBatch()).append(
+                    Observation.from_readings(web_data, api_data)
+                )
+            elif kind == 'readings':
+                reading_rows.extend(self._reading_rows(*args))
+            elif kind == 'page_timing':
+                timings.append(args)
+            else:
+                raise ValueError(f"Unknown record kind: {kind!r}")
+        metrics = get_metrics()
+        with metrics.timer('weather_db_write_seconds', operation='save_records'), self._connect() as conn:
+            for run_id, batch in observations.items():
+                self._insert_observations(conn, batch, run_id)
+            if reading_rows:
+                self._insert_readings(conn, reading_rows)
+            for city, timing, run_id in timings:
+                self._insert_page_timing(conn, city, timing, run_id)
+        metrics.inc('weather_db_rows_written_total', sum(len(batch) for batch in observations.values()))
+        return len(records)
+    
+    def get_source_discrepancies(self, reference: str = 'api', run_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Compare every source with the reference source, pairing readings from the same run and city.
+
+        Returns one row per source with the number of pairs and the mean and
+        maximum absolute temperature difference, worst source first.
+        """
+        run_filter = "AND r.run_id = ?" if run_id else ""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(f"""
+                SELECT
+                    r.source,
+                    COUNT(*) as pairs,
+                    AVG(ABS(r.temperature - ref.temperature)) as mean_discrepancy,
+                    MAX(ABS(r.temperature - ref.temperature)) as max_discrepancy
+                FROM readings r
+                JOIN readings ref
+                    ON ref.run_id = r.run_id AND ref.city = r.city AND ref.source = ?
+                WHERE r.source != ? {run_filter}
+                GROUP BY r.source
+                ORDER BY mean_discrepancy DESC
+            """, [reference, reference] + ([run_id] if run_id else []))
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def _detect_anomalies(self, conn: sqlite3.Connection, rows: List[Tuple[int, str, float]], run_id: Optional[str]):
+        """Score (weather_data_id, city, web - api) rows and store alerts and updated statistics.
+
+        Runs inside the saving transaction and touches only the saved cities'
+        anomaly_stats rows, so collectors sharing the database keep one set
+        of statistics and no table is scanned.
+        """
+        if not rows:
+            return
+        detector = self.anomaly_detector
+        cities = sorted({city for _, city, _ in rows})
+        stats = {
+            city: RunningStats(detector.alpha, count, mean, m2, ewma, ewm_var)
+            for city, count, mean, m2, ewma, ewm_var in conn.execute(f"""
+                SELECT city, count, mean, m2, ewma, ewm_var FROM anomaly_stats
+                WHERE city IN ({', '.join('?' for _ in cities)})
+            """, cities)
+        }
+        alerts = []
+        for weather_data_id, city, discrepancy in rows:
+            city_stats = stats.setdefault(city, detector.new_stats())
+            alert = detector.observe(city_stats, discrepancy)
+            if alert:
+                alerts.append((weather_data_id, run_id, city, alert['discrepancy'], alert['expected'],
+                               alert['stddev'], alert['zscore'], alert['samples']))
+        conn.executemany("""
+            INSERT OR REPLACE INTO anomaly_stats (city, count, mean, m2, ewma, ewm_var, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, [(city, st.count, st.mean, st.m2, st.ewma, st.ewm_var) for city, st in stats.items()])
+        if alerts:
+            conn.executemany("""
+                INSERT INTO alerts (weather_data_id, run_id, city, discrepancy, expected, stddev, zscore, samples)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, alerts)
+            get_metrics().inc('weather_anomaly_alerts_total', len(alerts))
+    
+    def rebuild_anomaly_stats(self, cities: Optional[List[str]] = None) -> int:
+        """Recompute anomaly_stats for cities (default: all) by replaying their rows in time order.
+
+        Needed after rows arrive out of order, e.g. from merge_shards().
+        Returns the number of cities rebuilt.
+        """
+        detector = self.anomaly_detector or AnomalyDetector()
+        with self._connect() as conn:
+            if cities is None:
+                cities = [row[0] for row in conn.execute("SELECT DISTINCT city FROM weather_data")]
+            rows = []
+            for city in cities:
+                stats = detector.new_stats()
+                # Read from the (city, timestamp, temperatures) covering index
+                for (discrepancy,) in conn.execute("""
+                    SELECT temperature_web - temperature_api FROM weather_data
+                    WHERE city = ? AND temperature_web IS NOT NULL AND temperature_api IS NOT NULL
+                    ORDER BY timestamp, id
+                """, (city,)):
+                    stats.update(discrepancy)
+                if stats.count:
+                    rows.append((city, stats.count, stats.mean, stats.m2, stats.ewma, stats.ewm_var))
+            conn.executemany("DELETE FROM anomaly_stats WHERE city = ?", [(city,) for city in cities])
+            conn.executemany("""
+                INSERT INTO anomaly_stats (city, count, mean, m2, ewma, ewm_var)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, rows)
+        return len(cities)
+    
+    def get_alerts(self, run_id: Optional[str] = None, city: Optional[str] = None,
+                   limit: int = 100) -> List[Dict[str, Any]]:
+        """Get the newest anomaly alerts, optionally for one run or city."""
+        conditions = []
+        params: List[Any] = []
+        if run_id:
+            conditions.append("run_id = ?")
+            params.append(run_id)
+        if city:
+            conditions.append("city = ?")
+            params.append(city)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(f"""
+                SELECT * FROM alerts
+                {where}
+                ORDER BY id DESC
+                LIMIT ?
+            """, params + [limit])
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_city_stats(self, city: str) -> Optional[RunningStats]:
+        """Get the running web - api statistics kept for a city, or None if it has none yet."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT count, mean, m2, ewma, ewm_var FROM anomaly_stats WHERE city = ?", (city,)
+            ).fetchone()
+        if row is None:
+            return None
+        alpha = self.anomaly_detector.alpha if self.anomaly_detector else RunningStats().alpha
+        return RunningStats(alpha, *row)
+    
+    def save_page_timing(self, city: str, timing: Dict[str, Any], run_id: Optional[str] = None):
+        """Save the load timing WebHelper captured for one attempt at a city's page, failed or not."""
+        with self._connect() as conn:
+            self._insert_page_timing(conn, city, timing, run_id)
+    
+    @staticmethod
+    def _insert_page_timing(conn: sqlite3.Connection, city: str, timing: Dict[str, Any], run_id: Optional[str]):
+        columns = PAGE_TIMING_PHASES + ['total_ms', 'transfer_bytes', 'resource_count', 'resource_bytes',
+                                        'attempt', 'outcome']
+        conn.execute(
+            f"INSERT INTO page_timings (run_id, city, {', '.join(columns)}) "
+            f"VALUES (?, ?, {', '.join('?' for _ in columns)})",
+            [run_id, city] + [timing.get(column) for column in columns]
+        )
+    
+    def get_slowest_pages(self, limit: int = 10, run_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get the slowest page loads, failed ones included, each with the phase that took the longest.
+
+        dominant_phase is None for loads that never got as far as a page (outcome 'load_error').
+        """
+        where, params = ("WHERE run_id = ?", [run_id]) if run_id else ("", [])
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = [dict(row) for row in conn.execute(
+                f"SELECT * FROM page_timings {where} ORDER BY total_ms DESC LIMIT ?", params + [limit]
+            )]
+        for row in rows:
+            phases = [phase for phase in PAGE_TIMING_PHASES if row[phase] is not None]
+            row['dominant_phase'] = max(phases, key=lambda phase: row[phase]) if phases else None
+        return rows
+    
+    def get_page_timing_summary(self, run_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get the average time per page-load phase and its share of the phases' total, largest first."""
+        where, params = ("WHERE run_id = ?", [run_id]) if run_id else ("", [])
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(f'AVG({phase})' for phase in PAGE_TIMING_PHASES)} FROM page_timings {where}",
+                params
+            ).fetchone()
+        averages = {phase: value or 0.0 for phase, value in zip(PAGE_TIMING_PHASES, row)}
+        total = sum(averages.values())
+        summary = [
+            {'phase': phase, 'avg_ms': avg, 'share': avg / total if total else 0.0}
+            for phase, avg in averages.items()
+        ]
+        return sorted(summary, key=lambda item: item['avg_ms'], reverse=True)
+    
+    def start_run(self, cities: List[str]) -> str:
+        """Record the start of a collection run over cities and return its run ID."""
+        run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO runs (run_id, cities) VALUES (?, ?)",
+                (run_id, json.dumps(list(cities)))
+            )
+        return run_id
+    
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Get a run's planned cities and status, or None if the run doesn't exist."""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if row is None:
+                return None
+            run = dict(row)
+            run['cities'] = json.loads(run['cities'])
+            run['metrics'] = json.loads(run['metrics']) if run['metrics'] else None
+            return run
+    
+    def get_completed_cities(self, run_id: str) -> List[str]:
+        """Get the cities already saved by a run."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "SELECT DISTINCT city FROM weather_data WHERE run_id = ?", (run_id,)
+            )
+            return [row[0] for row in cursor.fetchall()]
+    
+    def finish_run(self, run_id: str, status: str = 'completed'):
+        """Mark a run as finished with the given status."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE runs SET status = ?, finished_at = CURRENT_TIMESTAMP WHERE run_id = ?",
+                (status, run_id)
+            )
+    
+    def get_merge_state(self) -> Dict[str, Dict[str, Any]]:
+        """Get each merged shard's high-water mark and totals, by source name."""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            return {row['source']: dict(row) for row in conn.execute("SELECT * FROM shard_merges ORDER BY source")}
+    
+    @staticmethod
+    def _shard_extent(path: str) -> Optional[Tuple[int, List[str], List[str]]]:
+        """Return a shard's newest weather_data id and its weather_data and runs columns, or None without data.
+
+        The shard is opened read-only, so a collector can keep writing to it.
+        """
+        if not os.path.exists(path):
+            return None
+        conn = sqlite3.connect(f"{Path(path).absolute().as_uri()}?mode=ro", uri=True)
+        try:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(weather_data)")]
+            if not columns:
+                return None
+            run_columns = [row[1] for row in conn.execute("PRAGMA table_info(runs)")]
+            return conn.execute("SELECT MAX(id) FROM weather_data").fetchone()[0] or 0, columns, run_columns
+        finally:
+            conn.close()
+    
+    def _merge_shard(self, source: str, path: str, after_id: int, up_to_id: int,
+                     columns: List[str], run_columns: List[str], chunk_rows: int = 10000) -> Dict[str, Any]:
+        """Copy one shard's weather_data rows with after_id < id <= up_to_id, chunk_rows at a time.
+
+        Each chunk is first copied into a temporary table in a transaction of
+        its own, the only time the shard is locked, and then written from
+        there together with the new high-water mark. The shard is therefore
+        never locked while this database writes, and an interrupted merge
+        resumes after the last chunk without counting rows twice. Rows
+        already present under the same (city, timestamp, source) are skipped.
+        Rows that came from another merge keep their source; the shard's
+        own rows get this source name. The shard's runs are copied last.
+        """
+        def shard_column(column):
+            if column == 'source':
+                # Rows the shard itself got from a merge keep the collector they came from
+                return "COALESCE(source, :source)" if 'source' in columns else ":source"
+            return column if column in columns else "NULL"
+        
+        select = ', '.join(shard_column(column) for column in SHARD_COLUMNS)
+        rows_read = rows_merged = 0
+        cities = set()
+        with self._connect() as conn:
+            conn.execute("ATTACH DATABASE ? AS shard", (path,))
+            try:
+                conn.execute(f"CREATE TEMP TABLE shard_chunk (id INTEGER PRIMARY KEY, {', '.join(SHARD_COLUMNS)})")
+                last_id = after_id
+                while last_id < up_to_id:
+                    with conn:
+                        conn.execute(f"""
+                            INSERT INTO temp.shard_chunk
+                            SELECT id, {select} FROM shard.weather_data
+                            WHERE id > :after_id AND id <= :up_to_id
+                            ORDER BY id
+                            LIMIT :limit
+                        """, {'source': source, 'after_id': last_id, 'up_to_id': up_to_id, 'limit': chunk_rows})
+                    chunk, chunk_last_id = conn.execute("SELECT COUNT(*), MAX(id) FROM temp.shard_chunk").fetchone()
+                    # A short chunk is the last one, even if the ids up to up_to_id have gaps
+                    last_id = chunk_last_id if chunk == chunk_rows else up_to_id
+                    with conn:
+                        changes_before = conn.total_changes
+                        conn.execute(f"""
+                            INSERT OR IGNORE INTO main.weather_data ({', '.join(SHARD_COLUMNS)})
+                            SELECT {', '.join(SHARD_COLUMNS)} FROM temp.shard_chunk ORDER BY id
+                        """)
+                        merged = conn.total_changes - changes_before
+                        conn.execute("""
+                            INSERT INTO main.shard_merges (source, path, last_id, rows_read, rows_merged, merged_at)
+                            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                            ON CONFLICT (source) DO UPDATE SET
+                                path = excluded.path,
+                                last_id = excluded.last_id,
+                                rows_read = rows_read + excluded.rows_read,
+                                rows_merged = rows_merged + excluded.rows_merged,
+                                merged_at = excluded.merged_at
+                        """, (source, os.path.abspath(path), last_id, chunk, merged))
+                        cities.update(row[0] for row in conn.execute("SELECT DISTINCT city FROM temp.shard_chunk"))
+                        conn.execute("DELETE FROM temp.shard_chunk")
+                    rows_read += chunk
+                    rows_merged += merged
+                
+                if run_columns:
+                    shared = ', '.join(column for column in run_columns
+                                       if column in ('run_id', 'cities', 'status', 'started_at', 'finished_at', 'metrics'))
+                    runs = conn.execute(f"SELECT {shared} FROM shard.runs").fetchall()
+                    with conn:
+                        conn.executemany(f"""
+                            INSERT OR REPLACE INTO main.runs ({shared})
+                            VALUES ({', '.join('?' for _ in shared.split(', '))})
+                        """, runs)
+            finally:
+                # In-memory helpers reuse one connection, so nothing may outlive the call
+                conn.rollback()
+                conn.execute("DROP TABLE IF EXISTS temp.shard_chunk")
+                conn.execute("DETACH DATABASE shard")
+        get_metrics().inc('weather_shard_rows_merged_total', rows_merged, source=source)
+        return {
+            'source': source,
+            'rows_read': rows_read,
+            'rows_merged': rows_merged,
+            'duplicates': rows_read - rows_merged,
+            'cities': sorted(cities)
+        }
+    
+    def merge_shards(self, shards: Dict[str, str], rebuild_ratio: float = 0.2, compact: bool = False,
+                     full: bool = False, chunk_rows: int = 10000) -> Dict[str, Any]:
+        """Merge other collectors' databases (shards) into this one, incrementally.
+
+        shards maps a source name (e.g. the collector's host) to its database
+        file. Each source keeps a high-water mark in shard_merges, so later
+        merges read only the rows added since. If a shard's ids went
+        backwards (it was replaced), or with full=True, the shard is read from
+        the start again. Rows are deduplicated on (city, timestamp, source).
+        Shards are read chunk_rows rows at a time, each chunk in its own short
+        transaction, so collectors writing to them never wait long for the merge.
+
+        When the new rows number more than rebuild_ratio times the rows
+        already stored, the secondary weather_data indexes are dropped
+        first and rebuilt once at the end. That is cheaper than updating
+        them row by row. Afterwards the affected cities' anomaly_stats are
+        rebuilt in time order and ANALYZE refreshes the planner statistics.
+        With compact, VACUUM then rewrites the file without free pages.
+
+        Returns:
+            dict: per-shard results, rows_merged, duplicates, indexes_rebuilt and cities_rebuilt
+        """
+        state = self.get_merge_state()
+        plans = []
+        for source, path in shards.items():
+            extent = self._shard_extent(path)
+            if extent is None:
+                print(f"{source}: no weather_data in {path}, skipped")
+                continue
+            max_id, columns, run_columns = extent
+            last_id = 0 if full else state.get(source, {}).get('last_id', 0)
+            if max_id < last_id:
+                print(f"{source}: {path} is older than the last merge (id {max_id} < {last_id}); reading it again")
+                last_id = 0
+            if max_id > last_id:
+                plans.append((source, path, last_id, max_id, columns, run_columns))
+        
+        with self._connect() as conn:
+            stored = conn.execute("SELECT MAX(id) FROM weather_data").fetchone()[0] or 0
+        incoming = sum(max_id - last_id for _, _, last_id, max_id, _, _ in plans)
+        rebuild = bool(plans) and incoming > rebuild_ratio * stored
+        
+        results = []
+        try:
+            if rebuild:
+                with self._connect() as conn:
+                    for index in WEATHER_DATA_SECONDARY_INDEXES:
+                        conn.execute(f"DROP INDEX IF EXISTS {index}")
+            with get_metrics().timer('weather_db_write_seconds', operation='merge_shards'):
+                for plan in plans:
+                    result = self._merge_shard(*plan, chunk_rows=chunk_rows)
+                    print(f"{result['source']}: merged {result['rows_merged']} of {result['rows_read']} new rows "
+                          f"({result['duplicates']} duplicates)")
+                    results.append(result)
+        finally:
+            if rebuild:
+                # Recreates every missing index from its definition
+                self._create_tables()
+        
+        cities = sorted({city for result in results if result['rows_merged'] for city in result['cities']})
+        if cities:
+            self.rebuild_anomaly_stats(cities)
+        if results:
+            with self._connect() as conn:
+                conn.execute("ANALYZE")
+        if compact:
+            with self._connect() as conn:
+                conn.execute("VACUUM")
+        return {
+            'shards': results,
+            'rows_merged': sum(result['rows_merged'] for result in results),
+            'duplicates': sum(result['duplicates'] for result in results),
+            'indexes_rebuilt': rebuild,
+            'cities_rebuilt': len(cities)
+        }
+    
+    def save_run_metrics(self, run_id: str, summary: Dict[str, Any]):
+        """Store a run's JSON metrics summary alongside the run."""
+        with self._connect() as conn:
+            conn.execute("UPDATE runs SET metrics = ? WHERE run_id = ?", (json.dumps(summary), run_id))
     
     def get_discrepancy_report(self, threshold: float = 2.0) -> List[Dict[str, Any]]:
         """Get cities where temperature difference exceeds threshold."""
-        with sqlite3.connect(self.db_path) as conn:
+        with get_metrics().timer('weather_db_query_seconds', query='discrepancy_report'), self._connect() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.execute("""
                 SELECT 
@@ -55,20 +844,288 @@ class DbHelper:
             """, (threshold,))
             return [dict(row) for row in cursor.fetchall()]
     
-    def get_summary_stats(self) -> Dict[str, float]:
-        """Get summary statistics of temperature discrepancies."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute("""
+    def get_summary_stats(self, **filters) -> Dict[str, float]:
+        """Get summary statistics of temperature discrepancies, optionally filtered (see _filter_clause)."""
+        where, params = self._filter_clause(**filters)
+        with get_metrics().timer('weather_db_query_seconds', query='summary_stats'), self._connect() as conn:
+            cursor = conn.execute(f"""
                 SELECT 
                     AVG(ABS(temperature_web - temperature_api)) as mean_discrepancy,
                     MAX(ABS(temperature_web - temperature_api)) as max_discrepancy,
                     MIN(ABS(temperature_web - temperature_api)) as min_discrepancy
                 FROM weather_data
-            """)
+                {where}
+            """, params)
             row = cursor.fetchone()
             return {
                 'mean_discrepancy': row[0],
                 'max_discrepancy': row[1],
                 'min_discrepancy': row[2]
             }
+    
+    def get_data_version(self) -> int:
+        """Get the newest row id, which changes whenever data is added."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT MAX(id) FROM weather_data").fetchone()
+            return row[0] or 0
+    
+    def get_last_observed(self, cities: List[str]) -> Dict[str, Optional[str]]:
+        """Get the newest observation timestamp for each city (None if never observed)."""
+        with self._connect() as conn:
+            # One index seek per city on (city, timestamp)
+            return {
+                city: conn.execute(
+                    "SELECT MAX(timestamp) FROM weather_data WHERE city = ?", (city,)
+                ).fetchone()[0]
+                for city in cities
+            }
+    
+    def get_stale_cities(self, cities: List[str], freshness_minutes: float) -> List[str]:
+        """Get the cities whose newest observation is older than freshness_minutes."""
+        # Timestamps are stored in UTC by CURRENT_TIMESTAMP
+        cutoff = (datetime.now(timezone.utc) - timedelta(minutes=freshness_minutes)).strftime("%Y-%m-%d %H:%M:%S")
+        last_observed = self.get_last_observed(cities)
+        return [city for city in cities if last_observed[city] is None or last_observed[city] < cutoff]
+    
+    def get_discrepancy_volatility(self, hours: float = 24) -> Dict[str, float]:
+        """Get the standard deviation of each city's web/API difference over the last hours."""
+        since = (datetime.now(timezone.utc) - timedelta(hours=hours)).strftime("%Y-%m-%d %H:%M:%S")
+        with self._connect() as conn:
+            cursor = conn.execute("""
+                SELECT city, AVG(diff), AVG(diff * diff)
+                FROM (
+                    SELECT city, temperature_web - temperature_api AS diff
+                    FROM weather_data
+                    WHERE timestamp >= ?
+                )
+                GROUP BY city
+            """, (since,))
+            return {
+                city: math.sqrt(max(mean_square - mean * mean, 0.0))
+                for city, mean, mean_square in cursor.fetchall()
+                if mean is not None
+            }
+    
+    def get_cities(self) -> List[str]:
+        """Get every city that has stored data."""
+        with self._connect() as conn:
+            cursor = conn.execute("SELECT DISTINCT city FROM weather_data ORDER BY city")
+            return [row[0] for row in cursor.fetchall()]
+    
+    def get_days(self, **filters) -> List[str]:
+        """Get every day ('YYYY-MM-DD', UTC) that has (filtered) data, oldest first."""
+        where, params = self._filter_clause(**filters)
+        with self._connect() as conn:
+            cursor = conn.execute(f"SELECT DISTINCT date(timestamp) AS day FROM weather_data {where} ORDER BY day", params)
+            return [row[0] for row in cursor.fetchall()]
+    
+    def get_data_extent(self, **filters) -> Dict[str, Any]:
+        """Get row count, distinct city count and time span of the (filtered) data."""
+        where, params = self._filter_clause(**filters)
+        with self._connect() as conn:
+            cursor = conn.execute(f"""
+                SELECT 
+                    COUNT(*),
+                    COUNT(DISTINCT city),
+                    MIN(timestamp),
+                    MAX(timestamp),
+                    CAST(strftime('%s', MAX(timestamp)) AS INTEGER) - CAST(strftime('%s', MIN(timestamp)) AS INTEGER)
+                FROM weather_data
+                {where}
+            """, params)
+            row = cursor.fetchone()
+            return {
+                'row_count': row[0],
+                'city_count': row[1],
+                'first_timestamp': row[2],
+                'last_timestamp': row[3],
+                'span_seconds': row[4] or 0
+            }
+    
+    def get_observations(self, **filters) -> ObservationBatch:
+        """Get the matching weather_data rows as a columnar batch, oldest first (see _filter_clause)."""
+        where, params = self._filter_clause(**filters)
+        batch = ObservationBatch()
+        with self._connect() as conn:
+            cursor = conn.execute(f"""
+                SELECT city, temperature_web, feels_like_web, temperature_api, feels_like_api, timestamp
+                FROM weather_data
+                {where}
+                ORDER BY timestamp, id
+            """, params)
+            for row in cursor:
+                batch.append_values(*row)
+        return batch
+    
+    def get_aggregated_observations(self, bucket_seconds: int = 3600, **filters) -> ObservationBatch:
+        """Get per-city averages of both sources, grouped into fixed time buckets.
 
+        Each row's timestamp is the start of its bucket, discrepancy is the
+        bucket's mean |web - api| and samples is the number of rows averaged.
+        """
+        bucket_seconds = max(int(bucket_seconds), 1)
+        where, params = self._filter_clause(**filters)
+        batch = ObservationBatch()
+        with self._connect() as conn:
+            cursor = conn.execute(f"""
+                SELECT 
+                    city,
+                    datetime((CAST(strftime('%s', timestamp) AS INTEGER) / ?) * ?, 'unixepoch') as bucket,
+                    AVG(temperature_web) as temperature_web,
+                    AVG(temperature_api) as temperature_api,
+                    AVG(feels_like_web) as feels_like_web,
+                    AVG(feels_like_api) as feels_like_api,
+                    AVG(ABS(temperature_web - temperature_api)) as discrepancy,
+                    COUNT(*) as samples
+                FROM weather_data
+                {where}
+                GROUP BY city, bucket
+                ORDER BY bucket, city
+            """, [bucket_seconds, bucket_seconds] + params)
+            for city, bucket, temperature_web, temperature_api, feels_like_web, feels_like_api, discrepancy, samples in cursor:
+                batch.append_values(city, temperature_web, feels_like_web, temperature_api, feels_like_api,
+                                    timestamp=bucket, discrepancy=discrepancy, samples=samples)
+        return batch
+    
+    @staticmethod
+    def _bucket_sql(where: str, by_city: bool = True) -> str:
+        """SQL for per-bucket sums of weather_data (bucket size as the first two parameters).
+
+        The history queries run their window functions over these few rows
+        instead of the raw data. Sums rather than means are kept so that
+        windows over several buckets can weight each bucket by its pairs.
+        """
+        return f"""
+            SELECT
+                {'city,' if by_city else 'COUNT(DISTINCT city) AS cities,'}
+                (CAST(strftime('%s', timestamp) AS INTEGER) / ?) * ? AS bucket_epoch,
+                COUNT(*) AS samples,
+                COUNT(temperature_web - temperature_api) AS pairs,
+                AVG(temperature_web) AS temperature_web,
+                AVG(temperature_api) AS temperature_api,
+                SUM(ABS(temperature_web - temperature_api)) AS discrepancy_sum,
+                MAX(ABS(temperature_web - temperature_api)) AS max_discrepancy,
+                SUM(temperature_web - temperature_api) AS bias_sum
+            FROM weather_data
+            {where}
+            GROUP BY {'city, ' if by_city else ''}bucket_epoch
+        """
+    
+    def get_city_history(self, bucket_seconds: int = 3600, window_seconds: int = 86400,
+                         **filters) -> List[Dict[str, Any]]:
+        """Get each city's time series with rolling averages, computed in SQLite.
+
+        One row per city and bucket: the bucket's mean temperatures,
+        mean_discrepancy (|web - api|) and bias (web - api, positive when the
+        website reads warmer), plus rolling_discrepancy and rolling_bias over
+        the window_seconds ending with the bucket. Rolling values weight each
+        bucket by its number of pairs, and gaps in the data shorten the
+        window rather than stretch it. Ordered by city, then time.
+        """
+        bucket_seconds = max(int(bucket_seconds), 1)
+        where, params = self._filter_clause(**filters)
+        with get_metrics().timer('weather_db_query_seconds', query='city_history'), self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(f"""
+                WITH buckets AS ({self._bucket_sql(where)})
+                SELECT
+                    city,
+                    datetime(bucket_epoch, 'unixepoch') AS bucket,
+                    samples,
+                    temperature_web,
+                    temperature_api,
+                    discrepancy_sum / NULLIF(pairs, 0) AS mean_discrepancy,
+                    max_discrepancy,
+                    bias_sum / NULLIF(pairs, 0) AS bias,
+                    SUM(discrepancy_sum) OVER w / NULLIF(SUM(pairs) OVER w, 0) AS rolling_discrepancy,
+                    SUM(bias_sum) OVER w / NULLIF(SUM(pairs) OVER w, 0) AS rolling_bias,
+                    SUM(samples) OVER w AS rolling_samples
+                FROM buckets
+                WINDOW w AS (PARTITION BY city ORDER BY bucket_epoch RANGE BETWEEN ? PRECEDING AND CURRENT ROW)
+                ORDER BY city, bucket_epoch
+            """, [bucket_seconds, bucket_seconds] + params + [max(int(window_seconds) - bucket_seconds, 0)])
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_bias_history(self, bucket_seconds: int = 3600, window_seconds: int = 86400,
+                         **filters) -> List[Dict[str, Any]]:
+        """Get the web/API bias of all (filtered) cities together over time.
+
+        One row per bucket with the number of cities and samples, the mean
+        bias (web - api) and mean |web - api|, their rolling values over
+        window_seconds, and bias_change from the previous bucket. Oldest first.
+        """
+        bucket_seconds = max(int(bucket_seconds), 1)
+        where, params = self._filter_clause(**filters)
+        with get_metrics().timer('weather_db_query_seconds', query='bias_history'), self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(f"""
+                WITH buckets AS ({self._bucket_sql(where, by_city=False)})
+                SELECT
+                    datetime(bucket_epoch, 'unixepoch') AS bucket,
+                    cities,
+                    samples,
+                    bias_sum / NULLIF(pairs, 0) AS bias,
+                    discrepancy_sum / NULLIF(pairs, 0) AS mean_discrepancy,
+                    SUM(bias_sum) OVER w / NULLIF(SUM(pairs) OVER w, 0) AS rolling_bias,
+                    SUM(discrepancy_sum) OVER w / NULLIF(SUM(pairs) OVER w, 0) AS rolling_discrepancy,
+                    bias_sum / NULLIF(pairs, 0)
+                        - LAG(bias_sum / NULLIF(pairs, 0)) OVER (ORDER BY bucket_epoch) AS bias_change
+                FROM buckets
+                WINDOW w AS (ORDER BY bucket_epoch RANGE BETWEEN ? PRECEDING AND CURRENT ROW)
+                ORDER BY bucket_epoch
+            """, [bucket_seconds, bucket_seconds] + params + [max(int(window_seconds) - bucket_seconds, 0)])
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_worst_cities(self, period_seconds: int = 86400, k: int = 5, min_samples: int = 1,
+                         **filters) -> List[Dict[str, Any]]:
+        """Get the k cities with the highest mean |web - api| in each period.
+
+        Cities with fewer than min_samples pairs in a period are not ranked
+        in it. Ties are broken by city name, so every period has at most k
+        rows. Ordered by period, then rank.
+        """
+        period_seconds = max(int(period_seconds), 1)
+        where, params = self._filter_clause(**filters)
+        with get_metrics().timer('weather_db_query_seconds', query='worst_cities'), self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(f"""
+                WITH buckets AS ({self._bucket_sql(where)}),
+                ranked AS (
+                    SELECT
+                        bucket_epoch,
+                        ROW_NUMBER() OVER (
+                            PARTITION BY bucket_epoch ORDER BY discrepancy_sum / pairs DESC, city
+                        ) AS rank,
+                        city,
+                        pairs AS samples,
+                        discrepancy_sum / pairs AS mean_discrepancy,
+                        max_discrepancy,
+                        bias_sum / pairs AS bias
+                    FROM buckets
+                    WHERE pairs >= MAX(?, 1)
+                )
+                SELECT datetime(bucket_epoch, 'unixepoch') AS period, rank, city, samples,
+                       mean_discrepancy, max_discrepancy, bias
+                FROM ranked
+                WHERE rank <= ?
+                ORDER BY bucket_epoch, rank
+            """, [period_seconds, period_seconds] + params + [min_samples, k])
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_city_discrepancy_summary(self, **filters) -> List[Dict[str, Any]]:
+        """Get mean and max temperature discrepancy per city, worst cities first."""
+        where, params = self._filter_clause(**filters)
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(f"""
+                SELECT 
+                    city,
+                    AVG(ABS(temperature_web - temperature_api)) as mean_discrepancy,
+                    MAX(ABS(temperature_web - temperature_api)) as max_discrepancy,
+                    COUNT(*) as samples
+                FROM weather_data
+                {where}
+                GROUP BY city
+                ORDER BY mean_discrepancy DESC
+            """, params)
+            return [dict(row) for row in cursor.fetchall()]
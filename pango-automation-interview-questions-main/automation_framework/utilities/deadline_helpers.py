@@ -0,0 +1,107 @@
+import math
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional
+from automation_framework.utilities.metrics_helpers import get_metrics
+
+class DeadlineExceeded(Exception):
+    """Raised when work is started after its deadline has passed."""
+
+class Deadline:
+    """A point in time by which work must finish.
+
+    Helpers clip their own timeouts and sleeps to the time remaining, so one
+    run-level deadline bounds every scrape and API call made under it.
+    A Deadline created with seconds=None never expires.
+    """
+
+    def __init__(self, seconds: Optional[float] = None, expires_at: Optional[float] = None):
+        if expires_at is None and seconds is not None:
+            expires_at = time.monotonic() + seconds
+        self.expires_at = expires_at
+
+    def remaining(self) -> float:
+        """Seconds left, or infinity for an unlimited deadline."""
+        if self.expires_at is None:
+            return math.inf
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self):
+        """Raise DeadlineExceeded if the deadline has passed."""
+        if self.expired():
+            raise DeadlineExceeded("Deadline exceeded")
+
+    def timeout(self, cap: float) -> float:
+        """Return cap seconds clipped to the time remaining."""
+        self.check()
+        return min(cap, self.remaining())
+
+    def timeout_ms(self, cap_ms: float) -> int:
+        """Return cap_ms milliseconds clipped to the time remaining (for Playwright)."""
+        return max(int(self.timeout(cap_ms / 1000) * 1000), 1)
+
+    def sleep(self, seconds: float):
+        """Sleep for seconds, but never past the deadline."""
+        time.sleep(min(seconds, self.remaining()))
+
+    def child(self, seconds: Optional[float]) -> 'Deadline':
+        """Return a deadline seconds from now that never outlives this one."""
+        if seconds is None:
+            return Deadline(expires_at=self.expires_at)
+        expires_at = time.monotonic() + seconds
+        if self.expires_at is not None:
+            expires_at = min(expires_at, self.expires_at)
+        return Deadline(expires_at=expires_at)
+
+class RunBudget:
+    """Split a run-level time budget into per-stage deadlines and report how each stage used its share.
+
+    Args:
+        total_seconds: Time budget for the whole run, or None for no limit
+        stage_shares: Fraction of the total budget reserved for each stage
+    """
+
+    def __init__(self, total_seconds: Optional[float], stage_shares: Dict[str, float]):
+        self.total_seconds = total_seconds
+        self.stage_shares = stage_shares
+        self.deadline = Deadline(total_seconds)
+        self.stages: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        """Run a stage under its own deadline, which never outlives the run deadline.
+
+        Each stage is also recorded as a metrics span and in the weather_stage_seconds gauge.
+        """
+        budget = None
+        if self.total_seconds is not None:
+            budget = self.total_seconds * self.stage_shares.get(name, 1.0)
+        deadline = self.deadline.child(budget)
+        record = {'stage': name, 'budget': budget, 'elapsed': 0.0, 'status': 'ok'}
+        self.stages.append(record)
+        started = time.monotonic()
+        metrics = get_metrics()
+        with metrics.span(f"stage:{name}", budget=budget) as span:
+            try:
+                yield deadline
+            except DeadlineExceeded:
+                record['status'] = 'cancelled'
+            finally:
+                record['elapsed'] = time.monotonic() - started
+                if record['status'] == 'ok' and budget is not None and record['elapsed'] > budget:
+                    record['status'] = 'over budget'
+                span['attributes']['status'] = record['status']
+                metrics.set_gauge('weather_stage_seconds', record['elapsed'], stage=name)
+
+    def report(self) -> List[Dict[str, Any]]:
+        """Get budget, elapsed time and status for every stage run so far."""
+        return list(self.stages)
+
+    def print_report(self):
+        print("\nStage Budgets:")
+        for record in self.stages:
+            budget = f"{record['budget']:.1f}s" if record['budget'] is not None else "unlimited"
+            print(f"{record['stage']}: {record['elapsed']:.1f}s of {budget} ({record['status']})")
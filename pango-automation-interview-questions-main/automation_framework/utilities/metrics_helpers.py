@@ -0,0 +1,253 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, List, Any, Optional, Tuple
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+# Latency buckets in seconds, from a fast SQLite insert to a slow page load
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# HELP text for the metrics the collection pipeline records
+METRIC_HELP = {
+    'weather_web_request_seconds': 'Time per timeanddate.com page scrape attempt',
+    'weather_web_retries_total': 'timeanddate.com scrape attempts that were retried',
+    'weather_web_failures_total': 'timeanddate.com scrapes that returned no data, by reason',
+    'weather_web_listing_cities_total': 'Cities read from timeanddate.com overview pages instead of city pages',
+    'weather_api_request_seconds': 'Time per OpenWeatherMap HTTP request',
+    'weather_api_requests_total': 'OpenWeatherMap responses by HTTP status',
+    'weather_api_failures_total': 'OpenWeatherMap lookups that returned no data, by reason',
+    'weather_api_hedged_requests_total': 'Duplicate OpenWeatherMap requests sent by hedging',
+    'weather_provider_request_seconds': 'Time per provider fetch in a --providers run',
+    'weather_provider_failures_total': 'Provider fetches that returned no reading',
+    'weather_db_write_seconds': 'Time per weather_data write transaction',
+    'weather_db_rows_written_total': 'Rows written to weather_data',
+    'weather_db_writer_queue_depth': 'Records waiting for the write-behind writer',
+    'weather_db_writer_batches_total': 'Transactions committed by the write-behind writer',
+    'weather_db_writer_records_total': 'Records committed by the write-behind writer',
+    'weather_db_writer_backpressure_total': 'Saves that waited because the write-behind queue was full',
+    'weather_db_writer_blocked_seconds': 'Time a save waited for room in the write-behind queue',
+    'weather_db_writer_failures_total': 'Records the write-behind writer could not save',
+    'weather_shard_rows_merged_total': 'Rows copied into this database from other collectors by merge_shards, by source',
+    'weather_db_query_seconds': 'Time per report query',
+    'weather_anomaly_alerts_total': 'Saved readings flagged as anomalous web/API discrepancies',
+    'weather_report_seconds': 'Time to generate a report file',
+    'weather_stage_seconds': 'Wall time of each main.py stage in the last run',
+    'weather_run_rows_per_second': 'Rows saved per second during the last collection stage',
+    'dashboard_view_seconds': 'Time to serve a dashboard view, from cache or freshly computed',
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus expects."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+class MetricsRegistry:
+    """Counters, gauges, latency histograms and trace spans for one process.
+
+    Helpers record into the process-wide registry from get_metrics(); main.py
+    and the collector export it as Prometheus text and store a JSON summary
+    with each run. All methods are thread-safe.
+    """
+
+    def __init__(self, max_spans: int = 10000):
+        self.max_spans = max_spans
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        """Forget everything recorded so far."""
+        with self._lock:
+            self.counters: Dict[str, Dict[LabelKey, float]] = {}
+            self.gauges: Dict[str, Dict[LabelKey, float]] = {}
+            self.histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+            self.help: Dict[str, str] = dict(METRIC_HELP)
+            self.spans: List[Dict[str, Any]] = []
+            self.dropped_spans = 0
+            self._next_span_id = 1
+
+    def describe(self, name: str, help_text: str):
+        """Set the HELP line shown for a metric."""
+        self.help[name] = help_text
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add value to a counter."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self.gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one value (usually seconds) in a histogram."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observe how long the with-block takes, even if it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Record a trace span; spans opened inside it on the same thread become its children."""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        with self._lock:
+            span_id = self._next_span_id
+            self._next_span_id += 1
+        span = {
+            'span_id': span_id,
+            'parent_id': stack[-1] if stack else None,
+            'name': name,
+            'start': time.time(),
+            'duration': None,
+            'status': 'ok',
+            'attributes': attributes
+        }
+        stack.append(span_id)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span['status'] = type(e).__name__
+            raise
+        finally:
+            span['duration'] = time.perf_counter() - started
+            stack.pop()
+            with self._lock:
+                if len(self.spans) < self.max_spans:
+                    self.spans.append(span)
+                else:
+                    self.dropped_spans += 1
+
+    def get_counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self.counters.get(name, {}).get(_label_key(labels), 0)
+
+    def get_histogram(self, name: str, **labels) -> Optional[Histogram]:
+        with self._lock:
+            return self.histograms.get(name, {}).get(_label_key(labels))
+
+    def to_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for kind, metrics in (('counter', self.counters), ('gauge', self.gauges)):
+                for name in sorted(metrics):
+                    if name in self.help:
+                        lines.append(f"# HELP {name} {self.help[name]}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    for key, value in sorted(metrics[name].items()):
+                        lines.append(f"{name}{_format_labels(key)} {value:g}")
+            for name in sorted(self.histograms):
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(self.histograms[name].items()):
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum:g}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str):
+        """Write the Prometheus text to path, e.g. for node_exporter's textfile collector."""
+        with open(path, 'w') as f:
+            f.write(self.to_prometheus())
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-ready summary: counter and gauge values, latency statistics and spans."""
+        def series_name(name, key):
+            return f"{name}{_format_labels(key)}"
+
+        with self._lock:
+            summary = {
+                'counters': {series_name(name, key): value
+                             for name, series in self.counters.items() for key, value in series.items()},
+                'gauges': {series_name(name, key): value
+                           for name, series in self.gauges.items() for key, value in series.items()},
+                'latencies': {
+                    series_name(name, key): {
+                        'count': histogram.count,
+                        'total': round(histogram.sum, 6),
+                        'mean': round(histogram.sum / histogram.count, 6) if histogram.count else 0,
+                        'max': round(histogram.max, 6)
+                    }
+                    for name, series in self.histograms.items() for key, histogram in series.items()
+                },
+                'spans': [dict(span) for span in self.spans],
+                'dropped_spans': self.dropped_spans
+            }
+        return summary
+
+    def serve(self, host: str = '0.0.0.0', port: int = 9100) -> 'ThreadingHTTPServer':
+        """Serve /metrics on a background thread and return the server."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+_metrics = MetricsRegistry()
+
+def get_metrics() -> MetricsRegistry:
+    """Return the process-wide metrics registry."""
+    return _metrics
@@ -0,0 +1,176 @@
+import math
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+class _Record:
+    """Base for __slots__ records that still support the dict-style access older code uses."""
+    __slots__ = ()
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value):
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: str) -> bool:
+        # A field only counts as present when it holds a value
+        return key in self.__slots__ and getattr(self, key) is not None
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __eq__(self, other):
+        if isinstance(other, _Record):
+            return type(self) is type(other) and self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return {key: value for key, value in self.to_dict().items() if value is not None} == \
+                {key: value for key, value in other.items() if value is not None}
+        return NotImplemented
+
+    def __repr__(self):
+        fields = ', '.join(f"{key}={getattr(self, key)!r}" for key in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+class Reading(_Record):
+    """One source's temperature for one city, as returned by WebHelper and ApiHelper."""
+    __slots__ = ('city', 'temperature', 'feels_like', 'source', 'timing')
+
+    def __init__(self, city: str, temperature: float, feels_like: Optional[float] = None,
+                 source: Optional[str] = None, timing: Optional[Dict[str, Any]] = None):
+        self.city = city
+        self.temperature = temperature
+        self.feels_like = feels_like
+        self.source = source
+        self.timing = timing
+
+class Observation(_Record):
+    """A city's web and API readings taken together: one weather_data row."""
+    __slots__ = ('city', 'temperature_web', 'feels_like_web', 'temperature_api', 'feels_like_api', 'timestamp')
+
+    def __init__(self, city: str, temperature_web: float, feels_like_web: Optional[float],
+                 temperature_api: float, feels_like_api: Optional[float], timestamp: Optional[str] = None):
+        self.city = city
+        self.temperature_web = temperature_web
+        self.feels_like_web = feels_like_web
+        self.temperature_api = temperature_api
+        self.feels_like_api = feels_like_api
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_readings(cls, web: Any, api: Any, city: Optional[str] = None) -> 'Observation':
+        """Pair a web and an API reading (Readings or the older dicts)."""
+        return cls(city or web['city'], web['temperature'], web.get('feels_like'),
+                   api['temperature'], api.get('feels_like'))
+
+    @property
+    def discrepancy(self) -> float:
+        return abs(self.temperature_web - self.temperature_api)
+
+def _to_float(value) -> float:
+    return math.nan if value is None else float(value)
+
+def _from_float(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+class ObservationBatch:
+    """Columnar container for many observations.
+
+    Temperatures live in typed arrays (8 bytes a value, NaN for missing)
+    instead of one dict per row. to_numpy() wraps those arrays without
+    copying them. While such views exist the arrays cannot grow, so
+    appending to the batch then raises BufferError.
+
+    discrepancy defaults to |web - api| per row. samples defaults to 1.
+    Aggregated batches (e.g. per time bucket) set both explicitly.
+    """
+
+    FLOAT_COLUMNS = ('temperature_web', 'feels_like_web', 'temperature_api', 'feels_like_api', 'discrepancy')
+    COLUMNS = ('city', 'timestamp') + FLOAT_COLUMNS + ('samples',)
+
+    def __init__(self, observations: Iterable[Any] = ()):
+        self.city: List[str] = []
+        self.timestamp: List[Optional[str]] = []
+        self.temperature_web = array('d')
+        self.feels_like_web = array('d')
+        self.temperature_api = array('d')
+        self.feels_like_api = array('d')
+        self.discrepancy = array('d')
+        self.samples = array('q')
+        self.extend(observations)
+
+    def append_values(self, city: str, temperature_web, feels_like_web, temperature_api, feels_like_api,
+                      timestamp: Optional[str] = None, discrepancy: Optional[float] = None, samples: int = 1):
+        """Append one row from plain values."""
+        self.city.append(city)
+        self.timestamp.append(timestamp)
+        self.temperature_web.append(_to_float(temperature_web))
+        self.feels_like_web.append(_to_float(feels_like_web))
+        self.temperature_api.append(_to_float(temperature_api))
+        self.feels_like_api.append(_to_float(feels_like_api))
+        if discrepancy is None and temperature_web is not None and temperature_api is not None:
+            discrepancy = abs(temperature_web - temperature_api)
+        self.discrepancy.append(_to_float(discrepancy))
+        self.samples.append(samples)
+
+    def append(self, observation: Any):
+        """Append an Observation or a dict with the same keys."""
+        self.append_values(
+            observation['city'], observation['temperature_web'], observation.get('feels_like_web'),
+            observation['temperature_api'], observation.get('feels_like_api'), observation.get('timestamp')
+        )
+
+    def extend(self, observations: Iterable[Any]):
+        for observation in observations:
+            self.append(observation)
+
+    def __len__(self) -> int:
+        return len(self.city)
+
+    def __getitem__(self, index: int) -> Observation:
+        return Observation(
+            self.city[index],
+            _from_float(self.temperature_web[index]),
+            _from_float(self.feels_like_web[index]),
+            _from_float(self.temperature_api[index]),
+            _from_float(self.feels_like_api[index]),
+            self.timestamp[index]
+        )
+
+    def __iter__(self) -> Iterator[Observation]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def rows(self) -> Iterator[tuple]:
+        """(city, temperature_web, feels_like_web, temperature_api, feels_like_api) tuples for executemany."""
+        for index in range(len(self)):
+            yield (
+                self.city[index],
+                _from_float(self.temperature_web[index]),
+                _from_float(self.feels_like_web[index]),
+                _from_float(self.temperature_api[index]),
+                _from_float(self.feels_like_api[index])
+            )
+
+    def to_numpy(self) -> Dict[str, Any]:
+        """Return every column as a NumPy array; the numeric columns share memory with the batch."""
+        import numpy as np
+        columns = {name: np.frombuffer(getattr(self, name), dtype=np.float64) for name in self.FLOAT_COLUMNS}
+        columns['samples'] = np.frombuffer(self.samples, dtype=np.int64)
+        columns['city'] = np.array(self.city, dtype=object)
+        columns['timestamp'] = np.array(self.timestamp, dtype=object)
+        return columns
+
+    def to_dataframe(self):
+        """Return a pandas DataFrame built on the NumPy views, with columns in COLUMNS order."""
+        import pandas as pd
+        columns = self.to_numpy()
+        return pd.DataFrame({name: columns[name] for name in self.COLUMNS}, copy=False)
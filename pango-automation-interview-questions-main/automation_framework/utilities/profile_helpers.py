@@ -0,0 +1,150 @@
+import atexit
+import functools
+import io
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    import cProfile
+    import pstats
+
+class Profiler:
+    """Profile named stages with cProfile and write one .prof file per stage plus a hot-function summary.
+
+    A disabled Profiler's stage() does nothing, so callers can wrap their
+    stages unconditionally. Profiles of the same stage name are merged.
+    Stages may run in several threads at once. Python 3.12+ allows only
+    one active profiler per process, so there a stage that starts while
+    another is running goes unprofiled and is counted in skipped.
+
+    Args:
+        output_dir: Directory for the profile files
+        prefix: Start of every file name, e.g. 'profile_<run_id>'
+        enabled: Whether to profile at all
+        top_n: Functions listed per stage in the summary
+    """
+
+    def __init__(self, output_dir: str, prefix: str = 'profile', enabled: bool = True, top_n: int = 20):
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.enabled = enabled
+        self.top_n = top_n
+        self.stats: Dict[str, 'pstats.Stats'] = {}
+        self.skipped = 0
+        self._last_write = None
+        # Re-entrant, since write() holds it while summary() takes it too
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        # Loaded only when profiling, so a disabled Profiler costs main.py nothing at startup
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # "Another profiling tool is already active": another thread's stage has the profiler
+            with self._lock:
+                self.skipped += 1
+            yield
+            return
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self.add(name, profiler)
+
+    def add(self, name: str, profiler: 'cProfile.Profile'):
+        """Merge a finished profile into the stage's stats."""
+        import pstats
+        with self._lock:
+            if name in self.stats:
+                self.stats[name].add(profiler)
+            else:
+                self.stats[name] = pstats.Stats(profiler)
+
+    def stage_path(self, name: str) -> str:
+        safe_name = ''.join(c if c.isalnum() or c in '-_' else '_' for c in name)
+        return os.path.join(self.output_dir, f"{self.prefix}_{safe_name}.prof")
+
+    @property
+    def summary_path(self) -> str:
+        return os.path.join(self.output_dir, f"{self.prefix}_summary.txt")
+
+    def summary(self) -> str:
+        """Top-N functions per stage, by cumulative and by own time."""
+        out = io.StringIO()
+        with self._lock:
+            for name, stats in self.stats.items():
+                out.write(f"===== {name} ({stats.total_tt:.3f}s profiled) =====\n")
+                for sort_key in ('cumulative', 'tottime'):
+                    out.write(f"\n--- top {self.top_n} by {sort_key} ---\n")
+                    stats.stream = out
+                    stats.sort_stats(sort_key).print_stats(self.top_n)
+        return out.getvalue()
+
+    def write(self) -> Optional[str]:
+        """Write every stage's .prof file (open with snakeviz or pstats) and the summary; return the summary path."""
+        if not self.stats:
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        with self._lock:
+            for name, stats in self.stats.items():
+                stats.dump_stats(self.stage_path(name))
+            with open(self.summary_path, 'w') as f:
+                f.write(self.summary())
+            self._last_write = time.monotonic()
+        return self.summary_path
+
+    def write_every(self, seconds: float) -> Optional[str]:
+        """write(), unless the last write was less than seconds ago."""
+        with self._lock:
+            if self._last_write is not None and time.monotonic() - self._last_write < seconds:
+                return None
+            return self.write()
+
+# Dashboard callback profiling, switched on by the DASHBOARD_PROFILE environment variable
+_dashboard_profiler = None
+
+def get_dashboard_profiler() -> Optional[Profiler]:
+    """Return the dashboard profiler, or None when DASHBOARD_PROFILE is not set."""
+    global _dashboard_profiler
+    if _dashboard_profiler is None and os.environ.get('DASHBOARD_PROFILE'):
+        _dashboard_profiler = Profiler(
+            os.environ.get('DASHBOARD_PROFILE_DIR', 'reports'),
+            prefix=f"profile_dashboard_{os.getpid()}",
+            top_n=int(os.environ.get('DASHBOARD_PROFILE_TOP', 20))
+        )
+        # Whatever was profiled since the last periodic write
+        atexit.register(_dashboard_profiler.write)
+    return _dashboard_profiler
+
+def profiled(name: str):
+    """Decorator that profiles every call of a dashboard callback when DASHBOARD_PROFILE is set.
+
+    The check happens once, at import time: without DASHBOARD_PROFILE the
+    original function is returned unchanged, so profiling costs nothing.
+    Each worker process writes its own file set, at most once every
+    DASHBOARD_PROFILE_WRITE_SECONDS (default 30) and again on exit.
+    """
+    def decorate(func):
+        profiler = get_dashboard_profiler()
+        if profiler is None:
+            return func
+        write_seconds = float(os.environ.get('DASHBOARD_PROFILE_WRITE_SECONDS', 30))
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                with profiler.stage(name):
+                    return func(*args, **kwargs)
+            finally:
+                profiler.write_every(write_seconds)
+        return wrapper
+    return decorate
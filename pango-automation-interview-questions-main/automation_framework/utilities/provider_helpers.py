@@ -0,0 +1,176 @@
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from automation_framework.utilities.deadline_helpers import Deadline, DeadlineExceeded
+from automation_framework.utilities.metrics_helpers import get_metrics
+from automation_framework.utilities.observations import Reading
+
+class WeatherProvider(ABC):
+    """One source of current temperatures, e.g. a website or an API.
+
+    Subclasses set name and implement fetch(). Each provider gets its own
+    limits: at most max_concurrency fetches run at once, and with a
+    rate_limiter (scheduler_helpers.RateLimiter) each fetch first spends
+    one of its tokens. Providers whose client can only be used from the
+    thread that created it set thread_safe = False and run one fetch at a time.
+    """
+
+    name: str = ''
+    thread_safe = True
+
+    def __init__(self, max_concurrency: int = 1, rate_limiter=None):
+        self.max_concurrency = max_concurrency if self.thread_safe else 1
+        self.rate_limiter = rate_limiter
+
+    @abstractmethod
+    def fetch(self, city: str, deadline: Deadline) -> Optional[Reading]:
+        """Return the city's current reading, or None if the source has none."""
+
+    def close(self):
+        """Release browsers, sessions etc.; runs on the same thread as fetch()."""
+
+class WebProvider(WeatherProvider):
+    """timeanddate.com pages, scraped with a WebHelper."""
+
+    name = 'web'
+    # Playwright's sync API only works on the thread that started it
+    thread_safe = False
+
+    def __init__(self, web_helper, rate_limiter=None):
+        super().__init__(1, rate_limiter)
+        self.web_helper = web_helper
+
+    def fetch(self, city: str, deadline: Deadline) -> Optional[Reading]:
+        reading = self.web_helper.get_weather_data(city, deadline=deadline)
+        # Same pause between page loads as the sequential collector
+        deadline.sleep(self.web_helper.request_delay)
+        return reading
+
+    def close(self):
+        self.web_helper.close()
+
+class ApiProvider(WeatherProvider):
+    """The OpenWeatherMap API, queried with an ApiHelper."""
+
+    name = 'api'
+
+    def __init__(self, api_helper, max_concurrency: int = 4, rate_limiter=None):
+        super().__init__(max_concurrency, rate_limiter)
+        self.api_helper = api_helper
+
+    def fetch(self, city: str, deadline: Deadline) -> Optional[Reading]:
+        return self.api_helper.get_weather_data(city, deadline=deadline)
+
+# Provider factories by name: factory(config, city_registry) -> WeatherProvider
+PROVIDER_FACTORIES: Dict[str, Callable[..., WeatherProvider]] = {}
+
+def provider(name: str):
+    """Register a provider factory under name, so --providers can select it."""
+    def register(factory):
+        PROVIDER_FACTORIES[name] = factory
+        return factory
+    return register
+
+@provider('web')
+def create_web_provider(config, registry) -> WeatherProvider:
+    from automation_framework.utilities.web_helpers import WebHelper
+    return WebProvider(WebHelper(debug_mode=True, registry=registry, base_url=config.get_web_base_url()))
+
+@provider('api')
+def create_api_provider(config, registry) -> WeatherProvider:
+    from automation_framework.utilities.api_helpers import ApiHelper
+    return ApiProvider(ApiHelper(api_key=config.get_api_key(), registry=registry, base_url=config.get_api_base_url()))
+
+def create_providers(names: Iterable[str], config, registry) -> List[WeatherProvider]:
+    """Build the named providers, applying each one's [PROVIDER_<NAME>] limits from config.ini."""
+    from automation_framework.utilities.scheduler_helpers import RateLimiter
+    providers = []
+    for name in names:
+        if name not in PROVIDER_FACTORIES:
+            raise ValueError(f"Unknown provider {name!r}; choose from {', '.join(sorted(PROVIDER_FACTORIES))}")
+        instance = PROVIDER_FACTORIES[name](config, registry)
+        settings = config.get_provider_settings(name)
+        if settings['max_concurrency'] and instance.thread_safe:
+            instance.max_concurrency = settings['max_concurrency']
+        if settings['requests_per_minute']:
+            instance.rate_limiter = RateLimiter(settings['requests_per_minute'])
+        providers.append(instance)
+    return providers
+
+class ProviderPool:
+    """Fetch every city from every provider at once, each provider on its own thread pool.
+
+    A run takes about as long as its slowest provider rather than the sum of
+    all of them, and a slow or failing provider never holds up the others'
+    queues. Use as a context manager, or call close() when done.
+    """
+
+    def __init__(self, providers: Iterable[WeatherProvider]):
+        from concurrent.futures import ThreadPoolExecutor
+        self.providers = {instance.name: instance for instance in providers}
+        self._executors = {
+            name: ThreadPoolExecutor(max_workers=instance.max_concurrency, thread_name_prefix=f"provider-{name}")
+            for name, instance in self.providers.items()
+        }
+
+    def _fetch(self, instance: WeatherProvider, city: str, deadline: Deadline) -> Optional[Reading]:
+        metrics = get_metrics()
+        if deadline.expired():
+            return None
+        try:
+            if instance.rate_limiter and not instance.rate_limiter.acquire(timeout=deadline.remaining()):
+                return None
+            with metrics.timer('weather_provider_request_seconds', provider=instance.name):
+                reading = instance.fetch(city, deadline)
+        except DeadlineExceeded:
+            return None
+        except Exception as e:
+            print(f"{instance.name}: error fetching {city}: {str(e)}")
+            metrics.inc('weather_provider_failures_total', provider=instance.name)
+            return None
+        if reading is None:
+            metrics.inc('weather_provider_failures_total', provider=instance.name)
+        return reading
+
+    def collect(self, cities: List[str], deadline: Optional[Deadline] = None,
+                on_city: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Dict[str, Any]]:
+        """Fetch all cities from all providers.
+
+        on_city(city, {provider: reading or None}) is called on the calling
+        thread as soon as every provider has answered for that city, so
+        results can be saved while other cities are still being fetched.
+
+        Returns:
+            dict: city -> {provider name: reading or None}
+        """
+        from concurrent.futures import as_completed
+        deadline = deadline or Deadline()
+        futures = {}
+        # City-major order, so each provider works through the cities in the same order
+        for city in cities:
+            for name, instance in self.providers.items():
+                futures[self._executors[name].submit(self._fetch, instance, city, deadline)] = (city, name)
+        results: Dict[str, Dict[str, Any]] = {city: {} for city in cities}
+        try:
+            for future in as_completed(futures):
+                city, name = futures[future]
+                results[city][name] = future.result()
+                if on_city and len(results[city]) == len(self.providers):
+                    on_city(city, results[city])
+        finally:
+            for future in futures:
+                future.cancel()
+        return results
+
+    def close(self):
+        """Close each provider on its own thread, then stop the thread pools."""
+        for name, executor in self._executors.items():
+            try:
+                executor.submit(self.providers[name].close).result()
+            finally:
+                executor.shutdown(wait=True)
+
+    def __enter__(self) -> 'ProviderPool':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,203 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Dict, Optional
+
+class QueueHelper:
+    """City work queue stored in SQLite, shared by any number of collector processes.
+
+    Workers claim batches of cities under a time-limited lease, renew the lease
+    with heartbeats while they work, and mark cities done or failed when they
+    finish. Leases that expire (e.g. because the worker crashed) are handed out
+    again by the next claim. Collectors on several hosts can share one queue as
+    long as the database lives on a filesystem with working SQLite locking.
+    """
+
+    def __init__(self, db_path: str = "data.db", queue_name: str = "default",
+                 lease_seconds: float = 300, max_attempts: int = 3):
+        self.db_path = db_path
+        self.queue_name = queue_name
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._create_tables()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode so claims can take the write lock up front with BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _create_tables(self):
+        """Create the queue table if it doesn't exist."""
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS work_queue (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    queue TEXT NOT NULL,
+                    city TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    worker_id TEXT,
+                    lease_expires REAL,
+                    heartbeat_at REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    updated_at REAL,
+                    UNIQUE (queue, city)
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_work_queue_claim
+                ON work_queue (queue, status, lease_expires)
+            """)
+        finally:
+            conn.close()
+
+    def enqueue(self, cities: List[str]) -> int:
+        """Add cities to the queue, re-opening any that were already done or failed.
+
+        Cities that are pending or currently leased are left untouched.
+        Returns the number of cities that became pending.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            before = conn.total_changes
+            conn.executemany("""
+                INSERT INTO work_queue (queue, city, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT (queue, city) DO UPDATE SET
+                    status = 'pending', worker_id = NULL, lease_expires = NULL,
+                    attempts = 0, last_error = NULL, updated_at = excluded.updated_at
+                WHERE status IN ('done', 'failed')
+            """, [(self.queue_name, city, now) for city in cities])
+            added = conn.total_changes - before
+            conn.execute("COMMIT")
+            return added
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def claim(self, worker_id: str, batch_size: int = 10) -> List[str]:
+        """Lease up to batch_size pending or expired cities to worker_id."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._reclaim(conn, now)
+            rows = conn.execute("""
+                SELECT id, city FROM work_queue
+                WHERE queue = ? AND status = 'pending'
+                ORDER BY id
+                LIMIT ?
+            """, (self.queue_name, batch_size)).fetchall()
+            conn.executemany("""
+                UPDATE work_queue SET
+                    status = 'leased', worker_id = ?, lease_expires = ?,
+                    heartbeat_at = ?, attempts = attempts + 1, updated_at = ?
+                WHERE id = ?
+            """, [(worker_id, now + self.lease_seconds, now, now, row[0]) for row in rows])
+            conn.execute("COMMIT")
+            return [row[1] for row in rows]
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def heartbeat(self, worker_id: str) -> int:
+        """Extend the lease on every city held by worker_id. Returns the number renewed."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.execute("""
+                UPDATE work_queue SET lease_expires = ?, heartbeat_at = ?, updated_at = ?
+                WHERE queue = ? AND worker_id = ? AND status = 'leased'
+            """, (now + self.lease_seconds, now, now, self.queue_name, worker_id))
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def complete(self, worker_id: str, cities: List[str]) -> int:
+        """Mark cities leased by worker_id as done."""
+        return self._finish(worker_id, cities, "status = 'done', last_error = NULL")
+
+    def fail(self, worker_id: str, cities: List[str], error: str = None) -> int:
+        """Return cities to the queue for another attempt, or mark them failed once out of attempts."""
+        return self._finish(
+            worker_id, cities,
+            "status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END, last_error = ?",
+            (self.max_attempts, error)
+        )
+
+    def release(self, worker_id: str, cities: List[str]) -> int:
+        """Hand cities that worker_id never got to back to the queue without using up an attempt."""
+        return self._finish(worker_id, cities, "status = 'pending', attempts = MAX(attempts - 1, 0)")
+
+    def _finish(self, worker_id: str, cities: List[str], assignments: str, params: tuple = ()) -> int:
+        if not cities:
+            return 0
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.execute(f"""
+                UPDATE work_queue SET {assignments},
+                    worker_id = NULL, lease_expires = NULL, updated_at = ?
+                WHERE queue = ? AND worker_id = ? AND status = 'leased'
+                  AND city IN ({', '.join('?' for _ in cities)})
+            """, (*params, now, self.queue_name, worker_id, *cities))
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def reclaim_expired(self) -> int:
+        """Put cities whose lease has expired back into the pending state."""
+        conn = self._connect()
+        try:
+            return self._reclaim(conn, time.time())
+        finally:
+            conn.close()
+
+    def _reclaim(self, conn: sqlite3.Connection, now: float) -> int:
+        cursor = conn.execute("""
+            UPDATE work_queue SET
+                status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END,
+                worker_id = NULL, lease_expires = NULL,
+                last_error = 'lease expired', updated_at = ?
+            WHERE queue = ? AND status = 'leased' AND lease_expires < ?
+        """, (self.max_attempts, now, self.queue_name, now))
+        return cursor.rowcount
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get the number of cities in each state."""
+        conn = self._connect()
+        try:
+            rows = conn.execute("""
+                SELECT status, COUNT(*) FROM work_queue WHERE queue = ? GROUP BY status
+            """, (self.queue_name,)).fetchall()
+        finally:
+            conn.close()
+        stats = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0}
+        stats.update(dict(rows))
+        return stats
+
+    @contextmanager
+    def keep_alive(self, worker_id: str, interval: Optional[float] = None):
+        """Send heartbeats for worker_id from a background thread while the block runs."""
+        interval = interval or self.lease_seconds / 3
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(interval):
+                self.heartbeat(worker_id)
+
+        thread = threading.Thread(target=beat, name=f"heartbeat-{worker_id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
@@ -1,13 +1,99 @@
 import csv
+import io
+import math
 import os
-from datetime import datetime
-from automation_framework.utilities.config_helpers import ConfigHelper
-from typing import List, Dict, Any
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from itertools import repeat
+from automation_framework.utilities.anomaly_helpers import RunningStats
+from automation_framework.utilities.config_helpers import get_config
+from automation_framework.utilities.metrics_helpers import get_metrics
+from automation_framework.utilities.observations import ObservationBatch
+from typing import List, Dict, Any, Optional, Tuple
+
+# Columns of the partitioned report, which has one row per observation
+PARTITIONED_REPORT_HEADER = ['City', 'Timestamp', 'Web Temperature (°C)', 'API Temperature (°C)',
+                             'Temperature Difference (°C)', 'Exceeds Threshold']
+
+class DiscrepancyStats:
+    """Mergeable summary of |web - api| over one part of a report.
+
+    Count, minimum, maximum and rows over the threshold combine exactly.
+    Mean and standard deviation come from Welford moments (RunningStats),
+    which merge without revisiting the rows.
+    """
+    __slots__ = ('moments', 'min', 'max', 'exceeding')
+
+    def __init__(self, moments: Optional[RunningStats] = None, minimum: float = math.inf,
+                 maximum: float = -math.inf, exceeding: int = 0):
+        self.moments = moments or RunningStats()
+        self.min = minimum
+        self.max = maximum
+        self.exceeding = exceeding
+
+    @classmethod
+    def from_differences(cls, differences, threshold: float) -> 'DiscrepancyStats':
+        """Summarise a NumPy array of |web - api| values."""
+        if not len(differences):
+            return cls()
+        mean = float(differences.mean())
+        moments = RunningStats(count=len(differences), mean=mean, m2=float(((differences - mean) ** 2).sum()))
+        return cls(moments, float(differences.min()), float(differences.max()), int((differences > threshold).sum()))
+
+    def merge(self, other: 'DiscrepancyStats') -> 'DiscrepancyStats':
+        return DiscrepancyStats(self.moments.merge(other.moments), min(self.min, other.min),
+                                max(self.max, other.max), self.exceeding + other.exceeding)
+
+    @property
+    def count(self) -> int:
+        return self.moments.count
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'mean_difference': self.moments.mean if self.count else 0,
+            'stddev_difference': self.moments.stddev,
+            'max_difference': self.max if self.count else 0,
+            'min_difference': self.min if self.count else 0,
+            'rows_exceeding_threshold': self.exceeding
+        }
+
+def _cell(value: float):
+    return '' if math.isnan(value) else value
+
+def _write_partition(db_helper, filters: Dict[str, Any], threshold: float, part_path: str) -> Tuple[int, DiscrepancyStats]:
+    """Write one partition's rows (no header) to part_path and return the row count and its statistics."""
+    import numpy as np
+    batch = db_helper.get_observations(**filters)
+    columns = batch.to_numpy()
+    differences = np.abs(columns['temperature_web'] - columns['temperature_api'])
+    with open(part_path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(
+            (city, timestamp, _cell(web), _cell(api), _cell(round(diff, 1)), 'Yes' if diff > threshold else 'No')
+            for city, timestamp, web, api, diff in zip(
+                batch.city, batch.timestamp, columns['temperature_web'].tolist(),
+                columns['temperature_api'].tolist(), differences.tolist()
+            )
+        )
+    return len(batch), DiscrepancyStats.from_differences(differences[~np.isnan(differences)], threshold)
+
+# One DbHelper per database in each report worker process, reused across partitions
+_worker_db_helpers = {}
+
+def _render_partition(db_path: str, filters: Dict[str, Any], threshold: float,
+                      part_path: str) -> Tuple[int, DiscrepancyStats]:
+    """_write_partition for a process pool worker, which opens the database itself."""
+    from automation_framework.utilities.db_helpers import DbHelper
+    db_helper = _worker_db_helpers.get(db_path)
+    if db_helper is None:
+        db_helper = _worker_db_helpers[db_path] = DbHelper(db_path)
+    return _write_partition(db_helper, filters, threshold, part_path)
 
 class ReportHelper:
     def __init__(self, output_dir: str = "reports"):
         self.output_dir = output_dir
-        self.config = ConfigHelper()
+        self.config = get_config()
         self.report_dir = self.config.get_report_dir()
         self.threshold = self.config.get_temperature_threshold()
         os.makedirs(output_dir, exist_ok=True)
@@ -16,16 +102,18 @@ class ReportHelper:
         """Generate both CSV and HTML reports for the weather data.
         
         Args:
-            weather_data (list): List of dictionaries containing weather data for each city
+            weather_data (list or ObservationBatch): Weather data for each city, as
+                dictionaries or as a batch from DbHelper.get_observations
         """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
-        # Calculate statistics
-        stats = self._calculate_statistics(weather_data)
-        
-        # Generate reports
-        csv_path = self._generate_csv_report(weather_data, stats, timestamp)
-        html_path = self._generate_html_report(weather_data, stats, timestamp)
+        with get_metrics().timer('weather_report_seconds', report='csv_html'):
+            # Calculate statistics
+            stats = self._calculate_statistics(weather_data)
+            
+            # Generate reports
+            csv_path = self._generate_csv_report(weather_data, stats, timestamp)
+            html_path = self._generate_html_report(weather_data, stats, timestamp)
         
         return {
             'csv_path': csv_path,
@@ -35,6 +123,8 @@ class ReportHelper:
     
     def _calculate_statistics(self, weather_data):
         """Calculate statistics for the weather data."""
+        if isinstance(weather_data, ObservationBatch):
+            return self._calculate_batch_statistics(weather_data)
         differences = [abs(d['temperature_web'] - d['temperature_api']) for d in weather_data]
         exceeded_threshold = [d for d in weather_data if abs(d['temperature_web'] - d['temperature_api']) > self.threshold]
         
@@ -46,6 +136,19 @@ class ReportHelper:
             'threshold': self.threshold
         }
     
+    def _calculate_batch_statistics(self, batch):
+        """Same statistics as _calculate_statistics, computed on the batch's arrays with NumPy."""
+        import numpy as np
+        columns = batch.to_numpy()
+        differences = np.abs(columns['temperature_web'] - columns['temperature_api'])
+        return {
+            'mean_difference': float(differences.mean()) if len(differences) else 0,
+            'max_difference': float(differences.max()) if len(differences) else 0,
+            'min_difference': float(differences.min()) if len(differences) else 0,
+            'cities_exceeding_threshold': int((differences > self.threshold).sum()),
+            'threshold': self.threshold
+        }
+    
     def _generate_csv_report(self, weather_data, stats, timestamp):
         """Generate a CSV report."""
         filename = f"{self.output_dir}/weather_report_{timestamp}.csv"
@@ -158,7 +261,7 @@ class ReportHelper:
         filename = f"weather_report_{timestamp}.csv"
         filepath = os.path.join(self.output_dir, filename)
         
-        with open(filepath, 'w', newline='') as f:
+        with get_metrics().timer('weather_report_seconds', report='csv'), open(filepath, 'w', newline='') as f:
             writer = csv.writer(f)
             
             # Write header
@@ -198,4 +301,157 @@ class ReportHelper:
             writer.writerow([])
             writer.writerow(['Report Generated', datetime.now().strftime("%Y-%m-%d %H:%M:%S")])
         
-        return filepath 
\ No newline at end of file
+        return filepath 
+
+    def generate_partitioned_report(self, db_helper, partition_by: str = 'day', workers: Optional[int] = None,
+                                    **filters) -> Dict[str, Any]:
+        """Generate one CSV report over a long history, rendering its partitions in parallel.
+
+        The (filtered) observations are split by 'city' or by 'day' (UTC). A
+        process pool queries and writes each partition, so large reports
+        scale with the number of cores. The parts are then joined into
+        weather_report_<timestamp>.csv in partition order, with statistics
+        merged from each part's DiscrepancyStats.
+        weather_report_<timestamp>_index.csv gives each partition's lines,
+        byte range and statistics, so readers can seek straight to it.
+        Other processes cannot open an in-memory database, so those
+        partitions are rendered in this process.
+
+        Args:
+            db_helper: Database to report on
+            partition_by: 'city' or 'day'
+            workers: Worker processes (default: one per CPU); 1 renders in this process
+            **filters: start, end, cities and min_discrepancy, as for DbHelper queries
+
+        Returns:
+            dict: csv_path, index_path, statistics and partitions (one dict per partition)
+        """
+        from automation_framework.utilities.db_helpers import is_memory_database
+        partitions = self._partition_filters(db_helper, partition_by, filters)
+        workers = min(workers or os.cpu_count() or 1, max(len(partitions), 1))
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        part_dir = tempfile.mkdtemp(prefix='partitions_', dir=self.output_dir)
+        part_paths = [os.path.join(part_dir, f"part_{index:05d}.csv") for index in range(len(partitions))]
+        try:
+            with get_metrics().timer('weather_report_seconds', report='partitioned'):
+                if workers == 1 or is_memory_database(db_helper.db_path):
+                    results = [_write_partition(db_helper, partition_filters, self.threshold, part_path)
+                               for (_, partition_filters), part_path in zip(partitions, part_paths)]
+                else:
+                    from concurrent.futures import ProcessPoolExecutor
+                    with ProcessPoolExecutor(max_workers=workers) as executor:
+                        results = list(executor.map(
+                            _render_partition, repeat(db_helper.db_path),
+                            [partition_filters for _, partition_filters in partitions],
+                            repeat(self.threshold), part_paths
+                        ))
+                return self._merge_partitions(timestamp, [key for key, _ in partitions], part_paths, results)
+        finally:
+            shutil.rmtree(part_dir, ignore_errors=True)
+    
+    @staticmethod
+    def _partition_filters(db_helper, partition_by: str, filters: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+        """Split filters into (partition key, filters for that partition) pairs."""
+        if partition_by == 'city':
+            cities = sorted(filters.get('cities') or db_helper.get_cities())
+            return [(city, dict(filters, cities=[city])) for city in cities]
+        if partition_by == 'day':
+            partitions = []
+            for day in db_helper.get_days(**filters):
+                next_day = (datetime.strptime(day, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+                start = max(filters.get('start') or day, day)
+                end = min(filters.get('end') or next_day, next_day)
+                partitions.append((day, dict(filters, start=start, end=end)))
+            return partitions
+        raise ValueError(f"partition_by must be 'city' or 'day', not {partition_by!r}")
+    
+    def _merge_partitions(self, timestamp: str, keys: List[str], part_paths: List[str],
+                          results: List[Tuple[int, DiscrepancyStats]]) -> Dict[str, Any]:
+        """Join the partition files into the final report and write its index."""
+        def encode_rows(rows):
+            text = io.StringIO()
+            csv.writer(text).writerows(rows)
+            return text.getvalue().encode('utf-8')
+        
+        csv_path = os.path.join(self.output_dir, f"weather_report_{timestamp}.csv")
+        index_path = os.path.join(self.output_dir, f"weather_report_{timestamp}_index.csv")
+        total = DiscrepancyStats()
+        partitions = []
+        with open(csv_path, 'wb') as out:
+            out.write(encode_rows([PARTITIONED_REPORT_HEADER]))
+            line = 2
+            for key, part_path, (rows, stats) in zip(keys, part_paths, results):
+                offset = out.tell()
+                with open(part_path, 'rb') as part:
+                    shutil.copyfileobj(part, out)
+                partitions.append(dict(stats.to_dict(), partition=key, rows=rows, first_line=line,
+                                       byte_offset=offset, bytes=out.tell() - offset))
+                line += rows
+                total = total.merge(stats)
+            statistics = dict(total.to_dict(), threshold=self.threshold)
+            out.write(encode_rows([
+                [],
+                ['Statistics'],
+                ['Rows', sum(partition['rows'] for partition in partitions)],
+                ['Mean Temperature Difference (°C)', round(statistics['mean_difference'], 2)],
+                ['Std Dev of Temperature Difference (°C)', round(statistics['stddev_difference'], 2)],
+                ['Maximum Temperature Difference (°C)', round(statistics['max_difference'], 1)],
+                ['Minimum Temperature Difference (°C)', round(statistics['min_difference'], 1)],
+                ['Rows Exceeding Threshold', statistics['rows_exceeding_threshold']],
+                ['Temperature Threshold (°C)', self.threshold],
+                ['Partitions', len(partitions)],
+                ['Report Generated', datetime.now().strftime("%Y-%m-%d %H:%M:%S")]
+            ]))
+        
+        with open(index_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Partition', 'Rows', 'First Line', 'Byte Offset', 'Bytes', 'Mean Difference (°C)',
+                             'Std Dev (°C)', 'Min Difference (°C)', 'Max Difference (°C)', 'Rows Exceeding Threshold'])
+            for partition in partitions:
+                has_rows = partition['count'] > 0
+                writer.writerow([
+                    partition['partition'], partition['rows'], partition['first_line'], partition['byte_offset'],
+                    partition['bytes'],
+                    f"{partition['mean_difference']:.3f}" if has_rows else '',
+                    f"{partition['stddev_difference']:.3f}" if has_rows else '',
+                    f"{partition['min_difference']:.1f}" if has_rows else '',
+                    f"{partition['max_difference']:.1f}" if has_rows else '',
+                    partition['rows_exceeding_threshold']
+                ])
+        
+        return {
+            'csv_path': csv_path,
+            'index_path': index_path,
+            'statistics': statistics,
+            'partitions': partitions
+        }
+    
+    def generate_timing_report(self, slowest_pages: List[Dict[str, Any]], phase_summary: List[Dict[str, Any]]) -> str:
+        """Generate a CSV report of the slowest page loads and where page-load time goes."""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filepath = os.path.join(self.output_dir, f"page_timing_report_{timestamp}.csv")
+        
+        with get_metrics().timer('weather_report_seconds', report='page_timing'), open(filepath, 'w', newline='') as f:
+            writer = csv.writer(f)
+            
+            writer.writerow(['Slowest Pages'])
+            writer.writerow(['City', 'Total (ms)', 'Dominant Phase', 'Outcome', 'DNS (ms)', 'Connect (ms)', 'TLS (ms)',
+                             'Server (ms)', 'Download (ms)', 'DOM (ms)', 'Selector Wait (ms)', 'Transferred (bytes)'])
+            for page in slowest_pages:
+                writer.writerow([
+                    page['city'],
+                    f"{page['total_ms'] or 0:.0f}",
+                    page['dominant_phase'] or '',
+                    page['outcome'] or '',
+                    *(f"{page[phase] or 0:.0f}" for phase in ['dns_ms', 'connect_ms', 'tls_ms', 'ttfb_ms',
+                                                              'download_ms', 'dom_ms', 'selector_wait_ms']),
+                    (page['transfer_bytes'] or 0) + (page['resource_bytes'] or 0)
+                ])
+            
+            writer.writerow([])
+            writer.writerow(['Phase Summary'])
+            writer.writerow(['Phase', 'Average (ms)', 'Share of Load Time'])
+            for item in phase_summary:
+                writer.writerow([item['phase'], f"{item['avg_ms']:.0f}", f"{item['share']:.0%}"])
+        
+        return filepath
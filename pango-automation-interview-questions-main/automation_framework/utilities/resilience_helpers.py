@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+class CircuitBreaker:
+    """Stop calling an upstream that keeps failing, and probe it now and then until it recovers.
+
+    closed:    calls go through; failure_threshold consecutive failures open the circuit
+    open:      calls fail fast until reset_timeout seconds have passed
+    half-open: a single probe call is let through; success closes the circuit,
+               failure opens it again for another reset_timeout
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 60):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Return True if a call may be made now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            # Open, or half-open with a probe whose result never came back
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+# One breaker per upstream, shared by every helper in the process
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """Return the process-wide circuit breaker for an upstream, creating it on first use."""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, **kwargs)
+        return _breakers[name]
+
+class LatencyTracker:
+    """Rolling window of recent call latencies, used to pick the hedging delay."""
+
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Return the pct-th percentile latency, or None without samples."""
+        with self._lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        index = min(int(len(ordered) * pct / 100), len(ordered) - 1)
+        return ordered[index]
+
+    def __len__(self):
+        return len(self.samples)
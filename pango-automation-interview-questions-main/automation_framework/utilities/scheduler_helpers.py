@@ -0,0 +1,127 @@
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Tuple, Optional
+
+class RateLimiter:
+    """Thread-safe token bucket shared by every helper that talks to an upstream.
+
+    One token is spent per outgoing request; tokens refill continuously at
+    requests_per_minute, with up to burst tokens banked.
+    """
+
+    def __init__(self, requests_per_minute: float, burst: Optional[int] = None):
+        if requests_per_minute <= 0:
+            raise ValueError(f"requests_per_minute must be positive, got {requests_per_minute:g}")
+        self.rate = requests_per_minute / 60.0
+        self.capacity = burst or max(1, int(math.ceil(self.rate)))
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self) -> bool:
+        """Spend a token if one is available, without waiting."""
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Spend a token, waiting until one is available.
+
+        With a timeout, return False instead of waiting longer than timeout
+        seconds; pass a Deadline's remaining() so callers never wait past it.
+        """
+        give_up_at = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            # No point sleeping for a token that only arrives after we have given up
+            if give_up_at is not None and time.monotonic() + wait > give_up_at:
+                return False
+            time.sleep(wait)
+
+class PriorityScheduler:
+    """Rank cities by how much a fresh observation is worth.
+
+    A city's priority grows with the age of its newest observation and is
+    boosted by how much its web/API discrepancy has varied recently, so
+    volatile cities are revisited sooner than stable ones. Cities that have
+    never been observed come first.
+
+    Cities reported through record_attempts() as collected without being
+    saved back off: they are left out for failure_backoff_minutes, doubling
+    with every further failure up to max_backoff_minutes. Once due again,
+    a failing city that was never observed ranks by the minutes since its
+    last attempt instead of first, so it cannot keep taking the head of
+    every batch.
+    """
+
+    def __init__(self, db_helper, cities: List[str], volatility_weight: float = 1.0,
+                 volatility_hours: float = 24, min_age_minutes: float = 5,
+                 failure_backoff_minutes: float = 5, max_backoff_minutes: float = 240):
+        self.db_helper = db_helper
+        self.cities = list(cities)
+        self.volatility_weight = volatility_weight
+        self.volatility_hours = volatility_hours
+        self.min_age_minutes = min_age_minutes
+        self.failure_backoff_minutes = failure_backoff_minutes
+        self.max_backoff_minutes = max_backoff_minutes
+        # city -> (consecutive failures, time of the last failed attempt)
+        self.failures: Dict[str, Tuple[int, datetime]] = {}
+
+    def record_attempts(self, attempted: Iterable[str], saved: Iterable[str]):
+        """Note which of the attempted cities were saved; the others back off."""
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        saved = set(saved)
+        for city in attempted:
+            if city in saved:
+                self.failures.pop(city, None)
+            else:
+                count = self.failures.get(city, (0, now))[0] + 1
+                self.failures[city] = (count, now)
+
+    def _backoff_minutes(self, failures: int) -> float:
+        return min(self.failure_backoff_minutes * 2 ** (failures - 1), self.max_backoff_minutes)
+
+    def rank(self) -> List[Tuple[str, float]]:
+        """Return (city, priority) pairs for cities due for collection, highest priority first."""
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        last_observed = self.db_helper.get_last_observed(self.cities)
+        volatility = self.db_helper.get_discrepancy_volatility(self.volatility_hours)
+
+        ranked = []
+        for city in self.cities:
+            if city in self.failures:
+                failures, last_attempt = self.failures[city]
+                since_attempt_minutes = (now - last_attempt).total_seconds() / 60
+                if since_attempt_minutes < self._backoff_minutes(failures):
+                    continue
+                if last_observed[city] is None:
+                    ranked.append((city, since_attempt_minutes))
+                    continue
+            if last_observed[city] is None:
+                ranked.append((city, math.inf))
+                continue
+            age_minutes = (now - datetime.strptime(last_observed[city], "%Y-%m-%d %H:%M:%S")).total_seconds() / 60
+            if age_minutes < self.min_age_minutes:
+                continue
+            ranked.append((city, age_minutes * (1 + self.volatility_weight * volatility.get(city, 0.0))))
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked
+
+    def next_cities(self, count: int) -> List[str]:
+        """Return up to count cities with the highest priority."""
+        return [city for city, _ in self.rank()[:count]]
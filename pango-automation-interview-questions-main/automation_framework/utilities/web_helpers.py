@@ -1,41 +1,79 @@
 import time
-from playwright.sync_api import sync_playwright, TimeoutError
 from typing import Optional, Dict, Any, List
+from automation_framework.utilities.deadline_helpers import Deadline, DeadlineExceeded
+from automation_framework.utilities.city_registry import CityRegistry
+from automation_framework.utilities.resilience_helpers import CircuitBreaker, get_circuit_breaker
+from automation_framework.utilities.metrics_helpers import get_metrics
+from automation_framework.utilities.observations import Reading
+
+# Navigation and Resource Timing for the loaded page, broken into phases (milliseconds)
+NAVIGATION_TIMING_SCRIPT = """
+    () => {
+        const nav = performance.getEntriesByType('navigation')[0];
+        if (!nav) {
+            return null;
+        }
+        const resources = performance.getEntriesByType('resource');
+        const tls = nav.secureConnectionStart > 0 ? nav.connectEnd - nav.secureConnectionStart : 0;
+        return {
+            dns_ms: nav.domainLookupEnd - nav.domainLookupStart,
+            connect_ms: nav.connectEnd - nav.connectStart - tls,
+            tls_ms: tls,
+            ttfb_ms: nav.responseStart - nav.requestStart,
+            download_ms: nav.responseEnd - nav.responseStart,
+            dom_ms: Math.max((nav.loadEventEnd || nav.domContentLoadedEventEnd) - nav.responseEnd, 0),
+            transfer_bytes: nav.transferSize,
+            resource_count: resources.length,
+            resource_bytes: resources.reduce((sum, r) => sum + (r.transferSize || 0), 0)
+        };
+    }
+"""
+
+# (href, temperature text) for every city linked from an overview table; the
+# /weather/ index puts several cities in each row, so pair each link with the
+# next cell that shows a temperature
+LISTING_SCRIPT = """
+    () => {
+        const rows = [];
+        for (const link of document.querySelectorAll('table td a[href*="/weather/"]')) {
+            let cell = link.closest('td').nextElementSibling;
+            while (cell && !cell.querySelector('a[href*="/weather/"]')) {
+                if (cell.textContent.includes('°')) {
+                    rows.push([link.getAttribute('href'), cell.textContent.trim()]);
+                    break;
+                }
+                cell = cell.nextElementSibling;
+            }
+        }
+        return rows;
+    }
+"""
 
 class WebHelper:
-    def __init__(self, debug_mode: bool = False, headless: bool = True):
+    def __init__(self, debug_mode: bool = False, headless: bool = True, rate_limiter=None,
+                 registry: Optional[CityRegistry] = None, circuit_breaker: Optional[CircuitBreaker] = None,
+                 base_url: str = "https://www.timeanddate.com/weather/"):
         self.debug_mode = debug_mode
         self.headless = headless
-        self.base_url = "https://www.timeanddate.com/weather/"
+        # Optional RateLimiter shared with other helpers to cap total requests per minute
+        self.rate_limiter = rate_limiter
+        self.base_url = base_url
         self.playwright = None
         self.browser = None
         self.max_retries = 3
         self.retry_delay = 5  # seconds
-        
-        # Map of cities to their country codes
-        self.city_country_map = {
-            "London": "uk",
-            "Paris": "france",
-            "New York": "usa",
-            "Tokyo": "japan",
-            "Sydney": "australia",
-            "Berlin": "germany",
-            "Rome": "italy",
-            "Madrid": "spain",
-            "Moscow": "russia",
-            "Dubai": "uae",
-            "Singapore": "singapore",
-            "Hong Kong": "hong-kong",
-            "Toronto": "canada",
-            "Seoul": "south-korea",
-            "Istanbul": "turkey",
-            "Bangkok": "thailand",
-            "Amsterdam": "netherlands",
-            "Vienna": "austria",
-            "Stockholm": "sweden",
-            "Cairo": "egypt"
-        }
+        self.request_delay = 3  # seconds between cities
+        # Registry holding each city's timeanddate.com page path; the default one is opened on first use
+        self._registry = registry
+        # Stop retrying and fail fast while timeanddate.com keeps failing
+        self.circuit_breaker = circuit_breaker or get_circuit_breaker('timeanddate')
     
+    @property
+    def registry(self) -> CityRegistry:
+        if self._registry is None:
+            self._registry = CityRegistry()
+        return self._registry
+
     def _log_debug(self, message: str):
         """Log debug messages if debug mode is enabled."""
         if self.debug_mode:
@@ -68,12 +106,18 @@ class WebHelper:
     def _init_browser(self):
         """Initialize the browser if not already initialized."""
         if not self.playwright:
+            # Imported here so runs that never open a page don't pay for loading Playwright
+            from playwright.sync_api import sync_playwright
             self.playwright = sync_playwright().start()
             self.browser = self.playwright.chromium.launch(
                 headless=self.headless,
                 args=['--disable-dev-shm-usage', '--no-sandbox']
             )
 
+    def close(self):
+        """Release the browser once no more cities will be scraped."""
+        self._close_browser()
+
     def _close_browser(self):
         """Close the browser and playwright instance."""
         if self.browser:
@@ -83,28 +127,76 @@ class WebHelper:
             self.playwright.stop()
             self.playwright = None
 
-    def get_weather_data(self, city: str) -> Optional[Dict[str, Any]]:
-        """Get weather data for a single city."""
+    def _capture_timing(self, page, load_started: float, selector_started: Optional[float]) -> Dict[str, Any]:
+        """Read the page's navigation timing and add our own page-load and selector-wait times.
+
+        Without selector_started the page never finished loading, so only the total is known.
+        """
+        now = time.perf_counter()
+        timing = {}
+        if selector_started is not None:
+            try:
+                timing = page.evaluate(NAVIGATION_TIMING_SCRIPT) or {}
+            except Exception as e:
+                self._log_debug(f"Could not read navigation timing: {str(e)}")
+            timing['selector_wait_ms'] = (now - selector_started) * 1000
+        timing['total_ms'] = (now - load_started) * 1000
+        return timing
+
+    def get_weather_data(self, city: str, deadline: Optional[Deadline] = None,
+                         timings: Optional[List[Dict[str, Any]]] = None) -> Optional[Reading]:
+        """Get weather data for a single city.
+        
+        Page loads, selector waits and retry delays are clipped to the deadline,
+        and no new attempt starts once it has passed. No attempt starts while
+        the timeanddate.com circuit breaker is open. The result carries the
+        page's load timing phases under 'timing'.
+
+        Every attempt that loaded a page, failed or not, appends its timing to
+        timings, tagged with its 'attempt' number and 'outcome': 'ok',
+        'load_error' (goto failed), 'selector_error', 'no_temperature',
+        'parse_error', 'error' or 'deadline'.
+        """
+        deadline = deadline or Deadline()
+        metrics = get_metrics()
         for attempt in range(self.max_retries):
+            page = None
+            attempt_started = None
+            selector_started = None
+            timing = None
+            outcome = 'failed'
+            # What became of this attempt, for its page timing
+            result = 'error'
             try:
+                deadline.check()
+                if not self.circuit_breaker.allow_request():
+                    self._log_debug(f"Skipping {city}: timeanddate.com circuit is open")
+                    metrics.inc('weather_web_failures_total', reason='circuit_open')
+                    return None
                 self._init_browser()
                 page = self.browser.new_page()
                 
-                # Get country code for the city
-                country_code = self.city_country_map.get(city)
-                if not country_code:
-                    self._log_debug(f"No country code found for {city}")
+                # Look up the city's page
+                record = self.registry.get(city)
+                if not record:
+                    self._log_debug(f"{city} is not in the city registry")
+                    metrics.inc('weather_web_failures_total', reason='not_registered')
                     return None
-                
-                # Format city name for URL
-                city_url = city.lower().replace(" ", "-")
-                url = f"{self.base_url}{country_code}/{city_url}"
+                url = f"{self.base_url}{record.url_path}"
                 
                 self._log_debug(f"Processing {city} (Attempt {attempt + 1}/{self.max_retries})")
-                page.goto(url, timeout=60000)
+                if self.rate_limiter and not self.rate_limiter.acquire(timeout=deadline.remaining()):
+                    raise DeadlineExceeded("Deadline exceeded waiting for the rate limiter")
+                attempt_started = time.perf_counter()
+                page.goto(url, timeout=deadline.timeout_ms(60000))
                 
                 # Wait for the main content to load
-                page.wait_for_selector("div#wt-temp, div.h2", timeout=30000)
+                selector_started = time.perf_counter()
+                page.wait_for_selector("div#wt-temp, div.h2", timeout=deadline.timeout_ms(30000))
+                timing = self._capture_timing(page, attempt_started, selector_started)
+                # The site answered. A page without a usable temperature is this city's problem,
+                # so, like a 404 from the API, it does not count against the circuit
+                self.circuit_breaker.record_success()
                 
                 # Try different selectors for temperature
                 temp_element = None
@@ -115,18 +207,24 @@ class WebHelper:
                 
                 if not temp_element:
                     self._log_debug(f"Temperature element not found for {city}")
+                    result = 'no_temperature'
                     if attempt < self.max_retries - 1:
-                        time.sleep(self.retry_delay)
+                        metrics.inc('weather_web_retries_total')
+                        deadline.sleep(self.retry_delay)
                         continue
+                    metrics.inc('weather_web_failures_total', reason='no_temperature')
                     return None
                 
                 temp_text = temp_element.inner_text()
                 temperature = self._extract_temperature(temp_text)
                 if temperature is None:
                     self._log_debug(f"Could not extract temperature for {city}")
+                    result = 'parse_error'
                     if attempt < self.max_retries - 1:
-                        time.sleep(self.retry_delay)
+                        metrics.inc('weather_web_retries_total')
+                        deadline.sleep(self.retry_delay)
                         continue
+                    metrics.inc('weather_web_failures_total', reason='parse_error')
                     return None
                 
                 # Get feels like temperature
@@ -156,24 +254,118 @@ class WebHelper:
                             break
                 
                 self._log_debug(f"{city}: {temperature}°C (feels like: {feels_like}°C)")
+                outcome = result = 'ok'
                 
-                return {
-                    'city': city,
-                    'temperature': temperature,
-                    'feels_like': feels_like
-                }
+                return Reading(city, temperature, feels_like, source='web', timing=timing)
                 
+            except DeadlineExceeded:
+                self._log_debug(f"Deadline reached while processing {city}")
+                result = 'deadline'
+                metrics.inc('weather_web_failures_total', reason='deadline')
+                return None
             except Exception as e:
                 self._log_debug(f"Error processing {city}: {str(e)}")
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay)
+                if selector_started is None:
+                    result = 'load_error'
+                elif timing is None:
+                    result = 'selector_error'
+                if attempt_started is not None and timing is None:
+                    # Now, so the retry delay below is not counted as page-load time
+                    timing = self._capture_timing(page, attempt_started, selector_started)
+                self.circuit_breaker.record_failure()
+                if attempt < self.max_retries - 1 and not deadline.expired():
+                    metrics.inc('weather_web_retries_total')
+                    deadline.sleep(self.retry_delay)
                     continue
+                metrics.inc('weather_web_failures_total', reason='error')
                 return None
             finally:
+                if attempt_started is not None:
+                    metrics.observe('weather_web_request_seconds', time.perf_counter() - attempt_started,
+                                    outcome=outcome)
+                    if timing is None:
+                        timing = self._capture_timing(page, attempt_started, selector_started)
+                    timing.update(attempt=attempt + 1, outcome=result)
+                    if timings is not None:
+                        timings.append(timing)
                 if page:
                     page.close()
     
-    def get_weather_data_batch(self, cities: List[str]) -> List[Dict[str, Any]]:
+    def _scrape_listing(self, path: str, deadline: Deadline) -> Dict[str, float]:
+        """Load one overview page (the /weather/ index or a country listing) and return {url_path: temperature}."""
+        metrics = get_metrics()
+        if not self.circuit_breaker.allow_request():
+            self._log_debug(f"Skipping overview page '{path}': timeanddate.com circuit is open")
+            return {}
+        page = None
+        started = time.perf_counter()
+        try:
+            self._init_browser()
+            page = self.browser.new_page()
+            if self.rate_limiter and not self.rate_limiter.acquire(timeout=deadline.remaining()):
+                raise DeadlineExceeded("Deadline exceeded waiting for the rate limiter")
+            page.goto(f"{self.base_url}{path}", timeout=deadline.timeout_ms(60000))
+            page.wait_for_selector("table td a", timeout=deadline.timeout_ms(30000))
+            rows = page.evaluate(LISTING_SCRIPT)
+        except DeadlineExceeded:
+            return {}
+        except Exception as e:
+            self._log_debug(f"Error loading overview page '{path}': {str(e)}")
+            self.circuit_breaker.record_failure()
+            metrics.inc('weather_web_failures_total', reason='listing_error')
+            return {}
+        finally:
+            metrics.observe('weather_web_request_seconds', time.perf_counter() - started, outcome='listing')
+            if page:
+                page.close()
+        self.circuit_breaker.record_success()
+
+        temperatures = {}
+        for href, temp_text in rows:
+            if '/weather/' not in href:
+                continue
+            url_path = href.split('/weather/', 1)[1].strip('/').lower()
+            temperature = self._extract_temperature(temp_text)
+            if url_path and temperature is not None:
+                temperatures[url_path] = temperature
+        self._log_debug(f"Overview page '{path}' listed {len(temperatures)} cities")
+        return temperatures
+
+    def get_listing_weather(self, cities: List[str], deadline: Optional[Deadline] = None) -> Dict[str, Reading]:
+        """Read many cities' current temperatures from timeanddate.com's overview pages.
+
+        Loads the /weather/ index, then the listing page of each country that
+        still has cities unaccounted for, so N cities cost a handful of page
+        loads. Listings show no feels-like temperature, so it comes back as
+        None. Cities missing from every listing are left out of the result;
+        fetch those with get_weather_data.
+
+        Returns:
+            dict: city -> Reading, with feels_like None
+        """
+        deadline = deadline or Deadline()
+        wanted = {}
+        for city in cities:
+            record = self.registry.get(city)
+            if record:
+                wanted[record.url_path.lower()] = (city, record.country_slug)
+
+        results = {}
+        for path in [''] + sorted({country for _, country in wanted.values()}):
+            missing = {url_path: city for url_path, (city, country) in wanted.items()
+                       if city not in results and (not path or country == path)}
+            if not missing:
+                continue
+            if deadline.expired():
+                break
+            for url_path, temperature in self._scrape_listing(path, deadline).items():
+                if url_path in missing:
+                    city = missing[url_path]
+                    results[city] = Reading(city, temperature, source='web')
+        get_metrics().inc('weather_web_listing_cities_total', len(results))
+        return results
+
+    def get_weather_data_batch(self, cities: List[str]) -> List[Reading]:
         """Get weather data for multiple cities."""
         results = []
         try:
@@ -182,7 +374,7 @@ class WebHelper:
                 data = self.get_weather_data(city)
                 if data:
                     results.append(data)
-                time.sleep(3)  # Increased delay between requests
+                time.sleep(self.request_delay)
         finally:
             self._close_browser()
         return results 
\ No newline at end of file
@@ -0,0 +1,157 @@
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+from automation_framework.utilities.metrics_helpers import get_metrics
+
+# Queue markers: write what is pending now / write what is pending and stop
+_FLUSH = object()
+_STOP = object()
+
+class DbWriter:
+    """Write-behind persistence for a DbHelper.
+
+    save_weather_data(), save_readings() and save_page_timing() take the
+    same arguments as DbHelper's and only put the record on a bounded
+    queue, so collectors never wait for SQLite. A single writer thread
+    drains the queue and saves up to batch_size records per transaction,
+    committing at the latest flush_seconds after the first one arrived:
+    one commit (and one journal sync) per batch instead of one per row.
+
+    When the queue holds max_queue records, the save methods block until
+    the writer catches up (backpressure) rather than buffer without limit.
+    flush() waits until everything queued so far is committed and returns
+    the cities whose records could not be saved since the last flush, so
+    callers do not treat them as done; close() flushes and stops the
+    thread. Use as a context manager.
+
+    Reads go straight to the DbHelper, so flush() before reading back
+    what was just saved.
+    """
+
+    def __init__(self, db_helper, max_queue: int = 1000, batch_size: int = 100, flush_seconds: float = 1.0):
+        self.db_helper = db_helper
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.failed = 0
+        self._failed_cities: Set[str] = set()
+        self._failed_lock = threading.Lock()
+        self._queue: 'queue.Queue[Any]' = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+
+    def save_weather_data(self, web_data: Dict[str, Any], api_data: Dict[str, Any], run_id: Optional[str] = None):
+        self._put(('weather_data', (web_data, api_data, run_id)))
+
+    def save_readings(self, city: str, readings: Dict[str, Any], run_id: Optional[str] = None):
+        self._put(('readings', (city, readings, run_id)))
+
+    def save_page_timing(self, city: str, timing: Dict[str, Any], run_id: Optional[str] = None):
+        self._put(('page_timing', (city, timing, run_id)))
+
+    def _put(self, item):
+        if self._closed:
+            raise RuntimeError("DbWriter is closed")
+        metrics = get_metrics()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # Backpressure: wait for the writer instead of growing the queue
+            metrics.inc('weather_db_writer_backpressure_total')
+            with metrics.timer('weather_db_writer_blocked_seconds'):
+                self._queue.put(item)
+        metrics.set_gauge('weather_db_writer_queue_depth', self._queue.qsize())
+
+    def pending(self) -> int:
+        """Records queued but not yet handed to the writer thread."""
+        return self._queue.qsize()
+
+    def flush(self) -> Set[str]:
+        """Block until every record queued before this call is committed or has failed.
+
+        Returns the cities with a record that failed since the previous flush.
+        """
+        if not self._closed:
+            self._queue.put(_FLUSH)
+            self._queue.join()
+        with self._failed_lock:
+            failed, self._failed_cities = self._failed_cities, set()
+        return failed
+
+    def close(self):
+        """Write everything still queued and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def __enter__(self) -> 'DbWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _next_batch(self) -> Tuple[List[Tuple[str, tuple]], int, bool]:
+        """Wait for the next batch; return (records, queue items taken, whether to stop)."""
+        item = self._queue.get()
+        taken = 1
+        if item is _STOP:
+            return [], taken, True
+        if item is _FLUSH:
+            return [], taken, False
+        records = [item]
+        started = time.monotonic()
+        while len(records) < self.batch_size:
+            remaining = self.flush_seconds - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            taken += 1
+            if item is _STOP:
+                return records, taken, True
+            if item is _FLUSH:
+                break
+            records.append(item)
+        return records, taken, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            records, taken, stop = self._next_batch()
+            try:
+                if records:
+                    self._write(records)
+            finally:
+                for _ in range(taken):
+                    self._queue.task_done()
+                get_metrics().set_gauge('weather_db_writer_queue_depth', self._queue.qsize())
+
+    def _write(self, records: List[Tuple[str, tuple]]):
+        metrics = get_metrics()
+        try:
+            self.db_helper.save_records(records)
+            metrics.inc('weather_db_writer_batches_total')
+            metrics.inc('weather_db_writer_records_total', len(records))
+            return
+        except Exception as e:
+            print(f"Batch of {len(records)} records failed ({str(e)}); saving them one by one")
+        # Keep the good records of a failed batch; only the bad ones are lost
+        for record in records:
+            try:
+                self.db_helper.save_records([record])
+            except Exception as e:
+                self.failed += 1
+                with self._failed_lock:
+                    self._failed_cities.add(_record_city(record))
+                metrics.inc('weather_db_writer_failures_total')
+                print(f"Could not save a {record[0]} record: {str(e)}")
+
+def _record_city(record: Tuple[str, tuple]) -> str:
+    """The city a queued record belongs to."""
+    kind, args = record
+    return args[0]['city'] if kind == 'weather_data' else args[0]
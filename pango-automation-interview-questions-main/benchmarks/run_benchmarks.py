@@ -0,0 +1,316 @@
+"""Time the database, report and dashboard code paths against synthetic data of several sizes.
+
+Run from the project root:
+
+    python -m benchmarks.run_benchmarks --rows 1000 100000 1000000 --output before.json
+    python -m benchmarks.run_benchmarks --rows 1000 100000 1000000 --output after.json --compare before.json
+
+--in-memory loads each generated database into memory first, which takes
+disk I/O out of the timings. Those results are keyed '<name>@<rows>:memory'
+so they are never compared against on-disk runs.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Any, Optional
+from benchmarks.synthetic_data import generate_weather_data
+from automation_framework.utilities.db_helpers import DbHelper
+
+# name -> function(context) returning the callable to time
+BENCHMARKS: Dict[str, Callable[['BenchmarkContext'], Callable[[], Any]]] = {}
+
+def benchmark(name: str):
+    """Register a benchmark under name."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+class BenchmarkContext:
+    """The generated database for one size, plus scratch space for benchmarks that write."""
+
+    def __init__(self, db_path: str, rows: int, work_dir: str, in_memory: bool = False):
+        self.db_path = db_path
+        self.rows = rows
+        self.work_dir = work_dir
+        self.in_memory = in_memory
+        self.db_helper = DbHelper.from_snapshot(db_path) if in_memory else DbHelper(db_path)
+        self._scratch_db_helper = None
+
+    @property
+    def scratch_db_helper(self) -> DbHelper:
+        """A DbHelper on a copy of the database, so writes don't change what the read benchmarks see."""
+        if self._scratch_db_helper is None:
+            if self.in_memory:
+                self._scratch_db_helper = DbHelper.from_snapshot(self.db_path)
+            else:
+                scratch_path = os.path.join(self.work_dir, f"scratch_{self.rows}.db")
+                shutil.copyfile(self.db_path, scratch_path)
+                self._scratch_db_helper = DbHelper(scratch_path)
+        return self._scratch_db_helper
+
+    def close(self):
+        self.db_helper.close()
+        if self._scratch_db_helper is not None:
+            self._scratch_db_helper.close()
+
+def sample_pair(i: int):
+    web = {'city': f"City {i % 500}", 'temperature': 20.0, 'feels_like': 19.0}
+    api = {'temperature': 21.0, 'feels_like': 20.0}
+    return web, api
+
+@benchmark('db.get_discrepancy_report')
+def bench_discrepancy_report(ctx):
+    return lambda: ctx.db_helper.get_discrepancy_report(2.0)
+
+@benchmark('db.get_summary_stats')
+def bench_summary_stats(ctx):
+    return lambda: ctx.db_helper.get_summary_stats()
+
+@benchmark('report.generate_csv_report')
+def bench_generate_csv_report(ctx):
+    from automation_framework.utilities.report_helpers import ReportHelper
+    report_helper = ReportHelper(output_dir=os.path.join(ctx.work_dir, 'reports'))
+    discrepancy_data = ctx.db_helper.get_discrepancy_report(2.0)
+    stats = ctx.db_helper.get_summary_stats()
+    return lambda: report_helper.generate_csv_report(discrepancy_data, stats)
+
+@benchmark('report.generate_reports')
+def bench_generate_reports(ctx):
+    from automation_framework.utilities.report_helpers import ReportHelper
+    report_helper = ReportHelper(output_dir=os.path.join(ctx.work_dir, 'reports'))
+    report_helper.report_dir = report_helper.output_dir
+    weather_data = ctx.db_helper.get_discrepancy_report(2.0)
+    return lambda: report_helper.generate_reports(weather_data)
+
+@benchmark('db.get_observations')
+def bench_get_observations(ctx):
+    return lambda: ctx.db_helper.get_observations()
+
+@benchmark('db.get_city_history')
+def bench_get_city_history(ctx):
+    return lambda: ctx.db_helper.get_city_history(bucket_seconds=3600, window_seconds=86400)
+
+@benchmark('db.get_worst_cities')
+def bench_get_worst_cities(ctx):
+    return lambda: ctx.db_helper.get_worst_cities(period_seconds=86400, k=5)
+
+@benchmark('report.generate_reports_batch')
+def bench_generate_reports_batch(ctx):
+    from automation_framework.utilities.report_helpers import ReportHelper
+    report_helper = ReportHelper(output_dir=os.path.join(ctx.work_dir, 'reports'))
+    report_helper.report_dir = report_helper.output_dir
+    batch = ctx.db_helper.get_observations(min_discrepancy=2.0)
+    return lambda: report_helper.generate_reports(batch)
+
+@benchmark('report.generate_partitioned_report')
+def bench_generate_partitioned_report(ctx):
+    from automation_framework.utilities.report_helpers import ReportHelper
+    report_helper = ReportHelper(output_dir=os.path.join(ctx.work_dir, 'reports'))
+    return lambda: report_helper.generate_partitioned_report(ctx.db_helper, 'day')
+
+def _dashboard(ctx):
+    """Import the dashboard pointed at this size's database, with an empty figure cache."""
+    os.environ['DASHBOARD_DB_PATH'] = ctx.db_helper.db_path
+    os.environ['DASHBOARD_CACHE_PATH'] = os.path.join(ctx.work_dir, 'dashboard_cache.db')
+    from automation_framework.dashboard import app as dashboard
+    dashboard._db_helper = None
+    dashboard._figure_cache = None
+    dashboard.get_figure_cache().clear()
+    return dashboard
+
+@benchmark('dashboard.update_stats')
+def bench_dashboard_stats(ctx):
+    dashboard = _dashboard(ctx)
+    return lambda: dashboard.build_stats({})
+
+@benchmark('dashboard.update_scatter')
+def bench_dashboard_scatter(ctx):
+    dashboard = _dashboard(ctx)
+    return lambda: dashboard.build_scatter_figure({})
+
+@benchmark('dashboard.update_discrepancy_bar')
+def bench_dashboard_bar(ctx):
+    dashboard = _dashboard(ctx)
+    return lambda: dashboard.build_discrepancy_bar_figure({})
+
+@benchmark('dashboard.update_feels_like')
+def bench_dashboard_feels_like(ctx):
+    dashboard = _dashboard(ctx)
+    return lambda: dashboard.build_feels_like_figure({})
+
+@benchmark('dashboard.cached_scatter')
+def bench_dashboard_cached(ctx):
+    dashboard = _dashboard(ctx)
+    dashboard.cached('temp-scatter', dashboard.build_scatter_figure)
+    return lambda: dashboard.cached('temp-scatter', dashboard.build_scatter_figure)
+
+# Write benchmarks run last and on a scratch copy of the database
+@benchmark('db.save_weather_data x100')
+def bench_save_weather_data(ctx):
+    db_helper = ctx.scratch_db_helper
+    def save():
+        for i in range(100):
+            db_helper.save_weather_data(*sample_pair(i))
+    return save
+
+@benchmark('writer.save_weather_data x100')
+def bench_writer_save_weather_data(ctx):
+    """The same 100 saves as db.save_weather_data x100, queued and committed by a DbWriter."""
+    from automation_framework.utilities.writer_helpers import DbWriter
+    db_helper = ctx.scratch_db_helper
+    def save():
+        with DbWriter(db_helper) as writer:
+            for i in range(100):
+                writer.save_weather_data(*sample_pair(i))
+    return save
+
+@benchmark('db.save_weather_data_batch x10000')
+def bench_save_weather_data_batch(ctx):
+    db_helper = ctx.scratch_db_helper
+    pairs = [sample_pair(i) for i in range(10_000)]
+    return lambda: db_helper.save_weather_data_batch(pairs)
+
+def time_call(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return {
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+        'max_s': max(timings)
+    }
+
+def get_database(data_dir: str, rows: int, seed: int, city_count: int) -> str:
+    """Return the path of a generated database, generating it only if it isn't there yet."""
+    os.makedirs(data_dir, exist_ok=True)
+    db_path = os.path.join(data_dir, f"weather_{rows}_{city_count}_{seed}.db")
+    if not os.path.exists(db_path):
+        print(f"Generating {rows:,} rows...")
+        partial_path = db_path + '.partial'
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        started = time.perf_counter()
+        generate_weather_data(partial_path, rows, city_count=city_count, seed=seed)
+        os.replace(partial_path, db_path)
+        print(f"Generated in {time.perf_counter() - started:.1f}s")
+    return db_path
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+def run_benchmarks(row_counts: List[int], repeat: int = 5, only: Optional[List[str]] = None,
+                   data_dir: Optional[str] = None, seed: int = 42, city_count: int = 20,
+                   in_memory: bool = False) -> Dict[str, Any]:
+    """Run every selected benchmark at every size and return the results document."""
+    data_dir = data_dir or os.path.join(tempfile.gettempdir(), 'weather_benchmarks')
+    names = [name for name in BENCHMARKS if not only or any(name.startswith(prefix) for prefix in only)]
+    results = {}
+    for rows in row_counts:
+        db_path = get_database(data_dir, rows, seed, city_count)
+        with tempfile.TemporaryDirectory() as work_dir:
+            ctx = BenchmarkContext(db_path, rows, work_dir, in_memory=in_memory)
+            try:
+                for name in names:
+                    func = BENCHMARKS[name](ctx)
+                    timing = time_call(func, repeat)
+                    key = f"{name}@{rows}" + (':memory' if in_memory else '')
+                    results[key] = {'benchmark': name, 'rows': rows, 'repeat': repeat, **timing}
+                    print(f"{name:<36} {rows:>10,} rows  median {timing['median_s'] * 1000:10.2f} ms")
+            finally:
+                ctx.close()
+    return {'environment': environment(), 'seed': seed, 'city_count': city_count, 'in_memory': in_memory,
+            'results': results}
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.1) -> List[Dict[str, Any]]:
+    """Compare median timings of the benchmarks present in both result documents.
+
+    A benchmark is a regression when it got slower by more than tolerance
+    (a fraction), and an improvement when it got faster by more than that.
+    """
+    rows = []
+    for key, result in current['results'].items():
+        if key not in baseline['results']:
+            continue
+        before = baseline['results'][key]['median_s']
+        ratio = result['median_s'] / before if before else float('inf')
+        if ratio > 1 + tolerance:
+            status = 'regression'
+        elif ratio < 1 - tolerance:
+            status = 'improvement'
+        else:
+            status = 'unchanged'
+        rows.append({'key': key, 'before_s': before, 'after_s': result['median_s'], 'ratio': ratio, 'status': status})
+    return rows
+
+def print_comparison(rows: List[Dict[str, Any]]):
+    print("\nComparison with baseline (median):")
+    for row in rows:
+        print(f"{row['key']:<48} {row['before_s'] * 1000:10.2f} ms -> {row['after_s'] * 1000:10.2f} ms "
+              f"({row['ratio']:.2f}x, {row['status']})")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark database, report and dashboard code on synthetic data")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10_000, 100_000],
+                        help="Table sizes to benchmark (1k to 10M rows)")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument('--only', nargs='+', help="Only run benchmarks whose name starts with one of these prefixes")
+    parser.add_argument('--seed', type=int, default=42, help="Seed for the synthetic data")
+    parser.add_argument('--cities', type=int, default=20, help="Number of synthetic cities")
+    parser.add_argument('--data-dir', help="Where generated databases are kept between runs")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    parser.add_argument('--compare', metavar='BASELINE', help="Compare against an earlier results file")
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help="Slowdown (as a fraction) reported as a regression")
+    parser.add_argument('--in-memory', action='store_true',
+                        help="Load each generated database into memory before timing")
+    parser.add_argument('--list', action='store_true', help="List the benchmarks and exit")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+
+    results = run_benchmarks(args.rows, repeat=args.repeat, only=args.only, data_dir=args.data_dir,
+                             seed=args.seed, city_count=args.cities, in_memory=args.in_memory)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = compare(baseline, results, args.tolerance)
+        print_comparison(rows)
+        if any(row['status'] == 'regression' for row in rows):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import random
+import sqlite3
+from datetime import datetime, timedelta
+from typing import List
+from automation_framework.utilities.city_list import DEFAULT_CITIES
+from automation_framework.utilities.db_helpers import DbHelper
+
+def synthetic_cities(count: int) -> List[str]:
+    """The default cities first, then 'City 21', 'City 22', ... up to count."""
+    names = [name for name, _ in DEFAULT_CITIES][:count]
+    return names + [f"City {i}" for i in range(len(names) + 1, count + 1)]
+
+def generate_weather_data(db_path: str, rows: int, city_count: int = 20, days: float = 30,
+                          seed: int = 42, chunk_size: int = 100_000) -> DbHelper:
+    """Fill db_path with rows synthetic weather_data rows and return a DbHelper for it.
+
+    The same seed always produces the same rows. Observations are spread evenly
+    over the last `days` days ending at a fixed date, cycling through the cities.
+    Each city has its own climate and a small web/API bias, and about 5% of rows
+    carry a large discrepancy so threshold filters have something to find.
+    """
+    db_helper = DbHelper(db_path)
+    rng = random.Random(seed)
+    cities = synthetic_cities(city_count)
+    climate = {city: (rng.uniform(-5, 30), rng.uniform(-1, 1)) for city in cities}
+    end = datetime(2025, 1, 1)
+    step = timedelta(days=days) / max(rows, 1)
+    start = end - timedelta(days=days)
+
+    with sqlite3.connect(db_path) as conn:
+        for chunk_start in range(0, rows, chunk_size):
+            batch = []
+            for i in range(chunk_start, min(chunk_start + chunk_size, rows)):
+                city = cities[i % len(cities)]
+                base, bias = climate[city]
+                temperature_web = round(base + rng.gauss(0, 3), 1)
+                discrepancy = rng.gauss(bias, 0.8) if rng.random() > 0.05 else rng.uniform(3, 8)
+                temperature_api = round(temperature_web - discrepancy, 1)
+                batch.append((
+                    city,
+                    temperature_web,
+                    round(temperature_web - rng.uniform(0, 4), 1),
+                    temperature_api,
+                    round(temperature_api - rng.uniform(0, 4), 1),
+                    (start + step * i).strftime('%Y-%m-%d %H:%M:%S')
+                ))
+            conn.executemany("""
+                INSERT INTO weather_data (
+                    city, temperature_web, feels_like_web,
+                    temperature_api, feels_like_api, timestamp
+                ) VALUES (?, ?, ?, ?, ?, ?)
+            """, batch)
+            conn.commit()
+    return db_helper
@@ -0,0 +1,90 @@
+import argparse
+import signal
+import threading
+from automation_framework.utilities.web_helpers import WebHelper
+from automation_framework.utilities.api_helpers import ApiHelper
+from automation_framework.utilities.db_helpers import DbHelper
+from automation_framework.utilities.writer_helpers import DbWriter
+from automation_framework.utilities.anomaly_helpers import AnomalyDetector
+from automation_framework.utilities.config_helpers import get_config
+from automation_framework.utilities.scheduler_helpers import RateLimiter, PriorityScheduler
+from automation_framework.utilities.city_registry import CityRegistry
+from automation_framework.utilities.metrics_helpers import get_metrics
+from main import collect_cities
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Continuously collect weather data for the cities that need it most")
+    parser.add_argument('--requests-per-minute', type=float, default=None,
+                        help="Request budget shared by web scraping and the API (default: REQUESTS_PER_MINUTE from config.ini)")
+    parser.add_argument('--batch-size', type=int, default=5, help="Cities collected per scheduling cycle")
+    parser.add_argument('--volatility-weight', type=float, default=1.0,
+                        help="How strongly recent discrepancy volatility raises a city's priority")
+    parser.add_argument('--volatility-hours', type=float, default=24,
+                        help="Look-back window for discrepancy volatility")
+    parser.add_argument('--min-age-minutes', type=float, default=5,
+                        help="Never re-collect a city observed more recently than this")
+    parser.add_argument('--failure-backoff-minutes', type=float, default=5,
+                        help="Leave out a city that could not be collected for this long, doubling with each failure")
+    parser.add_argument('--idle-seconds', type=float, default=30,
+                        help="Sleep when no city is due")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="Serve Prometheus metrics on this port at /metrics")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    config = get_config()
+    requests_per_minute = args.requests_per_minute or config.get_requests_per_minute()
+
+    # One budget for both upstreams; it also paces the loop, so no fixed delay between cities
+    rate_limiter = RateLimiter(requests_per_minute)
+    registry = CityRegistry()
+    cities = registry.get_names()
+    web_helper = WebHelper(rate_limiter=rate_limiter, registry=registry, base_url=config.get_web_base_url())
+    web_helper.request_delay = 0
+    api_helper = ApiHelper(api_key=config.get_api_key(), rate_limiter=rate_limiter, registry=registry,
+                           base_url=config.get_api_base_url())
+    db_helper = DbHelper(anomaly_detector=AnomalyDetector(**config.get_anomaly_settings()))
+    scheduler = PriorityScheduler(
+        db_helper, cities,
+        volatility_weight=args.volatility_weight,
+        volatility_hours=args.volatility_hours,
+        min_age_minutes=args.min_age_minutes,
+        failure_backoff_minutes=args.failure_backoff_minutes
+    )
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+
+    if args.metrics_port:
+        get_metrics().serve(port=args.metrics_port)
+        print(f"Metrics at http://localhost:{args.metrics_port}/metrics")
+
+    writer = DbWriter(db_helper, **config.get_writer_settings())
+    run_id = db_helper.start_run(cities)
+    print(f"Collector started (run {run_id}, {requests_per_minute:g} requests/minute). Press Ctrl+C to stop.")
+
+    try:
+        while not stop.is_set():
+            ranked = scheduler.rank()
+            if not ranked:
+                stop.wait(args.idle_seconds)
+                continue
+
+            batch = ranked[:args.batch_size]
+            print("\nNext cities: " + ", ".join(f"{city} (priority {priority:.0f})" for city, priority in batch))
+            cities_due = [city for city, _ in batch]
+            saved = collect_cities(cities_due, web_helper, api_helper, writer, run_id=run_id)
+            scheduler.record_attempts(cities_due, saved)
+            # The scheduler ranks cities by their last saved observation
+            writer.flush()
+    finally:
+        web_helper.close()
+        writer.close()
+        db_helper.finish_run(run_id, 'stopped')
+        db_helper.save_run_metrics(run_id, get_metrics().summary())
+        print("Collector stopped")
+
+if __name__ == "__main__":
+    main()
@@ -1,53 +1,339 @@
+import argparse
 import os
+import socket
+import uuid
 from automation_framework.utilities.web_helpers import WebHelper
 from automation_framework.utilities.api_helpers import ApiHelper
 from automation_framework.utilities.db_helpers import DbHelper
+from automation_framework.utilities.writer_helpers import DbWriter
+from automation_framework.utilities.anomaly_helpers import AnomalyDetector
 from automation_framework.utilities.report_helpers import ReportHelper
-from automation_framework.utilities.config_helpers import ConfigHelper
-from automation_framework.utilities.city_list import CITIES
+from automation_framework.utilities.config_helpers import get_config
+from automation_framework.utilities.queue_helpers import QueueHelper
+from automation_framework.utilities.deadline_helpers import Deadline, RunBudget
+from automation_framework.utilities.city_registry import CityRegistry
+from automation_framework.utilities.metrics_helpers import get_metrics
+from automation_framework.utilities.profile_helpers import Profiler
+from automation_framework.utilities.provider_helpers import PROVIDER_FACTORIES, ProviderPool, create_providers
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Collect and compare weather data from timeanddate.com and OpenWeatherMap")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--enqueue', action='store_true',
+                      help="Add every city to the shared work queue and exit")
+    mode.add_argument('--worker', action='store_true',
+                      help="Claim city batches from the shared work queue until it is empty")
+    mode.add_argument('--import-cities', metavar='CSV',
+                      help="Bulk import cities (name, country_slug[, url_path][, owm_id]) into the city registry and exit")
+    mode.add_argument('--resume', metavar='RUN_ID',
+                      help="Continue an interrupted run, collecting only the cities it has not saved yet")
+    mode.add_argument('--history-report', choices=['city', 'day'], metavar='{city,day}',
+                      help="Write one report over all stored data, rendered in parallel by city or by day, and exit")
+    parser.add_argument('--report-workers', type=int, default=None,
+                        help="Processes for --history-report (default: one per CPU)")
+    parser.add_argument('--since', default=None, metavar='YYYY-MM-DD',
+                        help="Only include data from this date on in --history-report")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only collect cities whose last observation is older than the freshness window")
+    parser.add_argument('--freshness-minutes', type=float, default=None,
+                        help="Freshness window for --incremental (default: FRESHNESS_MINUTES from config.ini)")
+    parser.add_argument('--deadline', type=float, default=None, metavar='SECONDS',
+                        help="Finish the run, including the report, within this many seconds")
+    parser.add_argument('--queue-db', default='data.db', help="Database holding the work queue")
+    parser.add_argument('--batch-size', type=int, default=5, help="Cities claimed per batch in worker mode")
+    parser.add_argument('--lease-seconds', type=float, default=600,
+                        help="How long a claimed batch stays leased without a heartbeat")
+    parser.add_argument('--bulk', action='store_true',
+                        help="Read temperatures from timeanddate.com overview pages first; only unlisted cities get a page load each")
+    parser.add_argument('--providers', nargs='+', metavar='NAME', choices=sorted(PROVIDER_FACTORIES),
+                        help="Fetch from these providers concurrently, each with its own limits from config.ini "
+                             f"(choose from: {', '.join(sorted(PROVIDER_FACTORIES))})")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profile each stage with cProfile and write .prof files and a hot-function summary to the report directory")
+    parser.add_argument('--profile-top', type=int, default=20, help="Functions per stage listed in the profile summary")
+    args = parser.parse_args()
+    if args.providers and args.bulk:
+        parser.error("--bulk only applies to the default web and API collection, not --providers")
+    return args
+
+def collect_cities(cities, web_helper, api_helper, db_helper, run_id=None, deadline=None, prefetched=None,
+                   attempted=None):
+    """Collect web and API data city by city, saving each complete pair immediately.
+
+    Saving as we go means an interrupted run keeps every city it finished
+    and can be continued with --resume. Once the deadline passes, in-flight
+    requests time out and the remaining cities are left for a later run.
+    Cities in prefetched (city -> web data, e.g. from overview pages) are
+    not scraped again. db_helper may be a DbWriter, which saves in the
+    background so the next city is fetched while the last one is written.
+    If attempted is a list, every city collection was started for is
+    appended to it.
+
+    Returns:
+        list: Cities that were saved
+    """
+    deadline = deadline or Deadline()
+    metrics = get_metrics()
+    prefetched = prefetched or {}
+    saved = []
+    try:
+        for index, city in enumerate(cities):
+            if deadline.expired():
+                print(f"\nDeadline reached: {len(cities) - index} cities not collected")
+                break
+            print(f"\n[{index + 1}/{len(cities)}] Collecting {city}...")
+            if attempted is not None:
+                attempted.append(city)
+            with metrics.span('city', city=city) as span:
+                # Every page load, so failed and retried ones can be diagnosed too
+                timings = []
+                with metrics.span('web'):
+                    web_city_data = prefetched.get(city) or web_helper.get_weather_data(
+                        city, deadline=deadline, timings=timings
+                    )
+                for timing in timings:
+                    db_helper.save_page_timing(city, timing, run_id=run_id)
+                with metrics.span('api'):
+                    api_city_data = api_helper.get_weather_data(city, deadline=deadline)
+
+                if web_city_data and api_city_data:
+                    api_city_data['city'] = city
+                    db_helper.save_weather_data(web_city_data, api_city_data, run_id=run_id)
+                    saved.append(city)
+                else:
+                    span['attributes']['skipped'] = 'web' if not web_city_data else 'api'
+                    print(f"Skipping {city}: missing {'web' if not web_city_data else 'API'} data")
+
+            # Only pause after loading this city's page
+            if index < len(cities) - 1 and city not in prefetched:
+                deadline.sleep(web_helper.request_delay)
+    finally:
+        web_helper.close()
+    return saved
+
+def collect_with_providers(cities, pool, db_helper, run_id=None, deadline=None):
+    """Collect every city from every provider at once, saving each city as soon as all providers have answered.
+
+    Every reading goes to the long-format readings table. Cities with both
+    a web and an API reading are also saved to weather_data, which the
+    reports, the dashboard and --resume read.
+
+    Returns:
+        list: Cities that every provider returned a reading for
+    """
+    saved = []
+
+    def save_city(city, readings):
+        db_helper.save_readings(city, readings, run_id=run_id)
+        web_city_data, api_city_data = readings.get('web'), readings.get('api')
+        if web_city_data and web_city_data.get('timing'):
+            db_helper.save_page_timing(city, web_city_data['timing'], run_id=run_id)
+        if web_city_data and api_city_data:
+            db_helper.save_weather_data(web_city_data, api_city_data, run_id=run_id)
+        missing = [name for name, reading in readings.items() if not reading]
+        if missing:
+            print(f"{city}: no reading from {', '.join(missing)}")
+        else:
+            saved.append(city)
+            print(f"Saved {city} from {len(readings)} providers")
+
+    pool.collect(cities, deadline=deadline, on_city=save_city)
+    return saved
+
+def select_cities(args, config, db_helper, registry):
+    """Return the cities this run should collect, skipping fresh ones in incremental mode."""
+    all_cities = registry.get_names()
+    if not args.incremental:
+        return all_cities
+    freshness_minutes = args.freshness_minutes
+    if freshness_minutes is None:
+        freshness_minutes = config.get_freshness_minutes()
+    cities = db_helper.get_stale_cities(all_cities, freshness_minutes)
+    print(f"Incremental mode: skipping {len(all_cities) - len(cities)} of {len(all_cities)} cities "
+          f"observed in the last {freshness_minutes:g} minutes")
+    return cities
+
+def run_worker(args, web_helper, api_helper, writer, deadline):
+    """Process city batches from the shared work queue until none are left or the deadline passes."""
+    queue = QueueHelper(args.queue_db, lease_seconds=args.lease_seconds)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    print(f"Worker {worker_id} started")
+
+    while not deadline.expired():
+        batch = queue.claim(worker_id, args.batch_size)
+        if not batch:
+            break
+        print(f"\nClaimed {len(batch)} cities: {', '.join(batch)}")
+
+        attempted = []
+        with queue.keep_alive(worker_id):
+            try:
+                saved = collect_cities(batch, web_helper, api_helper, writer, deadline=deadline, attempted=attempted)
+            except Exception as e:
+                queue.fail(worker_id, batch, str(e))
+                print(f"Batch failed: {str(e)}")
+                continue
+            # Only mark cities done once their rows are committed
+            unsaved = writer.flush()
+
+        if unsaved:
+            queue.fail(worker_id, sorted(unsaved), "Could not save its data")
+            print(f"Could not save: {', '.join(sorted(unsaved))}")
+        saved = [city for city in saved if city not in unsaved]
+        queue.complete(worker_id, saved)
+        missing = [city for city in batch if city not in saved and city not in unsaved]
+        if deadline.expired():
+            # Cities we never got to are not failures; hand them straight back to the queue
+            queue.release(worker_id, [city for city in missing if city not in attempted])
+            missing = [city for city in missing if city in attempted]
+        queue.fail(worker_id, missing, "Missing data from a source")
+
+    stats = queue.get_stats()
+    print(f"\nQueue drained. Done: {stats['done']}, failed: {stats['failed']}, "
+          f"still leased by other workers: {stats['leased']}")
+
+def write_run_metrics(db_helper, run_id, report_dir):
+    """Store the run's metrics summary with the run and write them as Prometheus text next to the reports."""
+    metrics = get_metrics()
+    db_helper.save_run_metrics(run_id, metrics.summary())
+    metrics_path = os.path.join(report_dir, f"metrics_{run_id}.prom")
+    metrics.write_prometheus(metrics_path)
+    return metrics_path
 
 def main():
+    args = parse_args()
+
+    # Collection may use 85% of the deadline; the rest is kept for the report
+    budget = RunBudget(args.deadline, {'collect': 0.85})
+
     # Initialize configuration
-    config = ConfigHelper()
+    config = get_config()
+    db_helper = DbHelper(anomaly_detector=AnomalyDetector(**config.get_anomaly_settings()))
+    registry = CityRegistry()
+
+    if args.import_cities:
+        try:
+            count = registry.import_csv(args.import_cities)
+        except ValueError as e:
+            print(f"Import failed: {str(e)}")
+            return
+        print(f"Imported {count} cities; the registry now holds {len(registry)}")
+        return
+
+    if args.enqueue:
+        added = QueueHelper(args.queue_db).enqueue(select_cities(args, config, db_helper, registry))
+        print(f"Queued {added} cities")
+        return
+
+    if args.history_report:
+        result = ReportHelper().generate_partitioned_report(
+            db_helper, partition_by=args.history_report, workers=args.report_workers, start=args.since
+        )
+        stats = result['statistics']
+        print(f"History report written to {result['csv_path']} ({stats['count']} rows, "
+              f"{len(result['partitions'])} partitions); index at {result['index_path']}")
+        print(f"Mean discrepancy {stats['mean_difference']:.2f}°C (std dev {stats['stddev_difference']:.2f}°C), "
+              f"max {stats['max_difference']:.1f}°C, {stats['rows_exceeding_threshold']} rows over {stats['threshold']}°C")
+        return
+
     api_key = config.get_api_key()
-    
+
     # Initialize helpers
-    web_helper = WebHelper(debug_mode=True)
-    api_helper = ApiHelper(api_key=api_key)
-    db_helper = DbHelper()
+    web_helper = WebHelper(debug_mode=True, registry=registry, base_url=config.get_web_base_url())
+    api_helper = ApiHelper(api_key=api_key, registry=registry, base_url=config.get_api_base_url())
+
+    if args.worker:
+        with DbWriter(db_helper, **config.get_writer_settings()) as writer:
+            run_worker(args, web_helper, api_helper, writer, budget.deadline)
+        return
+
     report_helper = ReportHelper()
-    
+
     print("Starting weather data collection...")
-    
-    # Get weather data from web scraping
-    print("\nCollecting data from website...")
-    web_data = web_helper.get_weather_data_batch(CITIES)
-    
-    # Get weather data from API
-    print("\nCollecting data from API...")
-    api_data = api_helper.get_weather_data_batch(CITIES)
-    
-    # Save data to database
-    print("\nSaving data to database...")
-    for city in CITIES:
-        web_city_data = next((d for d in web_data if d['city'] == city), None)
-        api_city_data = next((d for d in api_data if d['city'] == city), None)
-        
-        if web_city_data and api_city_data:
-            db_helper.save_weather_data(web_city_data, api_city_data)
-    
+    if args.resume:
+        run = db_helper.get_run(args.resume)
+        if run is None:
+            raise SystemExit(f"Unknown run ID: {args.resume}")
+        run_id = args.resume
+        completed = set(db_helper.get_completed_cities(run_id))
+        cities = [city for city in run['cities'] if city not in completed]
+        print(f"Resuming run {run_id}: {len(completed)} cities already saved, {len(cities)} remaining")
+    else:
+        cities = select_cities(args, config, db_helper, registry)
+        run_id = db_helper.start_run(cities)
+        print(f"Run ID: {run_id} (if interrupted, continue with: python main.py --resume {run_id})")
+
+    profiler = Profiler(config.get_report_dir(), prefix=f"profile_{run_id}", enabled=args.profile, top_n=args.profile_top)
+
+    with budget.stage('collect') as deadline:
+        try:
+            # Leaving the with-block commits every queued row, also when collection is interrupted
+            with profiler.stage('collect'), DbWriter(db_helper, **config.get_writer_settings()) as writer:
+                if args.providers:
+                    with ProviderPool(create_providers(args.providers, config, registry)) as pool:
+                        collect_with_providers(cities, pool, writer, run_id=run_id, deadline=deadline)
+                else:
+                    prefetched = None
+                    if args.bulk:
+                        prefetched = web_helper.get_listing_weather(cities, deadline=deadline)
+                        print(f"Read {len(prefetched)} of {len(cities)} cities from overview pages")
+                    collect_cities(cities, web_helper, api_helper, writer, run_id=run_id, deadline=deadline,
+                                   prefetched=prefetched)
+        except BaseException:
+            db_helper.finish_run(run_id, 'interrupted')
+            write_run_metrics(db_helper, run_id, config.get_report_dir())
+            if args.profile:
+                print(f"Profile summary written to {profiler.write()}")
+            raise
+        db_helper.finish_run(run_id, 'deadline' if deadline.expired() else 'completed')
+    collect_seconds = budget.report()[-1]['elapsed']
+    rows_written = get_metrics().get_counter('weather_db_rows_written_total')
+    get_metrics().set_gauge('weather_run_rows_per_second', rows_written / collect_seconds if collect_seconds else 0)
+
     # Generate reports
-    print("\nGenerating reports...")
-    discrepancy_data = db_helper.get_discrepancy_report()
-    stats = db_helper.get_summary_stats()
-    
-    report_path = report_helper.generate_csv_report(discrepancy_data, stats)
-    
+    with budget.stage('report') as deadline, profiler.stage('report'):
+        print("\nGenerating reports...")
+        discrepancy_data = db_helper.get_discrepancy_report(config.get_temperature_threshold())
+        stats = db_helper.get_summary_stats()
+
+        report_path = report_helper.generate_csv_report(discrepancy_data, stats)
+        # The discrepancy report is always written; the page timing report only while the budget lasts
+        slowest_pages = []
+        if deadline.expired():
+            print("Report deadline reached: skipping the page timing report")
+        else:
+            slowest_pages = db_helper.get_slowest_pages(limit=10, run_id=run_id)
+        if slowest_pages:
+            timing_path = report_helper.generate_timing_report(
+                slowest_pages, db_helper.get_page_timing_summary(run_id=run_id)
+            )
+
     print(f"\nAnalysis complete! Report generated at: {report_path}")
     print("\nSummary Statistics:")
     print(f"Mean Discrepancy: {stats['mean_discrepancy']:.1f}°C")
     print(f"Max Discrepancy: {stats['max_discrepancy']:.1f}°C")
     print(f"Min Discrepancy: {stats['min_discrepancy']:.1f}°C")
+    if slowest_pages:
+        print(f"\nPage timing report generated at: {timing_path}")
+        print("Slowest pages:")
+        for page in slowest_pages[:5]:
+            # Loads that never reached the page have no phases, only an outcome
+            print(f"{page['city']}: {page['total_ms']:.0f} ms (mostly {page['dominant_phase'] or page['outcome']})")
+    if args.providers:
+        print("\nProviders compared with the API:")
+        for row in db_helper.get_source_discrepancies(run_id=run_id):
+            print(f"{row['source']}: mean {row['mean_discrepancy']:.1f}°C, max {row['max_discrepancy']:.1f}°C "
+                  f"over {row['pairs']} cities")
+    alerts = db_helper.get_alerts(run_id=run_id)
+    if alerts:
+        print(f"\nAnomalous discrepancies flagged this run: {len(alerts)}")
+        for alert in alerts[:5]:
+            print(f"{alert['city']}: web - api = {alert['discrepancy']:+.1f}°C, "
+                  f"expected {alert['expected']:+.1f}°C (z = {alert['zscore']:+.1f})")
+    budget.print_report()
+    print(f"\nMetrics written to {write_run_metrics(db_helper, run_id, config.get_report_dir())}")
+    if args.profile:
+        print(f"Profile summary written to {profiler.write()}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
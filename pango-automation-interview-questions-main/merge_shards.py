@@ -0,0 +1,57 @@
+import argparse
+import os
+from automation_framework.utilities.anomaly_helpers import AnomalyDetector
+from automation_framework.utilities.config_helpers import get_config
+from automation_framework.utilities.db_helpers import DbHelper
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Merge the databases of several collectors into one central database")
+    parser.add_argument('shards', nargs='*', metavar='[NAME=]PATH',
+                        help="A collector's database, optionally named (e.g. host-a=/mnt/host-a/data.db); "
+                             "the name defaults to the file's absolute path and must stay the same between merges")
+    parser.add_argument('--into', default='data.db', help="Central database to merge into")
+    parser.add_argument('--rebuild-ratio', type=float, default=0.2,
+                        help="Drop and rebuild indexes when the new rows exceed this fraction of the stored rows")
+    parser.add_argument('--full', action='store_true',
+                        help="Ignore the high-water marks and read every shard from the start (duplicates are skipped)")
+    parser.add_argument('--chunk-rows', type=int, default=10000,
+                        help="Rows read from a shard at a time; the shard is unlocked between chunks")
+    parser.add_argument('--compact', action='store_true', help="VACUUM the central database afterwards")
+    parser.add_argument('--status', action='store_true', help="Only show what has been merged so far")
+    args = parser.parse_args()
+    if not args.shards and not args.status:
+        parser.error("give at least one shard to merge, or --status")
+    return args
+
+def parse_shards(specs):
+    shards = {}
+    for spec in specs:
+        name, separator, path = spec.partition('=')
+        if not separator:
+            name, path = os.path.abspath(spec), spec
+        if os.path.abspath(path) in (os.path.abspath(existing) for existing in shards.values()):
+            raise SystemExit(f"{path} is listed twice")
+        shards[name] = path
+    return shards
+
+def print_status(db_helper):
+    state = db_helper.get_merge_state()
+    if not state:
+        print("Nothing merged yet")
+    for source, row in state.items():
+        print(f"{source}: up to id {row['last_id']} of {row['path']}, {row['rows_merged']} of "
+              f"{row['rows_read']} rows merged, last at {row['merged_at']}")
+
+if __name__ == '__main__':
+    args = parse_args()
+    # Rebuilt anomaly statistics must use the same settings as the collectors
+    db_helper = DbHelper(args.into, anomaly_detector=AnomalyDetector(**get_config().get_anomaly_settings()))
+    if args.status:
+        print_status(db_helper)
+    else:
+        result = db_helper.merge_shards(parse_shards(args.shards), rebuild_ratio=args.rebuild_ratio,
+                                        compact=args.compact, full=args.full, chunk_rows=args.chunk_rows)
+        print(f"Merged {result['rows_merged']} rows into {args.into} ({result['duplicates']} duplicates skipped)"
+              + ("; indexes rebuilt" if result['indexes_rebuilt'] else ""))
+        if result['cities_rebuilt']:
+            print(f"Anomaly statistics rebuilt for {result['cities_rebuilt']} cities")
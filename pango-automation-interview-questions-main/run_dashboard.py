@@ -1,6 +1,23 @@
-from automation_framework.dashboard.app import app
+import argparse
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the Weather Data Analysis Dashboard")
+    parser.add_argument('--production', action='store_true',
+                        help="Serve with multiple gunicorn worker processes instead of the debug server")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to bind to")
+    parser.add_argument('--port', type=int, default=8050, help="Port to listen on")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Number of worker processes in production mode (default: 2 x CPUs + 1)")
+    parser.add_argument('--threads', type=int, default=4, help="Threads per worker in production mode")
+    return parser.parse_args()
 
 if __name__ == '__main__':
+    args = parse_args()
     print("Starting Weather Data Analysis Dashboard...")
-    print("Open your browser and navigate to http://127.0.0.1:8050/")
-    app.run(debug=True) 
\ No newline at end of file
+    print(f"Open your browser and navigate to http://{args.host}:{args.port}/")
+    if args.production:
+        from automation_framework.dashboard.server import run_production
+        run_production(host=args.host, port=args.port, workers=args.workers, threads=args.threads)
+    else:
+        from automation_framework.dashboard.app import app
+        app.run(debug=True, host=args.host, port=args.port)
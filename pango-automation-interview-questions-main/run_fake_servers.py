@@ -0,0 +1,40 @@
+import argparse
+import threading
+from automation_framework.fake_servers import FaultConfig, FakeTimeAndDateServer, FakeOpenWeatherMapServer
+from automation_framework.utilities.city_registry import CityRegistry
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run local stand-ins for timeanddate.com and OpenWeatherMap")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to bind to")
+    parser.add_argument('--web-port', type=int, default=8081, help="Port for the timeanddate.com stand-in")
+    parser.add_argument('--api-port', type=int, default=8082, help="Port for the OpenWeatherMap stand-in")
+    parser.add_argument('--latency-ms', type=float, default=0, help="Delay added to every response")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="Extra random delay of up to this many milliseconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with a 500")
+    parser.add_argument('--requests-per-second', type=float, default=None,
+                        help="Throttle each server above this rate (429 from the API, 503 from the web pages)")
+    parser.add_argument('--seed', type=int, default=None, help="Seed for repeatable latency and errors")
+    return parser.parse_args()
+
+def fault_config(args):
+    return FaultConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                       requests_per_second=args.requests_per_second, seed=args.seed)
+
+if __name__ == '__main__':
+    args = parse_args()
+    # Answer id= queries for registered cities with their real names
+    registry = CityRegistry()
+    city_names = {registry.get(name).owm_id: name for name in registry.get_names() if registry.get(name).owm_id}
+
+    web_server = FakeTimeAndDateServer(args.host, args.web_port, fault_config(args))
+    api_server = FakeOpenWeatherMapServer(args.host, args.api_port, fault_config(args), city_names=city_names)
+    print("Fake servers running. Point config.ini at them with:")
+    print(f"  [API]\n  BASE_URL = {api_server.weather_url}")
+    print(f"  [WEB]\n  BASE_URL = {web_server.base_url}")
+    print("Press Ctrl+C to stop.")
+    with web_server, api_server:
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+    print(f"Served {web_server.request_count} page and {api_server.request_count} API requests")
@@ -12,4 +12,7 @@ setup(
         "plotly",
         "pandas"
     ],
+    extras_require={
+        "production": ["gunicorn"]
+    },
 ) 
\ No newline at end of file
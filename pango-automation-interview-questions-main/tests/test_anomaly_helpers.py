@@ -0,0 +1,77 @@
+import random
+import statistics
+import pytest
+from automation_framework.utilities.anomaly_helpers import AnomalyDetector, RunningStats
+from automation_framework.utilities.db_helpers import DbHelper
+from automation_framework.utilities.observations import ObservationBatch
+
+def save(db_helper, city, discrepancy, run_id=None):
+    db_helper.save_weather_data({'city': city, 'temperature': 20.0 + discrepancy, 'feels_like': None},
+                                {'temperature': 20.0, 'feels_like': None}, run_id=run_id)
+
+def test_running_stats_match_statistics_module():
+    """Welford's mean and variance agree with a two-pass computation."""
+    values = [random.Random(1).gauss(2.0, 1.5) for _ in range(500)]
+    stats = RunningStats()
+    for value in values:
+        stats.update(value)
+    assert stats.count == 500
+    assert stats.mean == pytest.approx(statistics.mean(values))
+    assert stats.variance == pytest.approx(statistics.variance(values))
+
+def test_merged_stats_equal_stats_of_both_streams():
+    """Merging stats of two halves gives the same mean and variance as one pass over everything."""
+    rng = random.Random(2)
+    values = [rng.uniform(-5, 5) for _ in range(301)]
+    left, right, whole = RunningStats(), RunningStats(), RunningStats()
+    for value in values[:120]:
+        left.update(value)
+    for value in values[120:]:
+        right.update(value)
+    for value in values:
+        whole.update(value)
+    merged = left.merge(right)
+    assert merged.count == whole.count
+    assert merged.mean == pytest.approx(whole.mean)
+    assert merged.variance == pytest.approx(whole.variance)
+
+def test_detector_flags_spikes_not_steady_bias():
+    """A constant offset is learned; a sudden jump away from it is flagged."""
+    detector = AnomalyDetector(z_threshold=3.0, min_samples=10)
+    stats = detector.new_stats()
+    rng = random.Random(3)
+    flagged = [detector.observe(stats, 4.0 + rng.uniform(-0.3, 0.3)) for _ in range(50)]
+    assert not any(flagged)
+    alert = detector.observe(stats, 12.0)
+    assert alert['zscore'] > 3.0
+    assert alert['expected'] == pytest.approx(4.0, abs=0.3)
+
+def test_db_helper_writes_alerts_at_ingest():
+    """Saving pairs updates the city's stats in the database and records anomalies as alerts."""
+    with DbHelper(':memory:', anomaly_detector=AnomalyDetector(min_samples=5)) as db_helper:
+        for _ in range(10):
+            save(db_helper, 'London', 1.0)
+        save(db_helper, 'London', 9.0, run_id='r1')
+        save(db_helper, 'Paris', 9.0, run_id='r1')
+
+        alerts = db_helper.get_alerts(run_id='r1')
+        assert [alert['city'] for alert in alerts] == ['London']
+        assert alerts[0]['discrepancy'] == 9.0
+        assert alerts[0]['weather_data_id'] == 11
+        assert db_helper.get_city_stats('London').count == 11
+        assert db_helper.get_city_stats('Tokyo') is None
+
+        # Stats live in the database, so a new helper (or another collector) picks up where this one stopped
+        other = DbHelper(db_helper.db_path, anomaly_detector=AnomalyDetector(min_samples=5))
+        other.save_observations(ObservationBatch([
+            {'city': 'London', 'temperature_web': 30.0, 'temperature_api': 20.0},
+            {'city': 'London', 'temperature_web': 21.0, 'temperature_api': 20.0},
+        ]))
+        assert db_helper.get_city_stats('London').count == 13
+        assert [alert['weather_data_id'] for alert in db_helper.get_alerts(city='London')] == [13, 11]
+
+def test_db_helper_without_detector_keeps_no_stats():
+    with DbHelper(':memory:') as db_helper:
+        save(db_helper, 'London', 1.0)
+        assert db_helper.get_city_stats('London') is None
+        assert db_helper.get_alerts() == []
@@ -0,0 +1,36 @@
+import sqlite3
+from benchmarks.run_benchmarks import compare
+from benchmarks.synthetic_data import generate_weather_data
+from automation_framework.utilities.db_helpers import DbHelper
+
+def read_rows(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT city, temperature_web, temperature_api, timestamp FROM weather_data ORDER BY id").fetchall()
+
+def test_synthetic_data_is_seeded(tmp_path):
+    """The same seed generates the same rows, spread over the requested cities."""
+    generate_weather_data(str(tmp_path / "a.db"), 500, city_count=25, seed=7, chunk_size=128)
+    generate_weather_data(str(tmp_path / "b.db"), 500, city_count=25, seed=7)
+    rows = read_rows(tmp_path / "a.db")
+    assert len(rows) == 500
+    assert rows == read_rows(tmp_path / "b.db")
+    assert len({row[0] for row in rows}) == 25
+
+def test_batch_save_matches_single_saves(tmp_path):
+    """The bulk save path stores the same rows as saving one pair at a time."""
+    pairs = [({'city': f"City {i}", 'temperature': 20.0 + i, 'feels_like': 19.0},
+              {'temperature': 21.0, 'feels_like': 20.0}) for i in range(3)]
+    single = DbHelper(str(tmp_path / "single.db"))
+    for web_data, api_data in pairs:
+        single.save_weather_data(web_data, api_data, run_id='r1')
+    batch = DbHelper(str(tmp_path / "batch.db"))
+    assert batch.save_weather_data_batch(pairs, run_id='r1') == 3
+    assert read_rows(tmp_path / "single.db") == read_rows(tmp_path / "batch.db")
+    assert sorted(batch.get_completed_cities('r1')) == sorted(single.get_completed_cities('r1'))
+
+def test_compare_flags_regressions():
+    """Slowdowns beyond the tolerance are regressions; new benchmarks are skipped."""
+    baseline = {'results': {'a@1000': {'median_s': 1.0}, 'b@1000': {'median_s': 1.0}}}
+    current = {'results': {'a@1000': {'median_s': 1.5}, 'b@1000': {'median_s': 1.05}, 'c@1000': {'median_s': 1.0}}}
+    statuses = {row['key']: row['status'] for row in compare(baseline, current, tolerance=0.1)}
+    assert statuses == {'a@1000': 'regression', 'b@1000': 'unchanged'}
@@ -0,0 +1,54 @@
+import pickle
+from automation_framework.utilities.cache_helpers import CacheHelper
+
+def test_cached_value_shared_between_instances(tmp_path):
+    """A value stored by one cache instance is visible to another on the same file."""
+    path = str(tmp_path / "cache.db")
+    CacheHelper(path).set('stats', {'mean': 1.5}, version=10)
+    assert CacheHelper(path).get('stats', version=10) == {'mean': 1.5}
+
+def test_version_change_invalidates_entry(tmp_path):
+    """Entries computed for an older data version are recomputed."""
+    cache = CacheHelper(str(tmp_path / "cache.db"))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get_or_compute('figure', compute, version=1) == 1
+    assert cache.get_or_compute('figure', compute, version=1) == 1
+    assert cache.get_or_compute('figure', compute, version=2) == 2
+
+def test_expired_entry_is_ignored(tmp_path):
+    """Entries older than the ttl are treated as misses."""
+    cache = CacheHelper(str(tmp_path / "cache.db"), ttl=0)
+    cache.set('figure', 'old')
+    assert cache.get('figure') is None
+
+def test_namespaces_do_not_share_entries(tmp_path):
+    """Two databases at the same data version, cached in one file, keep their own values."""
+    path = str(tmp_path / "cache.db")
+    first = CacheHelper(path, namespace='/data/first.db')
+    second = CacheHelper(path, namespace='/data/second.db')
+    first.set('stats', 'first', version=42)
+    assert second.get('stats', version=42) is None
+    second.set('stats', 'second', version=42)
+    assert first.get('stats', version=42) == 'first'
+
+    first.clear()
+    assert first.get('stats', version=42) is None
+    assert second.get('stats', version=42) == 'second'
+
+def test_figures_round_trip_as_json(tmp_path):
+    """Figures come back as figures, and entries are stored as JSON rather than pickled."""
+    import plotly.graph_objects as go
+    cache = CacheHelper(str(tmp_path / "cache" / "cache.db"))
+    cache.set('figure', go.Figure(go.Bar(x=['London'], y=[1.5])))
+    figure = cache.get('figure')
+    assert isinstance(figure, go.Figure)
+    assert list(figure.data[0].y) == [1.5]
+
+    with cache._connect() as conn:
+        conn.execute("UPDATE cache_entries SET value = ?", (pickle.dumps('planted'),))
+    assert cache.get('figure') is None
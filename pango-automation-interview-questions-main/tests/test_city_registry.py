@@ -0,0 +1,50 @@
+import pytest
+from automation_framework.utilities.city_registry import CityRegistry
+from automation_framework.utilities.city_list import CITIES
+from automation_framework.utilities.web_helpers import WebHelper
+
+def test_empty_registry_is_seeded(tmp_path):
+    """A new registry holds the default cities with their timeanddate paths."""
+    registry = CityRegistry(str(tmp_path / "data.db"))
+    assert registry.get_names() == CITIES
+    assert registry.get('new york').url_path == 'usa/new-york'
+    assert registry.get('Hong Kong').country_slug == 'hong-kong'
+    assert 'Atlantis' not in registry
+
+def test_bulk_import_csv(tmp_path):
+    """Cities imported from CSV are added, and existing ones updated, in one pass."""
+    csv_path = tmp_path / "cities.csv"
+    rows = ["name,country_slug,url_path,owm_id", "London,uk,,2643743"]
+    rows += [f"Town {i},testland,,{i}" for i in range(5000)]
+    csv_path.write_text("\n".join(rows), encoding='utf-8')
+
+    registry = CityRegistry(str(tmp_path / "data.db"))
+    assert registry.import_csv(str(csv_path)) == 5001
+    assert len(registry) == len(CITIES) + 5000
+    assert registry.get('London').owm_id == 2643743
+    assert registry.get('Town 4999').url_path == 'testland/town-4999'
+
+    # A second instance sees the same data
+    assert CityRegistry(registry.db_path).get('Town 42').owm_id == 42
+
+def test_import_csv_rejects_incomplete_rows(tmp_path):
+    """A row without a country slug names its line and imports nothing."""
+    csv_path = tmp_path / "cities.csv"
+    csv_path.write_text("name,country_slug\nAtlantis,ocean\nLemuria,\nMu\n", encoding='utf-8')
+
+    registry = CityRegistry(str(tmp_path / "data.db"))
+    with pytest.raises(ValueError, match="line 3"):
+        registry.import_csv(str(csv_path))
+    assert 'Atlantis' not in registry
+
+    csv_path.write_text("name,country_slug\nMu\n", encoding='utf-8')
+    with pytest.raises(ValueError, match="line 2"):
+        registry.import_csv(str(csv_path))
+
+def test_web_helper_opens_its_default_registry_on_first_use(tmp_path, monkeypatch):
+    """Building a WebHelper without a registry does not touch ./data.db."""
+    monkeypatch.chdir(tmp_path)
+    web_helper = WebHelper()
+    assert not (tmp_path / "data.db").exists()
+    assert web_helper.registry.get('London').url_path == 'uk/london'
+    assert (tmp_path / "data.db").exists()
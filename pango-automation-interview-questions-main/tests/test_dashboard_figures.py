@@ -0,0 +1,43 @@
+import pandas as pd
+import plotly.graph_objects as go
+from automation_framework.dashboard.figure_helpers import (
+    choose_bucket_seconds, downsample, scatter_render_mode, fit_to_budget, figure_size
+)
+
+def _frame(rows):
+    return pd.DataFrame({
+        'city': [f"City{i % 10}" for i in range(rows)],
+        'temperature_web': [float(i % 40) for i in range(rows)],
+        'discrepancy': [float(i % 7) for i in range(rows)]
+    })
+
+def test_small_history_is_not_bucketed():
+    """Histories under the point budget are plotted at full resolution."""
+    assert choose_bucket_seconds(500, 86400, 20, 5000) == 1
+
+def test_bucket_keeps_points_under_budget():
+    """The chosen bucket keeps cities x buckets under the point budget."""
+    span = 90 * 86400
+    bucket = choose_bucket_seconds(1_000_000, span, 20, 5000)
+    assert (span / bucket) * 20 <= 5000
+
+def test_downsample_respects_limit_and_keeps_outliers():
+    """Downsampling caps the row count and keeps the largest discrepancies."""
+    df = _frame(10000)
+    df.loc[1234, 'discrepancy'] = 99.0
+    reduced = downsample(df, 1000)
+    assert len(reduced) <= 1000
+    assert 1234 in reduced.index, "Largest discrepancy should survive downsampling"
+
+def test_render_mode_switches_to_webgl():
+    """Large series are rendered with WebGL."""
+    assert scatter_render_mode(10, 1000) == 'svg'
+    assert scatter_render_mode(5000, 1000) == 'webgl'
+
+def test_fit_to_budget_shrinks_payload():
+    """Figures are downsampled until they fit the byte budget."""
+    def build(data):
+        return go.Figure(go.Scattergl(x=data['temperature_web'], y=data['discrepancy']))
+
+    fig = fit_to_budget(build, _frame(20000), 50_000)
+    assert figure_size(fig) <= 50_000
@@ -0,0 +1,42 @@
+import sqlite3
+import pytest
+from automation_framework.utilities.db_helpers import DbHelper
+
+ROWS = [
+    ('London', 20.0, 21.0, '2025-05-01 10:00:00'),
+    ('London', 20.0, 25.0, '2025-05-02 10:00:00'),
+    ('Paris', 18.0, 18.5, '2025-05-01 12:00:00'),
+    ('Berlin', 15.0, 19.0, '2025-05-03 09:00:00'),
+]
+
+@pytest.fixture
+def db_helper(tmp_path):
+    helper = DbHelper(str(tmp_path / "data.db"))
+    with sqlite3.connect(helper.db_path) as conn:
+        conn.executemany("""
+            INSERT INTO weather_data (city, temperature_web, temperature_api, timestamp)
+            VALUES (?, ?, ?, ?)
+        """, ROWS)
+    return helper
+
+def test_filters_use_city_timestamp_index(db_helper):
+    """City and time-range filters are answered from the (city, timestamp) index."""
+    where, params = db_helper._filter_clause(start='2025-05-01', end='2025-05-02', cities=['London'])
+    with sqlite3.connect(db_helper.db_path) as conn:
+        plan = conn.execute(f"EXPLAIN QUERY PLAN SELECT * FROM weather_data {where}", params).fetchall()
+    assert 'idx_weather_data_city_timestamp' in plan[0][3]
+
+def test_summary_stats_time_range(db_helper):
+    """Only rows inside [start, end) are summarised."""
+    stats = db_helper.get_summary_stats(start='2025-05-01', end='2025-05-02')
+    assert stats['max_discrepancy'] == pytest.approx(1.0)
+
+def test_city_and_threshold_filters(db_helper):
+    """City and minimum discrepancy filters are combined."""
+    summary = db_helper.get_city_discrepancy_summary(cities=['London', 'Berlin'], min_discrepancy=3.0)
+    assert {row['city'] for row in summary} == {'London', 'Berlin'}
+    assert all(row['samples'] == 1 for row in summary)
+
+def test_get_cities(db_helper):
+    """Every stored city is listed once, in order."""
+    assert db_helper.get_cities() == ['Berlin', 'London', 'Paris']
@@ -0,0 +1,109 @@
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+from automation_framework.utilities.db_helpers import DbHelper
+
+# (city, web, api, timestamp): London reads warm on the website, Paris cold
+ROWS = [
+    ('London', 21.0, 20.0, '2025-05-01 10:05:00'),
+    ('London', 23.0, 20.0, '2025-05-01 10:45:00'),
+    ('London', 22.0, 20.0, '2025-05-01 11:30:00'),
+    ('London', 20.0, 20.0, '2025-05-01 15:10:00'),
+    ('Paris', 17.0, 18.0, '2025-05-01 10:20:00'),
+    ('Paris', 14.0, 18.0, '2025-05-02 09:00:00'),
+    ('Berlin', 15.0, 15.5, '2025-05-01 12:00:00'),
+    ('Berlin', 15.0, 17.0, '2025-05-02 12:00:00'),
+    ('Berlin', 15.0, 16.0, '2025-05-02 13:00:00'),
+]
+
+@pytest.fixture
+def db_helper():
+    with DbHelper(':memory:') as helper:
+        with helper._connect() as conn:
+            conn.executemany("""
+                INSERT INTO weather_data (city, temperature_web, temperature_api, timestamp)
+                VALUES (?, ?, ?, ?)
+            """, ROWS)
+        yield helper
+
+def test_city_history_rolling_window(db_helper):
+    """Buckets are averaged per city and the rolling window only reaches back window_seconds."""
+    history = db_helper.get_city_history(bucket_seconds=3600, window_seconds=3 * 3600, cities=['London'])
+    assert [row['bucket'] for row in history] == ['2025-05-01 10:00:00', '2025-05-01 11:00:00', '2025-05-01 15:00:00']
+    first, second, third = history
+    assert first['samples'] == 2 and first['bias'] == pytest.approx(2.0)
+    # Weighted by pairs: (1 + 3 + 2) / 3
+    assert second['rolling_discrepancy'] == pytest.approx(2.0)
+    assert second['rolling_samples'] == 3
+    # 10:00 and 11:00 are more than three hours before 15:00
+    assert third['rolling_discrepancy'] == pytest.approx(0.0)
+    assert third['rolling_samples'] == 1
+
+def test_city_history_signs_bias(db_helper):
+    """Bias keeps its sign, so a website that reads cold is told apart from one that reads warm."""
+    history = db_helper.get_city_history(bucket_seconds=86400, window_seconds=2 * 86400, cities=['Paris'])
+    assert [row['bias'] for row in history] == [pytest.approx(-1.0), pytest.approx(-4.0)]
+    assert history[-1]['rolling_bias'] == pytest.approx(-2.5)
+
+def test_bias_history_across_cities(db_helper):
+    """All cities are pooled per bucket, with the change from the bucket before."""
+    history = db_helper.get_bias_history(bucket_seconds=86400, window_seconds=2 * 86400)
+    assert [row['bucket'] for row in history] == ['2025-05-01 00:00:00', '2025-05-02 00:00:00']
+    first, second = history
+    assert first['cities'] == 3 and first['samples'] == 6
+    assert first['bias'] == pytest.approx((1 + 3 + 2 + 0 - 1 - 0.5) / 6)
+    assert second['bias'] == pytest.approx((-4 - 2 - 1) / 3)
+    assert second['bias_change'] == pytest.approx(second['bias'] - first['bias'])
+    assert second['rolling_bias'] == pytest.approx((1 + 3 + 2 + 0 - 1 - 0.5 - 4 - 2 - 1) / 9)
+
+def test_worst_cities_per_period(db_helper):
+    """Each period lists its k worst cities; thinly sampled cities can be left out."""
+    worst = db_helper.get_worst_cities(period_seconds=86400, k=2)
+    assert [(row['period'][:10], row['rank'], row['city']) for row in worst] == [
+        ('2025-05-01', 1, 'London'), ('2025-05-01', 2, 'Paris'),
+        ('2025-05-02', 1, 'Paris'), ('2025-05-02', 2, 'Berlin'),
+    ]
+    worst = db_helper.get_worst_cities(period_seconds=86400, k=2, min_samples=2)
+    assert [(row['period'][:10], row['city']) for row in worst] == [('2025-05-01', 'London'), ('2025-05-02', 'Berlin')]
+
+def test_history_uses_city_timestamp_index(db_helper):
+    """The history queries read weather_data through the (city, timestamp) index."""
+    where, params = db_helper._filter_clause(cities=['London'], start='2025-05-01')
+    with sqlite3.connect(db_helper.db_path, uri=True) as conn:
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {db_helper._bucket_sql(where)}", [3600, 3600] + params).fetchall()
+    assert any('idx_weather_data_city_timestamp' in step[3] for step in plan)
+
+def old_database(path):
+    """A database whose (city, timestamp) index predates the temperature columns."""
+    DbHelper(path).close()
+    with sqlite3.connect(path) as conn:
+        conn.execute("DROP INDEX idx_weather_data_city_timestamp")
+        conn.execute("CREATE INDEX idx_weather_data_city_timestamp ON weather_data (city, timestamp)")
+    return path
+
+def index_columns(path):
+    with sqlite3.connect(path) as conn:
+        return len(conn.execute("PRAGMA index_info(idx_weather_data_city_timestamp)").fetchall())
+
+def test_index_migration_checks_again_under_the_lock(tmp_path, monkeypatch):
+    """A process that saw the old index while another was rebuilding it leaves the new one alone."""
+    path = str(tmp_path / 'data.db')
+    DbHelper(path).close()
+    seen = []
+
+    def stale_first_look(conn, index):
+        seen.append(index)
+        return 2 if len(seen) == 1 else len(conn.execute(f"PRAGMA index_info({index})").fetchall())
+
+    monkeypatch.setattr(DbHelper, '_index_columns', staticmethod(stale_first_look))
+    DbHelper(path).close()
+    assert len(seen) == 2 and index_columns(path) == 4
+
+def open_and_close(path):
+    DbHelper(path).close()
+
+def test_processes_starting_together_migrate_once(tmp_path):
+    path = old_database(str(tmp_path / 'data.db'))
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        list(pool.map(open_and_close, [path] * 8))
+    assert index_columns(path) == 4
@@ -0,0 +1,93 @@
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from automation_framework.utilities.city_registry import CityRegistry
+from automation_framework.utilities.db_helpers import DbHelper, is_memory_database
+
+def save(db_helper, city='London'):
+    db_helper.save_weather_data({'city': city, 'temperature': 20.0, 'feels_like': 19.0},
+                                {'temperature': 21.0, 'feels_like': 20.0})
+
+def test_memory_databases_are_isolated():
+    """Each ':memory:' helper gets its own database, which lasts until close()."""
+    first = DbHelper(':memory:')
+    second = DbHelper(':memory:')
+    save(first)
+    assert first.get_cities() == ['London']
+    assert second.get_cities() == []
+    assert is_memory_database(first.db_path)
+    first.close()
+    second.close()
+
+def test_shared_cache_uri_is_visible_to_other_helpers():
+    """Helpers opened on the same memory URI, including the city registry, share one database."""
+    uri = 'file:shared-test?mode=memory&cache=shared'
+    with DbHelper(uri) as writer, DbHelper(uri) as reader:
+        save(writer, 'Paris')
+        assert reader.get_cities() == ['Paris']
+        assert CityRegistry(uri).get('London') is not None
+    # Gone once the last helper on it is closed
+    with DbHelper(uri) as fresh:
+        assert fresh.get_cities() == []
+
+@pytest.mark.parametrize('db_path', [':memory:', 'file:threads-test?mode=memory&cache=shared'])
+def test_memory_database_from_many_threads(db_path):
+    """Threads saving and reading at once never hit shared-cache table locks."""
+    with DbHelper(db_path) as db_helper, DbHelper(db_path) as other:
+        # A private database has one helper; a named one is opened by two
+        helpers = [db_helper] if db_path == ':memory:' else [db_helper, other]
+
+        def work(i):
+            helper = helpers[i % len(helpers)]
+            for j in range(25):
+                save(helper, f"City {i}-{j}")
+                helper.get_cities()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(work, range(8)))
+        assert len(db_helper.get_cities()) == 200
+
+def test_temporary_database_is_removed_on_close():
+    """An empty path puts the database in a temporary directory that close() deletes."""
+    with DbHelper('') as db_helper:
+        save(db_helper)
+        path = db_helper.db_path
+        assert os.path.exists(path)
+    assert not os.path.exists(path)
+
+def test_snapshot_and_restore(tmp_path):
+    """A snapshot holds the data at the time it was taken and restores over later changes."""
+    snapshot_path = str(tmp_path / "snapshot.db")
+    with DbHelper(':memory:') as db_helper:
+        save(db_helper, 'London')
+        db_helper.snapshot(snapshot_path)
+        save(db_helper, 'Paris')
+        assert db_helper.get_cities() == ['London', 'Paris']
+        db_helper.restore(snapshot_path)
+        assert db_helper.get_cities() == ['London']
+
+    with DbHelper.from_snapshot(snapshot_path) as copy:
+        save(copy, 'Tokyo')
+        assert copy.get_cities() == ['London', 'Tokyo']
+    with sqlite3.connect(snapshot_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM weather_data").fetchone()[0] == 1
+
+def test_restore_migrates_old_snapshots(tmp_path):
+    """Restoring a database from before run checkpoints adds the newer columns and tables."""
+    old_path = str(tmp_path / "old.db")
+    with sqlite3.connect(old_path) as conn:
+        conn.execute("""
+            CREATE TABLE weather_data (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, city TEXT NOT NULL,
+                temperature_web REAL, feels_like_web REAL, temperature_api REAL, feels_like_api REAL,
+                avg_temperature REAL GENERATED ALWAYS AS ((temperature_web + temperature_api) / 2) STORED,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.execute("INSERT INTO weather_data (city, temperature_web, temperature_api) VALUES ('Oslo', 1, 2)")
+    with DbHelper.from_snapshot(old_path) as db_helper:
+        run_id = db_helper.start_run(['Oslo'])
+        save(db_helper, 'Oslo')
+        assert db_helper.get_cities() == ['Oslo']
+        assert db_helper.get_run(run_id)['status'] == 'running'
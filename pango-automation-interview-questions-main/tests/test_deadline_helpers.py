@@ -0,0 +1,80 @@
+import sqlite3
+import time
+from types import SimpleNamespace
+import pytest
+from automation_framework.utilities.db_helpers import DbHelper
+from automation_framework.utilities.deadline_helpers import Deadline, DeadlineExceeded, RunBudget
+from automation_framework.utilities.queue_helpers import QueueHelper
+from automation_framework.utilities.writer_helpers import DbWriter
+from main import collect_cities, run_worker
+
+class SlowWebHelper:
+    request_delay = 0
+
+    def get_weather_data(self, city, deadline=None, timings=None):
+        deadline.sleep(0.2)
+        return {'city': city, 'temperature': 20.0, 'feels_like': 19.0}
+
+    def close(self):
+        pass
+
+class StubApiHelper:
+    def get_weather_data(self, city, deadline=None):
+        return {'temperature': 21.0, 'feels_like': 20.0}
+
+def test_timeouts_are_clipped_to_deadline():
+    """Per-call timeouts never exceed the time left."""
+    deadline = Deadline(0.5)
+    assert deadline.timeout(60) <= 0.5
+    assert deadline.timeout_ms(60000) <= 500
+    assert Deadline().timeout(60) == 60
+
+def test_expired_deadline_refuses_new_work():
+    """Starting a call after the deadline raises DeadlineExceeded."""
+    deadline = Deadline(0)
+    with pytest.raises(DeadlineExceeded):
+        deadline.timeout(10)
+
+def test_child_never_outlives_parent():
+    """A stage deadline is bounded by the run deadline."""
+    parent = Deadline(0.1)
+    assert parent.child(60).remaining() <= 0.1
+
+def test_collection_stops_at_deadline(tmp_path):
+    """Cities finished before the deadline are saved and the rest are skipped."""
+    db_helper = DbHelper(str(tmp_path / "data.db"))
+    started = time.monotonic()
+    saved = collect_cities(['London', 'Paris', 'Berlin', 'Rome', 'Madrid'], SlowWebHelper(),
+                           StubApiHelper(), db_helper, deadline=Deadline(0.5))
+    assert time.monotonic() - started < 1.0
+    assert 1 <= len(saved) < 5
+
+def test_run_budget_reports_each_stage():
+    """Each stage records its budget, elapsed time and status."""
+    budget = RunBudget(1.0, {'collect': 0.1})
+    with budget.stage('collect') as deadline:
+        time.sleep(0.15)
+        deadline.check()
+    with budget.stage('report'):
+        pass
+    report = budget.report()
+    assert [record['stage'] for record in report] == ['collect', 'report']
+    assert report[0]['status'] == 'cancelled'
+    assert report[1]['status'] == 'ok'
+
+class TimingOutWebHelper(SlowWebHelper):
+    def get_weather_data(self, city, deadline=None, timings=None):
+        super().get_weather_data(city, deadline=deadline)
+        return None
+
+def test_worker_releases_only_cities_it_never_started(tmp_path):
+    """At the deadline the city that was being collected uses up an attempt; the untouched ones do not."""
+    queue_db = str(tmp_path / "queue.db")
+    QueueHelper(queue_db).enqueue(['London', 'Paris', 'Berlin'])
+    args = SimpleNamespace(queue_db=queue_db, lease_seconds=60, batch_size=3)
+    with DbWriter(DbHelper(str(tmp_path / "data.db"))) as writer:
+        run_worker(args, TimingOutWebHelper(), StubApiHelper(), writer, Deadline(0.1))
+
+    with sqlite3.connect(queue_db) as conn:
+        attempts = dict(conn.execute("SELECT city, attempts FROM work_queue"))
+    assert attempts == {'London': 1, 'Paris': 0, 'Berlin': 0}
@@ -0,0 +1,42 @@
+import requests
+from automation_framework.fake_servers import FaultConfig, FakeTimeAndDateServer, FakeOpenWeatherMapServer
+from automation_framework.utilities.api_helpers import ApiHelper
+from automation_framework.utilities.resilience_helpers import CircuitBreaker
+
+def test_api_helper_reads_fake_openweathermap():
+    """ApiHelper pointed at the fake server gets the same answer for name and ID queries."""
+    with FakeOpenWeatherMapServer(city_names={2643743: 'London'}) as server:
+        api_helper = ApiHelper('key', circuit_breaker=CircuitBreaker('api'), base_url=server.weather_url)
+        by_name = api_helper.get_weather_data('London')
+        assert by_name['feels_like'] <= by_name['temperature']
+
+        response = requests.get(server.weather_url, params={'id': 2643743, 'appid': 'key', 'units': 'metric'})
+        assert response.json()['name'] == 'London'
+        assert response.json()['main']['temp'] == by_name['temperature']
+
+def test_fake_openweathermap_group_and_auth():
+    """The group endpoint answers every ID, and requests without a key are rejected."""
+    with FakeOpenWeatherMapServer() as server:
+        group = requests.get(f"{server.url}/data/2.5/group", params={'id': '1,2,3', 'appid': 'key'}).json()
+        assert group['cnt'] == 3
+        assert [city['name'] for city in group['list']] == ['City 1', 'City 2', 'City 3']
+        assert requests.get(server.weather_url, params={'q': 'London'}).status_code == 401
+
+def test_fake_timeanddate_page_has_scraped_elements():
+    """City pages carry the temperature and feels-like elements WebHelper reads."""
+    with FakeTimeAndDateServer() as server:
+        page = requests.get(f"{server.base_url}uk/london")
+        assert page.status_code == 200
+        assert 'id="wt-temp"' in page.text and 'Feels Like:' in page.text
+        assert requests.get(f"{server.url}/nowhere").status_code == 404
+
+def test_fault_injection_errors_and_throttling():
+    """Error rate and request-rate limits produce 500s and 429s."""
+    with FakeOpenWeatherMapServer(faults=FaultConfig(error_rate=1.0)) as server:
+        assert requests.get(server.weather_url, params={'q': 'Paris', 'appid': 'key'}).status_code == 500
+
+    with FakeOpenWeatherMapServer(faults=FaultConfig(requests_per_second=2)) as server:
+        statuses = [requests.get(server.weather_url, params={'q': 'Paris', 'appid': 'key'}).status_code
+                    for _ in range(5)]
+        assert statuses.count(429) >= 2
+        assert server.request_count == 5
@@ -0,0 +1,37 @@
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from automation_framework.utilities.db_helpers import DbHelper
+
+def _timestamp(minutes_ago):
+    moment = datetime.now(timezone.utc) - timedelta(minutes=minutes_ago)
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+def test_only_stale_cities_are_selected(tmp_path):
+    """Cities observed inside the freshness window are skipped."""
+    db_helper = DbHelper(str(tmp_path / "data.db"))
+    with sqlite3.connect(db_helper.db_path) as conn:
+        conn.executemany("""
+            INSERT INTO weather_data (city, temperature_web, temperature_api, timestamp)
+            VALUES (?, 20.0, 20.0, ?)
+        """, [
+            ('London', _timestamp(300)),
+            ('London', _timestamp(5)),
+            ('Paris', _timestamp(120)),
+        ])
+
+    stale = db_helper.get_stale_cities(['London', 'Paris', 'Berlin'], freshness_minutes=60)
+    assert stale == ['Paris', 'Berlin']
+
+def test_last_observed_uses_newest_row(tmp_path):
+    """The last observation is the newest timestamp per city."""
+    db_helper = DbHelper(str(tmp_path / "data.db"))
+    with sqlite3.connect(db_helper.db_path) as conn:
+        conn.executemany("""
+            INSERT INTO weather_data (city, temperature_web, temperature_api, timestamp)
+            VALUES ('London', 20.0, 20.0, ?)
+        """, [('2025-05-01 10:00:00',), ('2025-05-03 10:00:00',), ('2025-05-02 10:00:00',)])
+
+    assert db_helper.get_last_observed(['London', 'Tokyo']) == {
+        'London': '2025-05-03 10:00:00',
+        'Tokyo': None
+    }
@@ -0,0 +1,59 @@
+import requests
+from automation_framework.fake_servers import FakeTimeAndDateServer
+from automation_framework.utilities.city_registry import CityRegistry
+from automation_framework.utilities.db_helpers import DbHelper
+from automation_framework.utilities.observations import Reading
+from automation_framework.utilities.resilience_helpers import CircuitBreaker
+from automation_framework.utilities.web_helpers import WebHelper
+from main import collect_cities
+
+class ListingWebHelper(WebHelper):
+    """WebHelper whose overview pages come from a dict instead of a browser."""
+
+    def __init__(self, registry, listings):
+        super().__init__(registry=registry, circuit_breaker=CircuitBreaker('web'))
+        self.listings = listings
+        self.pages_loaded = []
+        self.city_pages = []
+        self.request_delay = 0
+
+    def _scrape_listing(self, path, deadline):
+        self.pages_loaded.append(path)
+        return self.listings.get(path, {})
+
+    def get_weather_data(self, city, deadline=None, timings=None):
+        self.city_pages.append(city)
+        return {'city': city, 'temperature': 1.0, 'feels_like': 0.0}
+
+class StubApiHelper:
+    def get_weather_data(self, city, deadline=None):
+        return {'temperature': 21.0, 'feels_like': 20.0}
+
+def test_listing_pages_cover_cities_and_rest_fall_back(tmp_path):
+    """The index is read first, then only countries with unlisted cities; the rest get their own page."""
+    registry = CityRegistry(str(tmp_path / "data.db"))
+    web_helper = ListingWebHelper(registry, {
+        '': {'uk/london': 11.0, 'japan/tokyo': 15.0},
+        'usa': {'usa/new-york': 5.0}
+    })
+    cities = ['London', 'Tokyo', 'New York', 'Sydney', 'Paris']
+
+    prefetched = web_helper.get_listing_weather(cities)
+    assert prefetched['London'] == Reading('London', 11.0, None, source='web')
+    assert sorted(prefetched) == ['London', 'New York', 'Tokyo']
+    assert web_helper.pages_loaded == ['', 'australia', 'france', 'usa']
+
+    db_helper = DbHelper(str(tmp_path / "data.db"))
+    saved = collect_cities(cities, web_helper, StubApiHelper(), db_helper, prefetched=prefetched)
+    assert saved == cities
+    assert web_helper.city_pages == ['Sydney', 'Paris']
+
+def test_fake_server_listing_pages():
+    """The fake index lists the first cities, and country pages list every city of that country."""
+    with FakeTimeAndDateServer(index_size=3) as server:
+        index = requests.get(server.base_url).text
+        assert index.count('<a href="/weather/') == 3
+        usa = requests.get(f"{server.base_url}usa").text
+        assert '/weather/usa/new-york' in usa
+        assert '°C</td>' in usa
+        assert requests.get(f"{server.base_url}atlantis").status_code == 404
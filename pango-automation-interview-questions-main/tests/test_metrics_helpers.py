@@ -0,0 +1,53 @@
+from automation_framework.utilities.db_helpers import DbHelper
+from automation_framework.utilities.deadline_helpers import RunBudget
+from automation_framework.utilities.metrics_helpers import MetricsRegistry, get_metrics
+
+def test_prometheus_text_has_counters_and_histograms():
+    """Counters, gauges and histogram buckets are rendered in the Prometheus text format."""
+    metrics = MetricsRegistry()
+    metrics.inc('weather_web_failures_total', reason='error')
+    metrics.inc('weather_web_failures_total', reason='error')
+    metrics.set_gauge('weather_run_rows_per_second', 12.5)
+    metrics.observe('weather_api_request_seconds', 0.2)
+    metrics.observe('weather_api_request_seconds', 3.0)
+
+    text = metrics.to_prometheus()
+    assert '# TYPE weather_web_failures_total counter' in text
+    assert 'weather_web_failures_total{reason="error"} 2' in text
+    assert 'weather_run_rows_per_second 12.5' in text
+    assert 'weather_api_request_seconds_bucket{le="0.25"} 1' in text
+    assert 'weather_api_request_seconds_bucket{le="+Inf"} 2' in text
+    assert 'weather_api_request_seconds_count 2' in text
+
+def test_spans_nest_and_record_failures():
+    """Spans opened inside another span point at it, and exceptions mark the span."""
+    metrics = MetricsRegistry()
+    try:
+        with metrics.span('stage:collect'):
+            with metrics.span('city', city='London'):
+                raise ValueError("boom")
+    except ValueError:
+        pass
+    city, stage = metrics.summary()['spans']
+    assert city['parent_id'] == stage['span_id']
+    assert city['attributes'] == {'city': 'London'}
+    assert city['status'] == stage['status'] == 'ValueError'
+
+def test_run_summary_is_stored_with_the_run(tmp_path):
+    """Writes, stage spans and the stored summary all end up on the run."""
+    metrics = get_metrics()
+    metrics.reset()
+    db_helper = DbHelper(str(tmp_path / "data.db"))
+    run_id = db_helper.start_run(['London'])
+    budget = RunBudget(None, {})
+    with budget.stage('collect'):
+        db_helper.save_weather_data({'city': 'London', 'temperature': 20.0, 'feels_like': 19.0},
+                                    {'temperature': 21.0, 'feels_like': 20.0}, run_id=run_id)
+    db_helper.save_run_metrics(run_id, metrics.summary())
+
+    summary = db_helper.get_run(run_id)['metrics']
+    assert summary['counters']['weather_db_rows_written_total'] == 1
+    assert summary['latencies']['weather_db_write_seconds{operation="save"}']['count'] == 1
+    assert [span['name'] for span in summary['spans']] == ['stage:collect']
+    assert 'weather_stage_seconds{stage="collect"}' in summary['gauges']
+    metrics.reset()
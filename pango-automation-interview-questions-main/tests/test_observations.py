@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from automation_framework.utilities.db_helpers import DbHelper
+from automation_framework.utilities.observations import Observation, ObservationBatch, Reading
+from automation_framework.utilities.report_helpers import ReportHelper
+
+def make_batch():
+    return ObservationBatch([
+        Observation('London', 20.0, 19.0, 21.5, 20.0),
+        {'city': 'Paris', 'temperature_web': 25.0, 'feels_like_web': None,
+         'temperature_api': 24.0, 'feels_like_api': 23.0},
+    ])
+
+def test_reading_keeps_dict_access():
+    """Readings still work where helpers used to return dicts."""
+    reading = Reading('London', 20.0, 19.0, source='web')
+    assert reading['temperature'] == 20.0
+    assert reading.get('timing') is None
+    assert reading.get('missing', 'default') == 'default'
+    assert 'feels_like' in reading and 'timing' not in reading
+    reading['city'] = 'Londres'
+    assert reading.city == 'Londres'
+    with pytest.raises(KeyError):
+        reading['humidity']
+    with pytest.raises(AttributeError):
+        reading.humidity = 80
+
+def test_batch_round_trip():
+    """Rows read back from a batch match what went in, with missing values as None."""
+    batch = make_batch()
+    assert len(batch) == 2
+    assert batch[0] == Observation('London', 20.0, 19.0, 21.5, 20.0)
+    assert batch[1]['feels_like_web'] is None
+    assert list(batch.rows()) == [('London', 20.0, 19.0, 21.5, 20.0), ('Paris', 25.0, None, 24.0, 23.0)]
+    assert list(batch.discrepancy) == [1.5, 1.0]
+
+def test_numpy_and_dataframe_views_share_memory():
+    """to_numpy and to_dataframe wrap the batch's arrays instead of copying them."""
+    batch = make_batch()
+    columns = batch.to_numpy()
+    assert np.isnan(columns['feels_like_web'][1])
+    batch.temperature_web[0] = 30.0
+    assert columns['temperature_web'][0] == 30.0
+
+    df = batch.to_dataframe()
+    assert list(df.columns) == list(ObservationBatch.COLUMNS)
+    assert np.shares_memory(df['temperature_api'].to_numpy(), np.frombuffer(batch.temperature_api))
+
+def test_save_and_load_observations():
+    """Batches are saved in one transaction and come back from get_observations and the bucketed query."""
+    db_helper = DbHelper(':memory:')
+    assert db_helper.save_observations(make_batch(), run_id='r1') == 2
+    assert sorted(db_helper.get_completed_cities('r1')) == ['London', 'Paris']
+
+    loaded = db_helper.get_observations(cities=['Paris'])
+    assert list(loaded.rows()) == [('Paris', 25.0, None, 24.0, 23.0)]
+    assert loaded.timestamp[0] is not None
+
+    aggregated = db_helper.get_aggregated_observations(3600)
+    assert sorted(aggregated.city) == ['London', 'Paris']
+    assert list(aggregated.samples) == [1, 1]
+
+def test_report_statistics_from_batch_match_dicts(tmp_path):
+    """A batch gives the same report statistics as the equivalent list of dicts."""
+    report_helper = ReportHelper(output_dir=str(tmp_path))
+    batch = make_batch()
+    assert report_helper._calculate_statistics(batch) == \
+        report_helper._calculate_statistics([observation.to_dict() for observation in batch])
+    empty = report_helper._calculate_statistics(ObservationBatch())
+    assert empty['mean_difference'] == 0 and empty['cities_exceeding_threshold'] == 0
@@ -0,0 +1,138 @@
+import csv
+import pytest
+from automation_framework.utilities.city_registry import CityRegistry
+from automation_framework.utilities.db_helpers import DbHelper
+from automation_framework.utilities.report_helpers import ReportHelper
+from automation_framework.utilities.resilience_helpers import CircuitBreaker
+from automation_framework.utilities.web_helpers import WebHelper
+from main import collect_cities
+
+def timing(ttfb_ms, selector_wait_ms, total_ms):
+    return {'dns_ms': 5, 'connect_ms': 10, 'tls_ms': 15, 'ttfb_ms': ttfb_ms, 'download_ms': 20,
+            'dom_ms': 50, 'selector_wait_ms': selector_wait_ms, 'total_ms': total_ms,
+            'transfer_bytes': 40000, 'resource_count': 12, 'resource_bytes': 300000}
+
+def test_slowest_pages_and_dominant_phase(tmp_path):
+    """Slowest pages come first and name the phase that dominated them."""
+    db_helper = DbHelper(str(tmp_path / "data.db"))
+    db_helper.save_page_timing('London', timing(ttfb_ms=900, selector_wait_ms=30, total_ms=1100), run_id='r1')
+    db_helper.save_page_timing('Paris', timing(ttfb_ms=100, selector_wait_ms=2000, total_ms=2300), run_id='r1')
+    db_helper.save_page_timing('Tokyo', timing(ttfb_ms=100, selector_wait_ms=10, total_ms=5000), run_id='r2')
+
+    slowest = db_helper.get_slowest_pages(run_id='r1')
+    assert [(page['city'], page['dominant_phase']) for page in slowest] == [
+        ('Paris', 'selector_wait_ms'), ('London', 'ttfb_ms')
+    ]
+
+    summary = db_helper.get_page_timing_summary(run_id='r1')
+    assert summary[0]['phase'] == 'selector_wait_ms'
+    assert summary[0]['avg_ms'] == pytest.approx(1015)
+    assert sum(item['share'] for item in summary) == pytest.approx(1.0)
+
+def test_timing_report_lists_pages_and_phases(tmp_path):
+    """The timing report has one row per slow page and one per phase."""
+    db_helper = DbHelper(str(tmp_path / "data.db"))
+    db_helper.save_page_timing('London', timing(ttfb_ms=900, selector_wait_ms=30, total_ms=1100))
+    report_path = ReportHelper(output_dir=str(tmp_path)).generate_timing_report(
+        db_helper.get_slowest_pages(), db_helper.get_page_timing_summary()
+    )
+    with open(report_path, newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[2][:4] == ['London', '1100', 'ttfb_ms', '']
+    assert rows[2][-1] == '340000'
+    assert len(rows) == 3 + 3 + 7
+
+class FakePage:
+    """A page whose first load times out, like a slow timeanddate.com response."""
+
+    loads = 0
+
+    def goto(self, url, timeout):
+        FakePage.loads += 1
+        if FakePage.loads == 1:
+            raise TimeoutError(f"Timeout {timeout}ms exceeded")
+
+    def wait_for_selector(self, selector, timeout):
+        pass
+
+    def query_selector(self, selector):
+        return self
+
+    def inner_text(self):
+        return '20 °C'
+
+    def evaluate(self, script):
+        return {'ttfb_ms': 120.0} if 'navigation' in script else []
+
+    def close(self):
+        pass
+
+class FakeBrowser:
+    def new_page(self):
+        return FakePage()
+
+def test_failed_attempts_are_timed(tmp_path):
+    """A load that fails gets a timing row tagged with its outcome, next to the retry that worked."""
+    web_helper = WebHelper(registry=CityRegistry(str(tmp_path / "data.db")),
+                           circuit_breaker=CircuitBreaker('test-timing'))
+    web_helper.playwright, web_helper.browser = object(), FakeBrowser()
+    web_helper.retry_delay = 0
+    FakePage.loads = 0
+
+    timings = []
+    reading = web_helper.get_weather_data('London', timings=timings)
+    assert reading['temperature'] == 20.0
+    assert [(timing['attempt'], timing['outcome']) for timing in timings] == [(1, 'load_error'), (2, 'ok')]
+    assert 'ttfb_ms' not in timings[0] and timings[1]['ttfb_ms'] == 120.0
+    assert reading['timing'] is timings[1]
+
+    db_helper = DbHelper(str(tmp_path / "data.db"))
+    for timing in timings:
+        db_helper.save_page_timing('London', timing, run_id='r1')
+    slowest = db_helper.get_slowest_pages(run_id='r1')
+    assert sorted((page['outcome'], page['dominant_phase']) for page in slowest) == [
+        ('load_error', None), ('ok', 'ttfb_ms')
+    ]
+
+class BlankPage(FakePage):
+    """A page that loads but shows no temperature."""
+
+    def query_selector(self, selector):
+        return None
+
+class BlankBrowser:
+    def new_page(self):
+        return BlankPage()
+
+def test_pages_without_a_temperature_leave_the_circuit_closed(tmp_path):
+    """Cities whose page loads without a temperature do not count against timeanddate.com."""
+    breaker = CircuitBreaker('test-blank', failure_threshold=2)
+    web_helper = WebHelper(registry=CityRegistry(str(tmp_path / "data.db")), circuit_breaker=breaker)
+    web_helper.playwright, web_helper.browser = object(), BlankBrowser()
+    web_helper.retry_delay = 0
+    FakePage.loads = 1
+
+    assert web_helper.get_weather_data('London') is None
+    assert web_helper.get_weather_data('Paris') is None
+    assert breaker.allow_request()
+
+class FailingWebHelper:
+    request_delay = 0
+
+    def get_weather_data(self, city, deadline=None, timings=None):
+        timings.append({'total_ms': 30000.0, 'selector_wait_ms': 29000.0, 'attempt': 1, 'outcome': 'selector_error'})
+        return None
+
+    def close(self):
+        pass
+
+class StubApiHelper:
+    def get_weather_data(self, city, deadline=None):
+        return {'temperature': 21.0, 'feels_like': 20.0}
+
+def test_collect_saves_timings_of_failed_cities(tmp_path):
+    """A city the website never returned still leaves its page timing behind."""
+    db_helper = DbHelper(str(tmp_path / "data.db"))
+    assert collect_cities(['Oslo'], FailingWebHelper(), StubApiHelper(), db_helper, run_id='r1') == []
+    [page] = db_helper.get_slowest_pages(run_id='r1')
+    assert (page['city'], page['outcome'], page['dominant_phase']) == ('Oslo', 'selector_error', 'selector_wait_ms')
@@ -0,0 +1,84 @@
+import csv
+import numpy as np
+import pytest
+from automation_framework.utilities.db_helpers import DbHelper
+from automation_framework.utilities.report_helpers import DiscrepancyStats, ReportHelper
+
+CITIES = ['Berlin', 'London', 'Paris', 'Rome']
+
+@pytest.fixture
+def db_helper():
+    # A temporary file database, so report worker processes can open it too
+    with DbHelper('') as helper:
+        rng = np.random.default_rng(7)
+        rows = [
+            (city, float(round(rng.normal(15, 5), 1)), float(round(rng.normal(15, 5), 1)),
+             f"2025-05-{day:02d} {hour:02d}:00:00")
+            for day in range(1, 6) for hour in range(0, 24, 3) for city in CITIES
+        ]
+        with helper._connect() as conn:
+            conn.executemany("""
+                INSERT INTO weather_data (city, temperature_web, temperature_api, timestamp)
+                VALUES (?, ?, ?, ?)
+            """, rows)
+        yield helper
+
+def read_lines(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read().splitlines()
+
+def test_stats_merge_matches_whole():
+    """Merging per-part statistics gives the same numbers as computing them over all values."""
+    values = np.random.default_rng(3).exponential(2.0, 1000)
+    merged = DiscrepancyStats()
+    for part in np.array_split(values, 7):
+        merged = merged.merge(DiscrepancyStats.from_differences(part, 2.0))
+    assert merged.count == 1000
+    assert merged.moments.mean == pytest.approx(values.mean())
+    assert merged.moments.stddev == pytest.approx(values.std(ddof=1))
+    assert (merged.min, merged.max) == (values.min(), values.max())
+    assert merged.exceeding == int((values > 2.0).sum())
+
+@pytest.mark.parametrize('partition_by', ['day', 'city'])
+def test_parallel_report_matches_serial(db_helper, tmp_path, partition_by):
+    """Worker processes produce the same report and index as rendering in one process."""
+    serial = ReportHelper(output_dir=str(tmp_path / 'serial')).generate_partitioned_report(
+        db_helper, partition_by, workers=1
+    )
+    parallel = ReportHelper(output_dir=str(tmp_path / 'parallel')).generate_partitioned_report(
+        db_helper, partition_by, workers=2
+    )
+
+    # Only the 'Report Generated' line may differ
+    assert read_lines(serial['csv_path'])[:-1] == read_lines(parallel['csv_path'])[:-1]
+    assert read_lines(serial['index_path']) == read_lines(parallel['index_path'])
+    assert parallel['statistics'] == serial['statistics']
+    assert len(parallel['partitions']) == (5 if partition_by == 'day' else 4)
+
+    differences = np.abs(np.array([row['temperature_web'] - row['temperature_api']
+                                   for row in db_helper.get_observations()]))
+    assert parallel['statistics']['count'] == 160
+    assert parallel['statistics']['mean_difference'] == pytest.approx(differences.mean())
+    assert parallel['statistics']['stddev_difference'] == pytest.approx(differences.std(ddof=1))
+
+def test_index_points_into_report(db_helper, tmp_path):
+    """Each index entry's byte range holds exactly that partition's rows."""
+    result = ReportHelper(output_dir=str(tmp_path)).generate_partitioned_report(
+        db_helper, 'city', workers=1, start='2025-05-02', cities=['London', 'Paris']
+    )
+    with open(result['index_path'], encoding='utf-8') as f:
+        index = list(csv.DictReader(f))
+    assert [entry['Partition'] for entry in index] == ['London', 'Paris']
+    with open(result['csv_path'], 'rb') as report:
+        for entry in index:
+            report.seek(int(entry['Byte Offset']))
+            rows = list(csv.reader(report.read(int(entry['Bytes'])).decode('utf-8').splitlines()))
+            assert len(rows) == int(entry['Rows']) == 32
+            assert {row[0] for row in rows} == {entry['Partition']}
+            assert min(row[1] for row in rows) >= '2025-05-02'
+    lines = read_lines(result['csv_path'])
+    assert lines[int(index[1]['First Line']) - 1].startswith('Paris,')
+
+def test_unknown_partition(db_helper, tmp_path):
+    with pytest.raises(ValueError):
+        ReportHelper(output_dir=str(tmp_path)).generate_partitioned_report(db_helper, 'week')
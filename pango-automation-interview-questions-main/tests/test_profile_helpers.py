@@ -0,0 +1,77 @@
+import importlib
+import os
+import threading
+from automation_framework.utilities import profile_helpers
+from automation_framework.utilities.profile_helpers import Profiler
+
+def busy_work():
+    return sum(i * i for i in range(20000))
+
+def test_profiler_writes_stage_files_and_summary(tmp_path):
+    """Each stage gets a .prof file, and the summary lists the hot functions."""
+    profiler = Profiler(str(tmp_path), prefix='profile_run1', top_n=5)
+    with profiler.stage('collect'):
+        busy_work()
+    with profiler.stage('collect'):
+        busy_work()
+    with profiler.stage('report'):
+        busy_work()
+
+    summary_path = profiler.write()
+    assert os.path.exists(tmp_path / 'profile_run1_collect.prof')
+    assert os.path.exists(tmp_path / 'profile_run1_report.prof')
+    summary = open(summary_path).read()
+    assert '===== collect' in summary and '===== report' in summary
+    assert 'busy_work' in summary
+
+def test_disabled_profiler_records_nothing(tmp_path):
+    """A disabled profiler is a no-op and writes no files."""
+    profiler = Profiler(str(tmp_path), enabled=False)
+    with profiler.stage('collect'):
+        busy_work()
+    assert profiler.write() is None
+    assert os.listdir(tmp_path) == []
+
+def test_stages_in_several_threads(tmp_path):
+    """Overlapping stages never raise; each is either profiled or counted as skipped."""
+    profiler = Profiler(str(tmp_path))
+    started = threading.Barrier(4)
+
+    def work():
+        with profiler.stage('callback'):
+            started.wait()
+            busy_work()
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    calls = sum(count for (_, _, name), (count, *_) in profiler.stats['callback'].stats.items() if name == 'busy_work')
+    assert calls + profiler.skipped == 4
+
+def test_write_every_skips_recent_writes(tmp_path):
+    """Only the first of several quick writes touches the files."""
+    profiler = Profiler(str(tmp_path))
+    with profiler.stage('callback'):
+        busy_work()
+    assert profiler.write_every(60) is not None
+    assert profiler.write_every(60) is None
+    assert profiler.write_every(0) is not None
+
+def test_profiled_returns_function_unchanged_without_env_flag(monkeypatch, tmp_path):
+    """Without DASHBOARD_PROFILE the decorator adds no wrapper; with it, calls are profiled."""
+    monkeypatch.delenv('DASHBOARD_PROFILE', raising=False)
+    importlib.reload(profile_helpers)
+    assert profile_helpers.profiled('busy')(busy_work) is busy_work
+
+    monkeypatch.setenv('DASHBOARD_PROFILE', '1')
+    monkeypatch.setenv('DASHBOARD_PROFILE_DIR', str(tmp_path))
+    importlib.reload(profile_helpers)
+    wrapped = profile_helpers.profiled('busy')(busy_work)
+    assert wrapped is not busy_work
+    assert wrapped() == busy_work()
+    assert any(name.endswith('_busy.prof') for name in os.listdir(tmp_path))
+
+    monkeypatch.delenv('DASHBOARD_PROFILE')
+    importlib.reload(profile_helpers)
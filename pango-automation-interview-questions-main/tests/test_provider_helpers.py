@@ -0,0 +1,81 @@
+import threading
+import time
+from automation_framework.fake_servers import FaultConfig, FakeOpenWeatherMapServer
+from automation_framework.utilities.api_helpers import ApiHelper
+from automation_framework.utilities.db_helpers import DbHelper
+from automation_framework.utilities.observations import Reading
+from automation_framework.utilities.provider_helpers import ApiProvider, ProviderPool, WeatherProvider
+from automation_framework.utilities.resilience_helpers import CircuitBreaker
+from main import collect_with_providers
+
+class SlowProvider(WeatherProvider):
+    """Answers every city after a fixed delay and records how many fetches overlap."""
+
+    def __init__(self, name, delay, offset=0.0, max_concurrency=1, thread_safe=True):
+        self.name = name
+        self.thread_safe = thread_safe
+        super().__init__(max_concurrency)
+        self.delay = delay
+        self.offset = offset
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.threads = set()
+        self.closed_on = None
+        self._lock = threading.Lock()
+
+    def fetch(self, city, deadline):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        if city == 'Nowhere':
+            return None
+        return Reading(city, 20.0 + self.offset, None, source=self.name)
+
+    def close(self):
+        self.closed_on = threading.get_ident()
+
+def test_providers_run_concurrently_within_their_own_limits():
+    """Three providers take about as long as the slowest one, each within its concurrency limit."""
+    providers = [SlowProvider('web', 0.05, thread_safe=False, max_concurrency=4),
+                 SlowProvider('api', 0.05, max_concurrency=2),
+                 SlowProvider('extra', 0.05, max_concurrency=4)]
+    cities = [f"City {i}" for i in range(8)]
+    started = time.monotonic()
+    with ProviderPool(providers) as pool:
+        results = pool.collect(cities)
+    elapsed = time.monotonic() - started
+
+    # Run one after another the web provider alone would take 8 x 0.05s, and all three 1.2s
+    assert elapsed < 0.8
+    assert [provider.max_in_flight for provider in providers] == [1, 2, 4]
+    assert len(providers[0].threads) == 1 and providers[0].closed_on in providers[0].threads
+    assert results['City 3']['extra'].temperature == 20.0
+
+def test_collect_with_providers_saves_long_format_readings():
+    """Every provider's reading is stored; web and API pairs also go to weather_data."""
+    with DbHelper(':memory:') as db_helper, ProviderPool([
+        SlowProvider('web', 0.01, offset=1.0), SlowProvider('api', 0.01), SlowProvider('extra', 0.01, offset=-3.0)
+    ]) as pool:
+        run_id = db_helper.start_run(['London', 'Nowhere'])
+        saved = collect_with_providers(['London', 'Nowhere'], pool, db_helper, run_id=run_id)
+        assert saved == ['London']
+        assert db_helper.get_completed_cities(run_id) == ['London']
+        summary = {row['source']: row for row in db_helper.get_source_discrepancies(run_id=run_id)}
+        assert summary['extra']['mean_discrepancy'] == 3.0
+        assert summary['web']['mean_discrepancy'] == 1.0
+        assert list(summary) == ['extra', 'web']
+
+def test_api_provider_against_fake_server():
+    """Four concurrent API requests cut the wall time against a slow upstream."""
+    with FakeOpenWeatherMapServer(faults=FaultConfig(latency_ms=100)) as server:
+        api_helper = ApiHelper('key', circuit_breaker=CircuitBreaker('api'), base_url=server.weather_url)
+        cities = [f"Town {i}" for i in range(8)]
+        started = time.monotonic()
+        with ProviderPool([ApiProvider(api_helper, max_concurrency=4)]) as pool:
+            results = pool.collect(cities)
+        assert time.monotonic() - started < 0.6
+        assert all(results[city]['api'].city == city for city in cities)
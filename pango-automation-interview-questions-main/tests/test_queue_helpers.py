@@ -0,0 +1,55 @@
+import time
+import pytest
+from automation_framework.utilities.queue_helpers import QueueHelper
+
+@pytest.fixture
+def queue(tmp_path):
+    helper = QueueHelper(str(tmp_path / "queue.db"), lease_seconds=60, max_attempts=2)
+    helper.enqueue(['London', 'Paris', 'Berlin'])
+    return helper
+
+def test_workers_claim_disjoint_batches(queue):
+    """Two workers never receive the same city."""
+    first = queue.claim('worker-1', batch_size=2)
+    second = queue.claim('worker-2', batch_size=2)
+    assert first == ['London', 'Paris']
+    assert second == ['Berlin']
+    assert queue.claim('worker-3') == []
+
+def test_expired_lease_is_reclaimed(queue):
+    """Cities held by a worker that stopped heartbeating go to the next worker."""
+    queue.lease_seconds = -1
+    crashed = queue.claim('crashed-worker', batch_size=3)
+    queue.lease_seconds = 60
+    assert queue.claim('worker-2', batch_size=3) == crashed
+    assert queue.complete('crashed-worker', crashed) == 0, "The old lease holder can no longer finish"
+
+def test_heartbeat_extends_lease(queue):
+    """Heartbeats push the lease expiry forward."""
+    queue.lease_seconds = 0.5
+    queue.claim('worker-1', batch_size=3)
+    queue.lease_seconds = 60
+    time.sleep(0.6)
+    assert queue.heartbeat('worker-1') == 3
+    assert queue.claim('worker-2') == []
+
+def test_complete_and_fail(queue):
+    """Completed cities are done; failed cities retry until out of attempts."""
+    batch = queue.claim('worker-1', batch_size=3)
+    queue.complete('worker-1', ['London'])
+    queue.fail('worker-1', ['Paris', 'Berlin'], 'timeout')
+    assert queue.get_stats()['pending'] == 2
+    retry = queue.claim('worker-1', batch_size=3)
+    queue.fail('worker-1', retry, 'timeout')
+    stats = queue.get_stats()
+    assert stats == {'pending': 0, 'leased': 0, 'done': 1, 'failed': 2}
+    assert queue.enqueue(batch) == 3, "Re-enqueueing re-opens done and failed cities"
+
+def test_release_does_not_use_up_attempts(queue):
+    """Cities handed back unprocessed go to the next worker and never count towards failure."""
+    for _ in range(queue.max_attempts + 1):
+        assert queue.release('worker-1', queue.claim('worker-1', batch_size=3)) == 3
+    assert queue.get_stats() == {'pending': 3, 'leased': 0, 'done': 0, 'failed': 0}
+    batch = queue.claim('worker-2', batch_size=3)
+    queue.fail('worker-2', batch, 'timeout')
+    assert queue.get_stats()['pending'] == 3, "A real failure still has its retry left"
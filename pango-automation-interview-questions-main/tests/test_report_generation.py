@@ -4,7 +4,8 @@ import os
 
 def test_report_generation():
     # Initialize helpers
-    db_helper = DbHelper()
+    # Work on an in-memory copy so the test never writes to data.db
+    db_helper = DbHelper.from_snapshot('data.db')
     report_helper = ReportHelper()
     
     # Get discrepancy data and stats from database
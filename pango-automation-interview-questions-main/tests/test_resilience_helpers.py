@@ -0,0 +1,85 @@
+import threading
+import time
+import requests
+from automation_framework.utilities.api_helpers import ApiHelper
+from automation_framework.utilities.resilience_helpers import CircuitBreaker, LatencyTracker
+
+class FakeResponse:
+    def __init__(self, status_code=200, temp=20.0):
+        self.status_code = status_code
+        self.temp = temp
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error")
+
+    def json(self):
+        return {'main': {'temp': self.temp, 'feels_like': self.temp - 1}}
+
+def test_breaker_opens_after_repeated_failures_and_probes_when_reset():
+    """The circuit opens at the threshold, fails fast, then lets one probe through."""
+    breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+def test_latency_tracker_percentile():
+    """The p95 of 1..100 ms is 96 ms."""
+    tracker = LatencyTracker()
+    assert tracker.percentile(95) is None
+    for ms in range(1, 101):
+        tracker.record(ms / 1000)
+    assert tracker.percentile(95) == 0.096
+
+def test_api_open_circuit_fails_fast(monkeypatch):
+    """Once server errors open the circuit, no more requests are sent."""
+    calls = []
+    def fake_get(url, params=None, timeout=None):
+        calls.append(params)
+        return FakeResponse(503)
+    monkeypatch.setattr(requests, 'get', fake_get)
+
+    api_helper = ApiHelper('key', circuit_breaker=CircuitBreaker('api', failure_threshold=2, reset_timeout=60))
+    for _ in range(5):
+        assert api_helper.get_weather_data('London') is None
+    assert len(calls) == 2
+
+def test_api_hedged_request_returns_first_success():
+    """A slow first request is hedged and the faster duplicate's answer is used."""
+    class SlowFirstApiHelper(ApiHelper):
+        def __init__(self):
+            super().__init__('key', circuit_breaker=CircuitBreaker('api'), hedge=True)
+            self.hedge_delay = 0.05
+            self.calls = 0
+            self._calls_lock = threading.Lock()
+
+        def _get(self, params, timeout):
+            with self._calls_lock:
+                self.calls += 1
+                call = self.calls
+            if call == 1:
+                time.sleep(1)
+                return FakeResponse(temp=1.0)
+            return FakeResponse(temp=2.0)
+
+    api_helper = SlowFirstApiHelper()
+    started = time.monotonic()
+    data = api_helper.get_weather_data('London')
+    assert time.monotonic() - started < 0.5
+    assert data['temperature'] == 2.0
+    assert api_helper.calls == 2
@@ -0,0 +1,49 @@
+import pytest
+from automation_framework.utilities.db_helpers import DbHelper
+from main import collect_cities
+
+class StubWebHelper:
+    request_delay = 0
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+
+    def get_weather_data(self, city, deadline=None, timings=None):
+        if city == self.fail_on:
+            raise KeyboardInterrupt
+        return {'city': city, 'temperature': 20.0, 'feels_like': 19.0}
+
+    def close(self):
+        pass
+
+class StubApiHelper:
+    def get_weather_data(self, city, deadline=None):
+        return {'temperature': 21.0, 'feels_like': 20.0}
+
+def test_interrupted_run_keeps_completed_cities(tmp_path):
+    """Cities finished before an interruption are saved and tagged with the run ID."""
+    db_helper = DbHelper(str(tmp_path / "data.db"))
+    cities = ['London', 'Paris', 'Berlin', 'Rome']
+    run_id = db_helper.start_run(cities)
+
+    with pytest.raises(KeyboardInterrupt):
+        collect_cities(cities, StubWebHelper(fail_on='Berlin'), StubApiHelper(), db_helper, run_id=run_id)
+
+    assert sorted(db_helper.get_completed_cities(run_id)) == ['London', 'Paris']
+
+def test_resume_collects_only_missing_cities(tmp_path):
+    """A resumed run only collects the cities its run has not saved."""
+    db_helper = DbHelper(str(tmp_path / "data.db"))
+    run_id = db_helper.start_run(['London', 'Paris', 'Berlin'])
+    collect_cities(['London'], StubWebHelper(), StubApiHelper(), db_helper, run_id=run_id)
+
+    run = db_helper.get_run(run_id)
+    completed = set(db_helper.get_completed_cities(run_id))
+    remaining = [city for city in run['cities'] if city not in completed]
+    assert remaining == ['Paris', 'Berlin']
+
+    saved = collect_cities(remaining, StubWebHelper(), StubApiHelper(), db_helper, run_id=run_id)
+    db_helper.finish_run(run_id)
+    assert saved == remaining
+    assert db_helper.get_run(run_id)['status'] == 'completed'
+    assert db_helper.get_summary_stats()['mean_discrepancy'] == pytest.approx(1.0)
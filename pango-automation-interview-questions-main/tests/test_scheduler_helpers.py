@@ -0,0 +1,78 @@
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+import pytest
+from automation_framework.utilities.db_helpers import DbHelper
+from automation_framework.utilities.scheduler_helpers import RateLimiter, PriorityScheduler
+
+def _timestamp(minutes_ago):
+    moment = datetime.now(timezone.utc) - timedelta(minutes=minutes_ago)
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+def test_rate_limiter_enforces_budget():
+    """Requests beyond the burst wait for tokens to refill."""
+    limiter = RateLimiter(requests_per_minute=600, burst=2)
+    assert limiter.try_acquire()
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+    started = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - started >= 0.05
+
+def test_rate_limiter_gives_up_at_its_timeout():
+    """A token that would only arrive after the timeout is not waited for."""
+    limiter = RateLimiter(requests_per_minute=6, burst=1)
+    assert limiter.acquire(timeout=0)
+    started = time.monotonic()
+    assert not limiter.acquire(timeout=1)
+    assert time.monotonic() - started < 0.5
+
+def test_rate_limiter_rejects_non_positive_rates():
+    """A zero budget is a configuration error, not a division by zero on the first request."""
+    for rate in (0, -5):
+        with pytest.raises(ValueError):
+            RateLimiter(requests_per_minute=rate)
+
+def test_priority_by_age_and_volatility(tmp_path):
+    """Unobserved cities come first, then volatile and stale ones; fresh cities are skipped."""
+    db_helper = DbHelper(str(tmp_path / "data.db"))
+    rows = [
+        ('Stable', 20.0, 21.0, _timestamp(60)),
+        ('Stable', 20.0, 21.0, _timestamp(30)),
+        ('Volatile', 20.0, 26.0, _timestamp(60)),
+        ('Volatile', 20.0, 16.0, _timestamp(30)),
+        ('Fresh', 20.0, 20.0, _timestamp(1)),
+    ]
+    with sqlite3.connect(db_helper.db_path) as conn:
+        conn.executemany("""
+            INSERT INTO weather_data (city, temperature_web, temperature_api, timestamp)
+            VALUES (?, ?, ?, ?)
+        """, rows)
+
+    scheduler = PriorityScheduler(db_helper, ['Stable', 'Volatile', 'Fresh', 'New'], min_age_minutes=5)
+    assert scheduler.next_cities(10) == ['New', 'Volatile', 'Stable']
+
+def test_failing_city_backs_off(tmp_path):
+    """A city that keeps failing leaves the head of the queue instead of taking every batch."""
+    db_helper = DbHelper(str(tmp_path / "data.db"))
+    with sqlite3.connect(db_helper.db_path) as conn:
+        conn.execute("""
+            INSERT INTO weather_data (city, temperature_web, temperature_api, timestamp)
+            VALUES ('Stale', 20.0, 21.0, ?)
+        """, (_timestamp(60),))
+
+    scheduler = PriorityScheduler(db_helper, ['Broken', 'Stale'], failure_backoff_minutes=10)
+    assert scheduler.next_cities(1) == ['Broken']
+    scheduler.record_attempts(['Broken'], saved=[])
+    assert scheduler.next_cities(10) == ['Stale']
+
+    # Due again, but ranked by how long ago it failed rather than first
+    scheduler.failure_backoff_minutes = 0
+    assert scheduler.next_cities(10) == ['Stale', 'Broken']
+    scheduler.record_attempts(['Broken'], saved=['Broken'])
+    assert scheduler.failures == {}
+
+def test_backoff_doubles_up_to_a_limit(tmp_path):
+    scheduler = PriorityScheduler(DbHelper(str(tmp_path / "data.db")), [], failure_backoff_minutes=5,
+                                  max_backoff_minutes=30)
+    assert [scheduler._backoff_minutes(failures) for failures in range(1, 6)] == [5, 10, 20, 30, 30]
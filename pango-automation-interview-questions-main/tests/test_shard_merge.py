@@ -0,0 +1,142 @@
+import os
+import sqlite3
+import threading
+import time
+import pytest
+from automation_framework.utilities.db_helpers import DbHelper, WEATHER_DATA_SECONDARY_INDEXES
+
+def make_shard(path, rows, run_id=None):
+    """A collector's database holding (city, web, api, timestamp) rows."""
+    with DbHelper(str(path)) as shard:
+        if run_id:
+            with shard._connect() as conn:
+                conn.execute("INSERT INTO runs (run_id, cities, status) VALUES (?, '[]', 'completed')", (run_id,))
+        add_rows(shard, rows, run_id)
+    return str(path)
+
+def add_rows(shard, rows, run_id=None):
+    with shard._connect() as conn:
+        conn.executemany("""
+            INSERT INTO weather_data (city, temperature_web, temperature_api, timestamp, run_id)
+            VALUES (?, ?, ?, ?, ?)
+        """, [row + (run_id,) for row in rows])
+
+def hourly(city, hours, web=20.0, api=19.0, day=1):
+    return [(city, web, api, f"2025-05-{day:02d} {hour:02d}:00:00") for hour in hours]
+
+def count(db_helper, sql, params=()):
+    with db_helper._connect() as conn:
+        return conn.execute(sql, params).fetchone()[0]
+
+@pytest.fixture
+def central():
+    with DbHelper(':memory:') as helper:
+        yield helper
+
+def test_shards_merge_incrementally(central, tmp_path):
+    """Each merge copies only the rows a shard gained since the last one."""
+    host_a = make_shard(tmp_path / 'a.db', hourly('London', range(10)), run_id='run-a')
+    host_b = make_shard(tmp_path / 'b.db', hourly('London', range(10)) + hourly('Paris', range(5)))
+
+    result = central.merge_shards({'host-a': host_a, 'host-b': host_b})
+    assert result['rows_merged'] == 25 and result['indexes_rebuilt']
+    # The same city and hour from two collectors are two observations
+    assert count(central, "SELECT COUNT(*) FROM weather_data WHERE city = 'London'") == 20
+    assert central.get_run('run-a')['status'] == 'completed'
+    assert central.get_completed_cities('run-a') == ['London']
+    assert central.get_merge_state()['host-a']['last_id'] == 10
+
+    with DbHelper(host_a) as shard:
+        add_rows(shard, hourly('London', range(10, 13)))
+    result = central.merge_shards({'host-a': host_a, 'host-b': host_b})
+    assert [(shard['source'], shard['rows_read']) for shard in result['shards']] == [('host-a', 3)]
+    assert result['rows_merged'] == 3
+    assert central.merge_shards({'host-a': host_a, 'host-b': host_b})['shards'] == []
+
+def test_duplicates_are_skipped(central, tmp_path):
+    """Re-reading a shard, or a shard that was itself merged into, adds no row twice."""
+    host_a = make_shard(tmp_path / 'a.db', hourly('Rome', range(6)))
+    central.merge_shards({'host-a': host_a})
+    result = central.merge_shards({'host-a': host_a}, full=True)
+    assert result['rows_merged'] == 0 and result['duplicates'] == 6
+
+    # A regional store that already merged host-a, plus one row of its own
+    with DbHelper(str(tmp_path / 'region.db')) as region:
+        region.merge_shards({'host-a': host_a})
+        add_rows(region, hourly('Rome', [12]))
+    result = central.merge_shards({'region': str(tmp_path / 'region.db')})
+    assert result['rows_merged'] == 1 and result['duplicates'] == 6
+    assert count(central, "SELECT COUNT(*) FROM weather_data WHERE source = 'region'") == 1
+
+def test_replaced_shard_is_read_again(central, tmp_path):
+    """A shard whose ids went backwards was replaced, so it is read from the start."""
+    path = tmp_path / 'a.db'
+    central.merge_shards({'host-a': make_shard(path, hourly('Oslo', range(5)))})
+    os.remove(path)
+    central.merge_shards({'host-a': make_shard(path, hourly('Oslo', range(5, 8), day=2))})
+    assert count(central, "SELECT COUNT(*) FROM weather_data WHERE city = 'Oslo'") == 8
+
+def test_merge_rebuilds_indexes_and_rollups(central, tmp_path):
+    """Indexes come back after a large merge and anomaly_stats are replayed in time order."""
+    # Local readings after the shard's, so the rebuilt EWMA must reflect the local ones last
+    add_rows(central, hourly('Berlin', range(12, 24), web=25.0, api=20.0))
+    host_a = make_shard(tmp_path / 'a.db', hourly('Berlin', range(12), web=20.0, api=20.0))
+    result = central.merge_shards({'host-a': host_a}, rebuild_ratio=0.5, compact=True)
+    assert result['indexes_rebuilt'] and result['cities_rebuilt'] == 1
+
+    with central._connect() as conn:
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(weather_data)")}
+    assert set(WEATHER_DATA_SECONDARY_INDEXES) | {'idx_weather_data_dedup'} <= indexes
+    stats = central.get_city_stats('Berlin')
+    assert stats.count == 24
+    assert stats.mean == pytest.approx(2.5)
+    # Twelve steps from 0 towards 5; replaying the local rows first would give 5 * 0.9 ** 12 instead
+    assert stats.ewma == pytest.approx(5 * (1 - 0.9 ** 12))
+
+def test_small_merge_keeps_indexes(central, tmp_path):
+    """A merge that is small next to the stored data updates the indexes instead of rebuilding them."""
+    add_rows(central, hourly('Madrid', range(24)))
+    host_a = make_shard(tmp_path / 'a.db', hourly('Madrid', range(2), day=2))
+    assert not central.merge_shards({'host-a': host_a})['indexes_rebuilt']
+
+def test_shard_is_not_modified(central, tmp_path):
+    """Shards are only read, so collectors can keep writing to them."""
+    host_a = make_shard(tmp_path / 'a.db', hourly('Lisbon', range(3)))
+    before = os.stat(host_a).st_mtime_ns
+    central.merge_shards({'host-a': host_a})
+    assert os.stat(host_a).st_mtime_ns == before
+    with sqlite3.connect(host_a) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM weather_data WHERE source IS NOT NULL").fetchone()[0] == 0
+
+class SlowCentral(DbHelper):
+    """Writes slowly, like a central database on a busy disk."""
+
+    def __init__(self, db_path):
+        super().__init__(db_path)
+        self._keeper.set_progress_handler(lambda: time.sleep(0.001), 200)
+
+def test_collector_can_write_while_merging(tmp_path):
+    """The shard is only locked while a chunk is read, so its collector's inserts keep succeeding."""
+    rows = [('Vienna', 20.0, 19.0, f"2025-05-01 00:00:{i:05d}") for i in range(2000)]
+    host_a = make_shard(tmp_path / 'a.db', rows)
+    with SlowCentral(':memory:') as central:
+        merge = threading.Thread(target=central.merge_shards, args=({'host-a': host_a},), kwargs={'chunk_rows': 100})
+        merge.start()
+        written = 0
+        with sqlite3.connect(host_a, timeout=0.1) as collector:
+            while merge.is_alive():
+                collector.execute("""
+                    INSERT INTO weather_data (city, temperature_web, temperature_api, timestamp)
+                    VALUES ('Vienna', 20.0, 19.0, ?)
+                """, (f"2025-05-02 00:00:{written:05d}",))
+                collector.commit()
+                written += 1
+                time.sleep(0.01)
+        merge.join()
+        assert written > 10, "The merge should take long enough to overlap the collector"
+
+        # Rows written during the merge come with the next one
+        central.merge_shards({'host-a': host_a})
+        assert central.get_merge_state()['host-a']['last_id'] == len(rows) + written
+        with central._connect() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM weather_data").fetchone()[0] == len(rows) + written
@@ -0,0 +1,67 @@
+import json
+import os
+import subprocess
+import sys
+from automation_framework.utilities.config_helpers import ConfigHelper, get_config
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time allowed for main.py, measured with python -X importtime
+MAIN_IMPORT_BUDGET_SECONDS = 0.15
+
+# Modules that only some runs need, so main.py must not load them at import
+HEAVY_MODULES = ['playwright', 'requests', 'pandas', 'numpy', 'plotly.express', 'http.server', 'cProfile']
+
+def run_python(*args):
+    result = subprocess.run([sys.executable, *args], cwd=PROJECT_DIR, capture_output=True, text=True, check=True)
+    return result
+
+def test_main_import_skips_heavy_dependencies():
+    """Importing main.py leaves Playwright, requests, pandas and friends unloaded."""
+    code = f"import json, sys, main; print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    assert json.loads(run_python('-c', code).stdout) == []
+
+def test_dashboard_import_skips_pandas():
+    """The dashboard loads pandas and plotly.express with its first figure, not at import."""
+    code = ("import json, sys, automation_framework.dashboard.app; "
+            "print(json.dumps([m for m in ['pandas', 'plotly.express'] if m in sys.modules]))")
+    assert json.loads(run_python('-c', code).stdout) == []
+
+def test_main_import_time_budget():
+    """main.py imports within MAIN_IMPORT_BUDGET_SECONDS (best of three, to ride out a busy machine)."""
+    timings = []
+    for _ in range(3):
+        stderr = run_python('-X', 'importtime', '-c', 'import main').stderr
+        main_line = [line for line in stderr.splitlines() if line.rstrip().endswith('| main')][-1]
+        timings.append(int(main_line.split('|')[1]) / 1e6)
+    assert min(timings) < MAIN_IMPORT_BUDGET_SECONDS, f"main.py import took {min(timings):.3f}s"
+
+def write_config(path, threshold, report_dir):
+    path.write_text(f"[API]\nAPI_KEY = file-key\n\n[REPORT]\nTEMPERATURE_THRESHOLD = {threshold}\nREPORT_DIR = {report_dir}\n")
+
+def test_environment_overrides_config_file(tmp_path, monkeypatch):
+    config_file = tmp_path / "config.ini"
+    write_config(config_file, 2.0, tmp_path / "reports")
+    monkeypatch.setenv('WEATHER_API_API_KEY', 'env-key')
+    monkeypatch.setenv('WEATHER_COLLECTION_FRESHNESS_MINUTES', '15')
+    config = ConfigHelper(str(config_file))
+    assert config.get_api_key() == 'env-key'
+    assert config.get_freshness_minutes() == 15.0
+    assert config.get_temperature_threshold() == 2.0
+    assert config.get_requests_per_minute() == 30.0
+
+def test_get_config_is_shared_and_reloads_on_change(tmp_path):
+    """get_config returns one instance per file and picks up edits to the file."""
+    config_file = tmp_path / "config.ini"
+    write_config(config_file, 2.0, tmp_path / "reports")
+    config = get_config(str(config_file))
+    assert get_config(str(config_file)) is config
+    assert config.get_temperature_threshold() == 2.0
+
+    write_config(config_file, 3.5, tmp_path / "other_reports")
+    # Make sure the modification time moves even on coarse-grained filesystems
+    stat = os.stat(config_file)
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert get_config(str(config_file)) is config
+    assert config.get_temperature_threshold() == 3.5
+    assert os.path.isdir(tmp_path / "other_reports")
@@ -0,0 +1,84 @@
+import time
+import pytest
+from automation_framework.utilities.db_helpers import DbHelper
+from automation_framework.utilities.metrics_helpers import get_metrics
+from automation_framework.utilities.writer_helpers import DbWriter
+
+def pair(city, web=20.0, api=19.0):
+    return {'city': city, 'temperature': web, 'feels_like': web}, {'city': city, 'temperature': api, 'feels_like': api}
+
+def count_rows(db_helper, table):
+    with db_helper._connect() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+class SlowDbHelper(DbHelper):
+    """Takes write_seconds for every transaction, like a slow disk."""
+
+    write_seconds = 0.1
+
+    def save_records(self, records):
+        time.sleep(self.write_seconds)
+        return super().save_records(records)
+
+def test_records_are_grouped_into_transactions():
+    """120 queued saves of mixed kinds take three commits, not 120."""
+    metrics = get_metrics()
+    batches_before = metrics.get_counter('weather_db_writer_batches_total')
+    with DbHelper(':memory:') as db_helper:
+        with DbWriter(db_helper, batch_size=50, flush_seconds=5) as writer:
+            for i in range(100):
+                writer.save_weather_data(*pair(f"City {i}"), run_id='run-1')
+            for i in range(10):
+                writer.save_readings(f"City {i}", {'web': {'temperature': 20.0}, 'api': None}, run_id='run-1')
+                writer.save_page_timing(f"City {i}", {'total_ms': 100.0 + i}, run_id='run-1')
+            writer.flush()
+            assert count_rows(db_helper, 'weather_data') == 100
+            assert count_rows(db_helper, 'readings') == 10
+            assert count_rows(db_helper, 'page_timings') == 10
+            assert metrics.get_counter('weather_db_writer_batches_total') - batches_before == 3
+        assert db_helper.get_completed_cities('run-1')[:2] == ['City 0', 'City 1']
+
+def test_saves_do_not_wait_for_disk_until_the_queue_is_full():
+    """Saving returns at once while the writer is busy; a full queue makes the caller wait."""
+    metrics = get_metrics()
+    waits_before = metrics.get_counter('weather_db_writer_backpressure_total')
+    with SlowDbHelper(':memory:') as db_helper:
+        with DbWriter(db_helper, max_queue=2, batch_size=1, flush_seconds=0) as writer:
+            started = time.monotonic()
+            writer.save_weather_data(*pair('City 0'))
+            while writer.pending():
+                time.sleep(0.001)
+            for i in range(1, 3):
+                writer.save_weather_data(*pair(f"City {i}"))
+            # The writer holds one record and the queue the other two; nothing waited on SQLite
+            assert time.monotonic() - started < SlowDbHelper.write_seconds
+            assert metrics.get_counter('weather_db_writer_backpressure_total') == waits_before
+
+            for i in range(3, 6):
+                writer.save_weather_data(*pair(f"City {i}"))
+            assert metrics.get_counter('weather_db_writer_backpressure_total') > waits_before
+        # Leaving the block committed everything still queued
+        assert count_rows(db_helper, 'weather_data') == 6
+
+def test_bad_record_does_not_lose_its_batch():
+    """A record that cannot be saved is counted and skipped; the rest of its batch is kept."""
+    with DbHelper(':memory:') as db_helper:
+        with DbWriter(db_helper, batch_size=10, flush_seconds=5) as writer:
+            writer.save_weather_data(*pair('London'))
+            writer.save_weather_data({'city': 'Broken'}, {'city': 'Broken', 'temperature': 10.0})
+            writer.save_weather_data(*pair('Paris'))
+        assert writer.failed == 1
+        assert sorted(db_helper.get_cities()) == ['London', 'Paris']
+
+        with pytest.raises(RuntimeError):
+            writer.save_weather_data(*pair('Berlin'))
+
+def test_flush_reports_cities_that_could_not_be_saved():
+    """flush() names each city with a failed record once, so it is not marked done."""
+    with DbHelper(':memory:') as db_helper:
+        with DbWriter(db_helper, batch_size=10, flush_seconds=5) as writer:
+            writer.save_weather_data(*pair('London'))
+            writer.save_weather_data({'city': 'Broken'}, {'city': 'Broken', 'temperature': 10.0})
+            assert writer.flush() == {'Broken'}
+            writer.save_weather_data(*pair('Paris'))
+            assert writer.flush() == set()